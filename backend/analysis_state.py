@@ -0,0 +1,99 @@
+import os
+import json
+import time
+import zlib
+import sqlite3
+import logging
+import threading
+from typing import List, Dict, Any, Optional
+
+from config import ANALYSIS_STATE_PATH
+
+# Configuration du logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class AnalysisStateStore:
+    """Mémorise, par dépôt et jeu de modèles, le dernier commit analysé et ses résultats par fichier"""
+
+    def __init__(self, db_path: str = ANALYSIS_STATE_PATH):
+        """
+        Initialise le stockage de l'état des analyses
+
+        Args:
+            db_path: Chemin du fichier SQLite
+        """
+        self.db_path = db_path
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS analysis_state (
+                repo_name TEXT NOT NULL,
+                models_key TEXT NOT NULL,
+                commit_sha TEXT NOT NULL,
+                file_results BLOB NOT NULL,
+                analyzed_at REAL NOT NULL,
+                PRIMARY KEY (repo_name, models_key)
+            )
+        """)
+        self._conn.commit()
+
+    @staticmethod
+    def _models_key(models: List[str]) -> str:
+        """Clé stable d'un jeu de modèles (les résultats ne sont comparables qu'à modèles égaux)"""
+        return ",".join(sorted(models))
+
+    def get(self, repo_name: str, models: List[str]) -> Optional[Dict[str, Any]]:
+        """
+        Récupère l'état de la dernière analyse d'un dépôt
+
+        Args:
+            repo_name: Nom du dépôt (format: "username/repo")
+            models: Modèles utilisés pour l'analyse
+
+        Returns:
+            Dictionnaire {commit_sha, file_results, analyzed_at} ou None
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT commit_sha, file_results, analyzed_at FROM analysis_state "
+                "WHERE repo_name = ? AND models_key = ?",
+                (repo_name, self._models_key(models))
+            ).fetchone()
+        if row is None:
+            return None
+        try:
+            file_results = json.loads(zlib.decompress(row[1]).decode("utf-8"))
+        except (zlib.error, json.JSONDecodeError) as e:
+            logger.warning(f"État d'analyse illisible pour {repo_name}: {str(e)}")
+            return None
+        return {"commit_sha": row[0], "file_results": file_results, "analyzed_at": row[2]}
+
+    def save(self, repo_name: str, models: List[str], commit_sha: str, file_results: List[Dict[str, Any]]):
+        """
+        Enregistre l'état d'une analyse terminée
+
+        Args:
+            repo_name: Nom du dépôt (format: "username/repo")
+            models: Modèles utilisés pour l'analyse
+            commit_sha: Commit analysé
+            file_results: Résultats détaillés par fichier
+        """
+        blob = zlib.compress(json.dumps(file_results, ensure_ascii=False).encode("utf-8"))
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO analysis_state (repo_name, models_key, commit_sha, file_results, analyzed_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (repo_name, self._models_key(models), commit_sha, blob, time.time())
+            )
+            self._conn.commit()
+        logger.info(f"État d'analyse enregistré pour {repo_name} au commit {commit_sha[:12]}")
+
+    def close(self):
+        """Ferme la connexion SQLite"""
+        with self._lock:
+            self._conn.close()
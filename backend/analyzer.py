@@ -1,33 +1,95 @@
 import os
+import copy
 import logging
-from typing import List, Dict, Any, Optional, Callable
+from typing import List, Dict, Any, Optional, Callable, Union
 import json
 import asyncio
-from ollama import OllamaManager
+from ollama import OllamaManager, CHARS_PER_TOKEN
+from config import (
+    ANALYSIS_MAX_CONCURRENCY, ANALYSIS_MAX_FILES, ANALYSIS_PREFILTER_ENABLED, SECRET_SCAN_ENABLED,
+    ANALYSIS_EXCLUDE_VENDORED, OLLAMA_STREAMING_ENABLED, ANALYSIS_PACKING_ENABLED, ANALYSIS_PACK_MAX_FILE_BYTES,
+    ANALYSIS_PACK_MAX_TOKENS, ANALYSIS_PACK_MAX_FILES, OLLAMA_SCHEDULING, OLLAMA_KEEP_ALIVE, SECRET_SCAN_MAX_FILE_BYTES
+)
+from repo_index import RepositoryIndex, count_code_lines
+from path_classifier import PathClassifier
+from file_scheduler import rank_files
+from scan_budget import ScanBudget, BUDGET_TIME
+from prefilter import screen_file, prefiltered_result, count_signals, PREFILTER_REASON
+from secret_scanner import SecretScanner
+from prompt_packer import plan_packs, build_packed_code, split_packed_result, section_overhead
+from metrics import stage_timer, ANALYSIS_FILES
 from datetime import datetime
-import subprocess
 from collections import defaultdict, Counter
-import re
 
 # Configuration du logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Extensions de fichiers non texte exclues de l'analyse
+BINARY_EXTENSIONS = ('.exe', '.dll', '.so', '.bin', '.dat', '.zip',
+                     '.tar', '.gz', '.xz', '.pdf', '.jpg', '.png', '.gif')
+
+def is_reusable_result(result: Dict[str, Any]) -> bool:
+    """
+    Indique si le résultat d'un fichier peut être repris par une analyse incrémentale
+
+    Les fichiers en erreur, ignorés faute de budget ou dont aucun modèle
+    n'a répondu sont réanalysés, même s'ils n'ont pas changé.
+    """
+    if not result.get("file_path") or result.get("status") == "erreur" or result.get("budget_skipped"):
+        return False
+    # Résultats enregistrés avant l'état "erreur" des fichiers sans réponse : tous les scores sont nuls
+    # (une réponse valide sans vulnérabilité a un score positif)
+    scores = result.get("model_scores")
+    return not (scores is not None and not any(scores.values()) and not result.get("vulnerabilities"))
+
+
 class RepositoryAnalyzer:
     """Analyseur de dépôts pour détecter les vulnérabilités"""
     
-    def __init__(self, repo_path: str, ollama_manager: OllamaManager):
+    def __init__(self, repo_path: str, ollama_manager: OllamaManager,
+                 max_concurrency: Optional[int] = None):
         """
         Initialise l'analyseur de dépôts
         
         Args:
             repo_path: Chemin du dépôt cloné localement
             ollama_manager: Gestionnaire de modèles Ollama
+            max_concurrency: Nombre de fichiers analysés simultanément
+                             (par défaut ANALYSIS_MAX_CONCURRENCY)
         """
         self.repo_path = repo_path
         self.ollama_manager = ollama_manager
+        self.max_concurrency = max(1, max_concurrency or ANALYSIS_MAX_CONCURRENCY)
         self.analysis_start_time = None
         self.analysis_end_time = None
+        self.index: Optional[RepositoryIndex] = None
+        self.path_classifier: Optional[PathClassifier] = None
+        # Ordre des modèles de la dernière analyse ordonnancée par modèle (None : fichier par fichier)
+        self.model_order: Optional[List[str]] = None
+    
+    def build_index(self) -> RepositoryIndex:
+        """
+        (Re)construit l'index du dépôt en un seul parcours
+        
+        Returns:
+            Index partagé par le contexte, la liste des fichiers et l'analyse
+        """
+        # Le code tiers et généré est écarté pendant le parcours
+        self.path_classifier = PathClassifier(self.repo_path) if ANALYSIS_EXCLUDE_VENDORED else None
+        with stage_timer("walk"):
+            self.index = RepositoryIndex.build(self.repo_path, self.detect_language, self.path_classifier)
+        if self.path_classifier is not None and self.path_classifier.excluded:
+            summary = self.path_classifier.summary()
+            logger.info(f"Code tiers ou généré exclu: {summary['directories']} dossier(s), "
+                        f"{summary['files']} fichier(s)")
+        return self.index
+    
+    def _get_index(self) -> RepositoryIndex:
+        """Retourne l'index du dépôt, construit à la première utilisation"""
+        if self.index is None:
+            self.build_index()
+        return self.index
     
     def get_repository_context(self) -> Dict[str, Any]:
         """
@@ -55,61 +117,57 @@ class RepositoryAnalyzer:
         }
         
         try:
-            # Analyser la structure du dépôt
-            for root, dirs, files in os.walk(self.repo_path):
-                # Ignorer .git et autres dossiers cachés
-                dirs[:] = [d for d in dirs if not d.startswith('.')]
+            # Analyser la structure du dépôt à partir de l'index (aucun nouveau parcours)
+            index = self._get_index()
+            for relative_path, metadata in index.files.items():
+                file = metadata["name"]
+                file_path = os.path.join(self.repo_path, relative_path)
                 
-                for file in files:
-                    if file.startswith('.'):
-                        continue
-                        
-                    file_path = os.path.join(root, file)
-                    relative_path = os.path.relpath(file_path, self.repo_path)
+                try:
+                    # Statistiques de base
+                    context["total_files"] += 1
+                    file_size = metadata["size"]
+                    context["total_size_bytes"] += file_size
                     
-                    try:
-                        # Statistiques de base
-                        context["total_files"] += 1
-                        file_size = os.path.getsize(file_path)
-                        context["total_size_bytes"] += file_size
-                        
-                        # Extension et type de fichier
-                        _, ext = os.path.splitext(file)
-                        if ext:
-                            context["file_types"][ext] = context["file_types"].get(ext, 0) + 1
-                        
-                        # Détection du langage
-                        language = self.detect_language(file)
-                        if language != "Inconnu":
-                            context["languages"][language] = context["languages"].get(language, 0) + 1
-                        
-                        # Compter les lignes de code pour les fichiers texte
-                        if self._is_text_file(file_path) and file_size < 1024 * 1024:  # < 1MB
-                            lines = self._count_lines_of_code(file_path)
-                            if lines > 0:
-                                context["lines_of_code"]["total"] += lines
-                                context["lines_of_code"]["by_language"][language] = \
-                                    context["lines_of_code"]["by_language"].get(language, 0) + lines
-                                context["lines_of_code"]["by_file_type"][ext or "no_extension"] = \
-                                    context["lines_of_code"]["by_file_type"].get(ext or "no_extension", 0) + lines
-                        
-                        # Détecter les fichiers de configuration importants
-                        if self._is_config_file(file):
-                            context["configuration_files"].append({
-                                "file": relative_path,
-                                "type": self._get_config_type(file),
-                                "size": file_size
-                            })
-                        
-                        # Analyser les dépendances
-                        if self._is_dependency_file(file):
-                            deps = self._parse_dependencies(file_path, file)
-                            if deps:
-                                context["dependencies"][file] = deps
-                                
-                    except Exception as e:
-                        logger.warning(f"Erreur lors de l'analyse du fichier {file_path}: {str(e)}")
-                        continue
+                    # Extension et type de fichier
+                    ext = metadata["ext"]
+                    if ext:
+                        context["file_types"][ext] = context["file_types"].get(ext, 0) + 1
+                    
+                    # Détection du langage
+                    language = metadata["language"]
+                    if language != "Inconnu":
+                        context["languages"][language] = context["languages"].get(language, 0) + 1
+                    
+                    # Compter les lignes de code pour les fichiers texte (lecture unique via l'index)
+                    if self._is_text_file(file_path) and file_size < 1024 * 1024:  # < 1MB
+                        if metadata["lines_of_code"] is None:
+                            index.get_content(relative_path)
+                        lines = metadata["lines_of_code"] or 0
+                        if lines > 0:
+                            context["lines_of_code"]["total"] += lines
+                            context["lines_of_code"]["by_language"][language] = \
+                                context["lines_of_code"]["by_language"].get(language, 0) + lines
+                            context["lines_of_code"]["by_file_type"][ext or "no_extension"] = \
+                                context["lines_of_code"]["by_file_type"].get(ext or "no_extension", 0) + lines
+                    
+                    # Détecter les fichiers de configuration importants
+                    if self._is_config_file(file):
+                        context["configuration_files"].append({
+                            "file": relative_path,
+                            "type": self._get_config_type(file),
+                            "size": file_size
+                        })
+                    
+                    # Analyser les dépendances
+                    if self._is_dependency_file(file):
+                        deps = self._parse_dependencies(file_path, file, index.get_content(relative_path))
+                        if deps:
+                            context["dependencies"][file] = deps
+                            
+                except Exception as e:
+                    logger.warning(f"Erreur lors de l'analyse du fichier {file_path}: {str(e)}")
+                    continue
             
             # Calculer les métriques de santé du dépôt
             context["repository_health"] = self._calculate_repository_health(context)
@@ -134,16 +192,7 @@ class RepositoryAnalyzer:
         """Compte les lignes de code (non vides, non commentaires)"""
         try:
             with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                lines = f.readlines()
-                
-            # Compter les lignes non vides et non commentaires
-            code_lines = 0
-            for line in lines:
-                stripped = line.strip()
-                if stripped and not stripped.startswith(('#', '//', '/*', '*', '--', '<!--')):
-                    code_lines += 1
-                    
-            return code_lines
+                return count_code_lines(f.read())
         except Exception:
             return 0
     
@@ -182,30 +231,32 @@ class RepositoryAnalyzer:
         dependency_files = {'package.json', 'requirements.txt', 'Gemfile', 'pom.xml', 'composer.json'}
         return filename.lower() in dependency_files
     
-    def _parse_dependencies(self, file_path: str, filename: str) -> List[Dict[str, str]]:
-        """Parse les dépendances depuis un fichier"""
+    def _parse_dependencies(self, file_path: str, filename: str, content: Optional[str] = None) -> List[Dict[str, str]]:
+        """Parse les dépendances depuis un fichier (ou depuis son contenu déjà lu)"""
         dependencies = []
         try:
-            if filename.lower() == 'package.json':
+            if content is None:
                 with open(file_path, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    deps = data.get('dependencies', {})
-                    dev_deps = data.get('devDependencies', {})
-                    for name, version in deps.items():
-                        dependencies.append({"name": name, "version": version, "type": "production"})
-                    for name, version in dev_deps.items():
-                        dependencies.append({"name": name, "version": version, "type": "development"})
+                    content = f.read()
+            
+            if filename.lower() == 'package.json':
+                data = json.loads(content)
+                deps = data.get('dependencies', {})
+                dev_deps = data.get('devDependencies', {})
+                for name, version in deps.items():
+                    dependencies.append({"name": name, "version": version, "type": "production"})
+                for name, version in dev_deps.items():
+                    dependencies.append({"name": name, "version": version, "type": "development"})
             
             elif filename.lower() == 'requirements.txt':
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    for line in f:
-                        line = line.strip()
-                        if line and not line.startswith('#'):
-                            if '==' in line:
-                                name, version = line.split('==', 1)
-                                dependencies.append({"name": name.strip(), "version": version.strip(), "type": "production"})
-                            else:
-                                dependencies.append({"name": line, "version": "*", "type": "production"})
+                for line in content.splitlines():
+                    line = line.strip()
+                    if line and not line.startswith('#'):
+                        if '==' in line:
+                            name, version = line.split('==', 1)
+                            dependencies.append({"name": name.strip(), "version": version.strip(), "type": "production"})
+                        else:
+                            dependencies.append({"name": line, "version": "*", "type": "production"})
         except Exception as e:
             logger.warning(f"Erreur lors du parsing des dépendances dans {file_path}: {str(e)}")
             
@@ -299,23 +350,42 @@ class RepositoryAnalyzer:
         """Obtient la structure des répertoires (2 niveaux max)"""
         structure = {}
         try:
-            for item in os.listdir(self.repo_path):
-                item_path = os.path.join(self.repo_path, item)
-                if os.path.isdir(item_path) and not item.startswith('.'):
-                    structure[item] = {
-                        "type": "directory",
-                        "files": len([f for f in os.listdir(item_path) if not f.startswith('.')]) if os.path.exists(item_path) else 0
-                    }
-                elif os.path.isfile(item_path) and not item.startswith('.'):
-                    structure[item] = {
-                        "type": "file",
-                        "size": os.path.getsize(item_path)
-                    }
+            index = self._get_index()
+            for directory, entries in index.directory_entries.items():
+                if directory and os.sep not in directory:
+                    structure[directory] = {"type": "directory", "files": entries}
+            for relative_path, metadata in index.files.items():
+                if os.sep not in relative_path:
+                    structure[relative_path] = {"type": "file", "size": metadata["size"]}
         except Exception as e:
             logger.warning(f"Erreur lors de la récupération de la structure: {str(e)}")
             
         return structure
     
+    def prioritize_files(self, file_list: List[str]) -> List[Dict[str, Any]]:
+        """
+        Classe les fichiers par score de risque (langage, chemin, point d'entrée, configuration, taille)
+        
+        Args:
+            file_list: Chemins relatifs des fichiers candidats
+            
+        Returns:
+            Liste {path, score, reasons} du plus au moins prioritaire
+        """
+        index = self._get_index()
+        
+        def metadata(relative_path: str) -> Dict[str, Any]:
+            entry = index.get(relative_path) or {}
+            name = os.path.basename(relative_path)
+            return {
+                "size": entry.get("size", 0),
+                "language": entry.get("language") or self.detect_language(relative_path),
+                "is_config": self._is_config_file(name),
+                "is_dependency": self._is_dependency_file(name)
+            }
+        
+        return rank_files(file_list, metadata)
+    
     def get_file_content(self, file_path: str) -> str:
         """
         Récupère le contenu d'un fichier
@@ -340,38 +410,16 @@ class RepositoryAnalyzer:
         Returns:
             Liste des chemins de fichiers (relatifs à la racine du dépôt)
         """
+        # Les répertoires et fichiers cachés (dont .git), le code tiers et généré sont déjà exclus de l'index
         file_list = []
-        for root, dirs, files in os.walk(self.repo_path):
-            # Ignorer explicitement .git et tous les répertoires cachés
-            if '.git' in dirs:
-                dirs.remove('.git')
-            
-            # Ignorer les autres répertoires cachés
-            dirs[:] = [d for d in dirs if not d.startswith('.')]
-            
-            for file in files:
-                # Ignorer les fichiers cachés et les fichiers non texte courants
-                if (not file.startswith('.') and 
-                    not file.endswith(('.exe', '.dll', '.so', '.bin', '.dat', '.zip', 
-                                    '.tar', '.gz', '.xz', '.pdf', '.jpg', '.png', '.gif'))):
-                    try:
-                        file_path = os.path.join(root, file)
-                        # Vérifier si le chemin contient .git (sécurité supplémentaire)
-                        if '.git' in file_path.split(os.sep):
-                            continue
-                            
-                        # Chemin relatif par rapport à la racine du dépôt
-                        relative_path = os.path.relpath(file_path, self.repo_path)
-                        
-                        # Vérifier si le fichier n'est pas trop volumineux avant de l'ajouter
-                        if os.path.getsize(file_path) < 1024 * 1024:  # Moins de 1 MB
-                            file_list.append(relative_path)
-                    except Exception as e:
-                        logger.warning(f"Erreur lors de l'accès au fichier {file_path}: {str(e)}")
-                        continue
+        for relative_path, metadata in self._get_index().files.items():
+            # Ignorer les fichiers non texte courants et ceux de plus de 1 MB
+            if (not metadata["name"].endswith(BINARY_EXTENSIONS) and
+                    metadata["size"] < 1024 * 1024):
+                file_list.append(relative_path)
         
         return file_list
-    
+
     def detect_language(self, file_path: str) -> str:
         """
         Détecte le langage de programmation d'un fichier en fonction de son extension
@@ -424,8 +472,10 @@ class RepositoryAnalyzer:
         Returns:
             Prompt pour le modèle LLM
         """
+        # Seule la dernière ligne dépend du fichier : le début du prompt reste un préfixe commun
+        # à toutes les requêtes, réutilisé par le cache d'Ollama (voir OllamaManager.build_messages)
         return f"""
-        Analysez le code {language} suivant pour identifier les vulnérabilités de sécurité, les mauvaises pratiques et les code smells.
+        Analysez le code suivant pour identifier les vulnérabilités de sécurité, les mauvaises pratiques et les code smells.
         Concentrez-vous sur les types de vulnérabilités suivants:
         1. Injection SQL
         2. Cross-site scripting (XSS)
@@ -452,6 +502,8 @@ class RepositoryAnalyzer:
         - recommandation: string
 
         Si aucune vulnérabilité n'est trouvée, retournez un tableau vide.
+
+        Langage du code à analyser : {language}
         """
     
     def _calculate_risk_score(self, vulnerabilities: List[Dict[str, Any]]) -> Dict[str, Any]:
@@ -872,16 +924,69 @@ class RepositoryAnalyzer:
         
         return insights
     
-    async def analyze_file(self, file_path: str, models: List[str]) -> Dict[str, Any]:
+    def _count_cache_usage(self, model_comparison: Dict[str, Any]) -> Dict[str, int]:
         """
-        Analyse un fichier pour les vulnérabilités avec plusieurs modèles
+        Compte les réponses servies par le cache LLM lors d'une comparaison de modèles
+        
+        Args:
+            model_comparison: Résultat de OllamaManager.compare_models
+            
+        Returns:
+            Nombre de hits et de misses du cache
+        """
+        usage = {"hits": 0, "misses": 0}
+        for result in model_comparison.get("results", {}).values():
+            from_cache = result.get("response", {}).get("from_cache")
+            if from_cache is True:
+                usage["hits"] += 1
+            elif from_cache is False:
+                usage["misses"] += 1
+        return usage
+    
+    def _count_token_usage(self, model_comparison: Dict[str, Any]) -> Dict[str, int]:
+        """Additionne les tokens consommés par tous les modèles pour un fichier (hors cache)"""
+        usage = {"prompt_tokens": 0, "completion_tokens": 0, "tokens_saved": 0}
+        for result in model_comparison.get("results", {}).values():
+            for key, value in result.get("response", {}).get("usage", {}).items():
+                if key in usage:
+                    usage[key] += value or 0
+        return usage
+    
+    def estimate_prompt_tokens(self, file_paths: Union[str, List[str]], models: List[str]) -> int:
+        """
+        Estime les tokens de prompt nécessaires à l'analyse d'un fichier par tous les modèles
+        
+        Args:
+            file_paths: Chemin du fichier (relatif à la racine du dépôt), ou fichiers
+                        d'un groupe analysés avec un seul prompt
+            models: Modèles utilisés
+            
+        Returns:
+            Nombre de tokens estimé (taille des fichiers et du prompt)
+        """
+        if isinstance(file_paths, str):
+            file_paths = [file_paths]
+        size = 0
+        for file_path in file_paths:
+            entry = self.index.get(file_path) if self.index is not None else None
+            size += entry["size"] if entry else os.path.getsize(os.path.join(self.repo_path, file_path))
+        packed = len(file_paths) > 1
+        if packed:
+            size += sum(section_overhead(file_path) for file_path in file_paths)
+        prompt = self.create_vulnerability_prompt(self.detect_language(file_paths[0]))
+        prompt_chars = self.ollama_manager.prompt_length(prompt, "", packed)
+        return int((size + prompt_chars) / CHARS_PER_TOKEN) * len(models)
+    
+    def _prepare_file(self, file_path: str) -> Dict[str, Any]:
+        """
+        Lit un fichier et applique le pré-filtre avant son envoi aux modèles
         
         Args:
             file_path: Chemin du fichier (relatif à la racine du dépôt)
-            models: Liste des modèles à utiliser
             
         Returns:
-            Résultats de l'analyse
+            Résultat final (avec "status") si le fichier n'est pas envoyé aux modèles,
+            sinon {file_path, language, content, prefilter}
         """
         full_path = os.path.join(self.repo_path, file_path)
         language = self.detect_language(file_path)
@@ -895,7 +1000,13 @@ class RepositoryAnalyzer:
                 "reason": "Langage non pris en charge"
             }
         
-        content = self.get_file_content(full_path)
+        with stage_timer("read"):
+            if self.index is not None and self.index.get(file_path) is not None:
+                # Contenu déjà lu lors du calcul du contexte : on le libère après usage
+                content = self.index.get_content(file_path)
+                self.index.release(file_path)
+            else:
+                content = self.get_file_content(full_path)
         
         # Ignorer les fichiers vides ou trop volumineux
         if not content:
@@ -906,120 +1017,815 @@ class RepositoryAnalyzer:
                 "reason": "Fichier vide"
             }
         
-        if len(content) > 50000:  # Limiter à 50KB
-            logger.info(f"Fichier {file_path} trop volumineux, tronqué pour l'analyse")
-            content = content[:50000] + "\n[Fichier tronqué...]"
+        # Pré-filtre : sans signal de risque, le fichier n'est pas envoyé aux modèles
+        # (les fichiers de configuration importants sont toujours analysés)
+        screening = None
+        if ANALYSIS_PREFILTER_ENABLED and not self._is_config_file(os.path.basename(file_path)):
+            with stage_timer("prefilter"):
+                screening = screen_file(file_path, language, content)
+            if not screening["analyze"]:
+                return prefiltered_result(file_path, language, screening)
+        
+        return {"file_path": file_path, "language": language, "content": content, "prefilter": screening}
+    
+    def _analyzed_result(self, prepared: Dict[str, Any], model_comparison: Dict[str, Any],
+                         vulnerabilities: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Résultat d'un fichier analysé par les modèles
+        
+        Args:
+            prepared: Fichier préparé (voir _prepare_file)
+            model_comparison: Résultat de OllamaManager.compare_models
+            vulnerabilities: Vulnérabilités du meilleur modèle pour ce fichier
+            
+        Returns:
+            Résultat du fichier (vulnérabilités complétées des informations du fichier)
+        """
+        file_path = prepared["file_path"]
+        language = prepared["language"]
+        content = prepared["content"]
+        best_model = model_comparison["best_model"]
+        best_result = model_comparison["results"][best_model]["response"]
+        # Aucun modèle n'a répondu (Ollama indisponible, délais dépassés...) : le fichier n'est pas
+        # "analysé", sinon une analyse incrémentale le reprendrait comme un fichier sans vulnérabilité
+        failed = all("error" in result for result in model_comparison["results"].values())
+        
+        # Formatter les vulnérabilités avec les informations du fichier
+        for vuln in vulnerabilities:
+            vuln["file_path"] = file_path
+            vuln["language"] = language
+            vuln["file_size"] = len(content)
+            vuln["lines_in_file"] = len(content.split('\n'))
+        
+        result = {
+            "file_path": file_path,
+            "language": language,
+            "status": "erreur" if failed else "analysé",
+            "best_model": best_model,
+            "model_scores": {model: result["quality_score"] for model, result in model_comparison["results"].items()},
+            # Utilisation du cache LLM et tokens consommés pour ce fichier
+            "llm_cache": self._count_cache_usage(model_comparison),
+            "llm_usage": self._count_token_usage(model_comparison),
+            "prefilter": prepared["prefilter"],
+            "vulnerabilities": vulnerabilities,
+            "file_stats": {
+                "size_bytes": len(content),
+                "lines_count": len(content.split('\n')),
+                "analysis_time": datetime.now().isoformat(),
+                "chunks": best_result.get("chunks")
+            }
+        }
+        if failed:
+            result["error"] = best_result.get("error") or "Échec de l'analyse par tous les modèles"
+        return result
+    
+    async def _analyze_prepared(self, prepared: Dict[str, Any], models: List[str]) -> Dict[str, Any]:
+        """Analyse un fichier préparé (voir _prepare_file) avec plusieurs modèles"""
+        file_path = prepared["file_path"]
+        
+        # Les gros fichiers sont découpés en morceaux par OllamaManager.analyze_code
         
         # Créer le prompt pour l'analyse
-        prompt = self.create_vulnerability_prompt(language)
+        with stage_timer("prompt"):
+            prompt = self.create_vulnerability_prompt(prepared["language"])
         
         # Comparer les modèles
         try:
-            model_comparison = await self.ollama_manager.compare_models(models, content, prompt)
+            model_comparison = await self.ollama_manager.compare_models(models, prepared["content"], prompt)
             
             # Récupérer les résultats du meilleur modèle
             best_model = model_comparison["best_model"]
             best_result = model_comparison["results"][best_model]["response"]
-            
-            # Si le meilleur modèle a renvoyé une liste de vulnérabilités
-            vulnerabilities = best_result.get("vulnerabilities", [])
-            
-            if vulnerabilities:
-                # Formatter les vulnérabilités avec les informations du fichier
-                for vuln in vulnerabilities:
-                    vuln["file_path"] = file_path
-                    vuln["language"] = language
-                    vuln["file_size"] = len(content)
-                    vuln["lines_in_file"] = len(content.split('\n'))
-                
-                return {
-                    "file_path": file_path,
-                    "language": language,
-                    "status": "analysé",
-                    "best_model": best_model,
-                    "model_scores": {model: result["quality_score"] for model, result in model_comparison["results"].items()},
-                    "vulnerabilities": vulnerabilities,
-                    "file_stats": {
-                        "size_bytes": len(content),
-                        "lines_count": len(content.split('\n')),
-                        "analysis_time": datetime.now().isoformat()
-                    }
-                }
-            else:
-                # Si aucune vulnérabilité n'a été trouvée
-                return {
-                    "file_path": file_path,
-                    "language": language,
-                    "status": "analysé",
-                    "best_model": best_model,
-                    "model_scores": {model: result["quality_score"] for model, result in model_comparison["results"].items()},
-                    "vulnerabilities": [],
-                    "file_stats": {
-                        "size_bytes": len(content),
-                        "lines_count": len(content.split('\n')),
-                        "analysis_time": datetime.now().isoformat()
-                    }
-                }
+            return self._analyzed_result(prepared, model_comparison, best_result.get("vulnerabilities", []))
                 
         except Exception as e:
             logger.error(f"Erreur lors de l'analyse du fichier {file_path}: {str(e)}")
             return {
                 "file_path": file_path,
-                "language": language,
+                "language": prepared["language"],
                 "status": "erreur",
                 "error": str(e)
             }
     
+    async def analyze_file(self, file_path: str, models: List[str]) -> Dict[str, Any]:
+        """
+        Analyse un fichier pour les vulnérabilités avec plusieurs modèles
+        
+        Args:
+            file_path: Chemin du fichier (relatif à la racine du dépôt)
+            models: Liste des modèles à utiliser
+            
+        Returns:
+            Résultats de l'analyse
+        """
+        prepared = self._prepare_file(file_path)
+        if "status" in prepared:
+            return prepared
+        return await self._analyze_prepared(prepared, models)
+    
+    def _build_job(self, file_paths: List[str]) -> Dict[str, Any]:
+        """
+        Prépare une unité d'analyse (fichier seul ou groupe de petits fichiers)
+        
+        Args:
+            file_paths: Fichiers de l'unité (relatifs à la racine du dépôt)
+            
+        Returns:
+            {prepared, members, packed, prompt, code, sections} : members sont les
+            fichiers envoyés aux modèles (vide si aucun), code le code envoyé
+            (en sections délimitées si packed)
+        """
+        return self._job_from_prepared([self._prepare_file(file_path) for file_path in file_paths])
+    
+    def _job_from_prepared(self, prepared: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Unité d'analyse à partir de fichiers déjà préparés (voir _build_job)"""
+        members = [item for item in prepared if "status" not in item]
+        job = {"prepared": prepared, "members": members, "packed": len(members) > 1}
+        if members:
+            with stage_timer("prompt"):
+                job["prompt"] = self.create_vulnerability_prompt(members[0]["language"])
+                if job["packed"]:
+                    job["code"], job["sections"] = build_packed_code(members)
+                else:
+                    job["code"] = members[0]["content"]
+        return job
+    
+    async def _analyze_separately(self, job: Dict[str, Any], models: List[str]) -> List[Dict[str, Any]]:
+        """Analyse chaque fichier d'une unité avec son propre prompt"""
+        analyzed = iter(await asyncio.gather(*(self._analyze_prepared(item, models) for item in job["members"])))
+        return [item if "status" in item else next(analyzed) for item in job["prepared"]]
+    
+    async def _job_results(self, job: Dict[str, Any], model_comparison: Dict[str, Any],
+                           models: List[str], retry_separately: bool = True) -> List[Dict[str, Any]]:
+        """
+        Résultats par fichier d'une unité à partir de la comparaison des modèles
+        
+        Pour un groupe, les vulnérabilités du meilleur modèle sont rattachées
+        à leur fichier et à ses numéros de ligne (voir
+        prompt_packer.split_packed_result), ou au premier fichier du groupe
+        avec une attribution incertaine ; si l'analyse groupée a échoué,
+        chaque fichier est analysé seul.
+        
+        Args:
+            job: Unité d'analyse (voir _build_job)
+            model_comparison: Comparaison des modèles pour le code de l'unité
+            models: Liste des modèles utilisés
+            retry_separately: Analyser chaque fichier seul si l'analyse groupée a échoué
+                              (sinon chaque fichier reçoit le résultat en erreur)
+            
+        Returns:
+            Résultats de l'analyse, dans l'ordre des fichiers de l'unité
+        """
+        members = job["members"]
+        best_result = model_comparison["results"][model_comparison["best_model"]]["response"]
+        if not job["packed"]:
+            analyzed = {
+                item["file_path"]: self._analyzed_result(item, model_comparison, best_result.get("vulnerabilities", []))
+                for item in members
+            }
+            return [analyzed.get(item["file_path"], item) for item in job["prepared"]]
+        if "error" in best_result:
+            if not retry_separately:
+                analyzed = {item["file_path"]: self._analyzed_result(item, model_comparison, []) for item in members}
+                return [analyzed.get(item["file_path"], item) for item in job["prepared"]]
+            logger.warning(f"Échec de l'analyse groupée de {len(members)} fichiers ({best_result['error']}), "
+                           f"analyse fichier par fichier")
+            return await self._analyze_separately(job, models)
+        
+        by_file, unattributed = split_packed_result(best_result.get("vulnerabilities", []), job["sections"])
+        if unattributed:
+            logger.warning(f"{unattributed} vulnérabilité(s) sans fichier identifiable dans l'analyse groupée "
+                           f"de {', '.join(item['file_path'] for item in members)}, rattachée(s) au premier fichier "
+                           f"avec une attribution incertaine")
+        
+        # Prompts que les fichiers auraient nécessités un par un, moins le prompt groupé (estimation)
+        prompt = job["prompt"]
+        separate_chars = sum(self.ollama_manager.prompt_length(prompt, item["content"]) for item in members)
+        packed_chars = self.ollama_manager.prompt_length(prompt, job["code"], packed=True)
+        prompt_tokens_saved = max(0, int((separate_chars - packed_chars) / CHARS_PER_TOKEN)) * len(models)
+        
+        analyzed = {}
+        for position, item in enumerate(members, start=1):
+            result = self._analyzed_result(item, model_comparison, by_file[item["file_path"]])
+            result["packed"] = {"files": len(members), "position": position}
+            if position == 1:
+                result["packed"].update({"unattributed": unattributed, "prompt_tokens_saved": prompt_tokens_saved})
+            else:
+                # Le cache et les tokens du groupe ne sont comptés qu'une fois, sur son premier fichier
+                result.pop("llm_cache", None)
+                result.pop("llm_usage", None)
+            analyzed[item["file_path"]] = result
+        return [analyzed.get(item["file_path"], item) for item in job["prepared"]]
+    
+    async def analyze_file_pack(self, file_paths: List[str], models: List[str]) -> List[Dict[str, Any]]:
+        """
+        Analyse plusieurs petits fichiers d'un même langage avec un seul prompt par modèle
+        
+        Les fichiers écartés par le pré-filtre ne font pas partie du prompt.
+        Les vulnérabilités du meilleur modèle sont rattachées à leur fichier
+        et à ses numéros de ligne (voir _job_results). Si l'analyse groupée
+        échoue, chaque fichier est analysé seul.
+        
+        Args:
+            file_paths: Fichiers du groupe (relatifs à la racine du dépôt)
+            models: Liste des modèles à utiliser
+            
+        Returns:
+            Résultats de l'analyse, dans l'ordre de file_paths
+        """
+        job = self._build_job(file_paths)
+        if not job["packed"]:
+            return await self._analyze_separately(job, models)
+        try:
+            model_comparison = await self.ollama_manager.compare_models(models, job["code"], job["prompt"], packed=True)
+        except Exception as e:
+            logger.warning(f"Échec de l'analyse groupée de {len(job['members'])} fichiers ({str(e)}), "
+                           f"analyse fichier par fichier")
+            return await self._analyze_separately(job, models)
+        return await self._job_results(job, model_comparison, models)
+    
+    async def _plan_units(self, file_list: List[str], models: List[str]) -> List[List[str]]:
+        """
+        Répartit les fichiers en unités d'analyse : un fichier seul ou un groupe de petits fichiers
+        
+        Les fichiers d'au plus ANALYSIS_PACK_MAX_FILE_BYTES octets sont regroupés
+        par langage (voir prompt_packer.plan_packs), dans la limite de
+        ANALYSIS_PACK_MAX_TOKENS tokens de code et du contexte de chaque modèle.
+        
+        Args:
+            file_list: Fichiers à analyser, du plus au moins prioritaire
+            models: Liste des modèles à utiliser
+            
+        Returns:
+            Unités d'analyse, dans l'ordre de leur premier fichier
+        """
+        if not ANALYSIS_PACKING_ENABLED or not models:
+            return [[file_path] for file_path in file_list]
+        
+        index = self._get_index()
+        candidates = []
+        for file_path in file_list:
+            metadata = index.get(file_path)
+            language = self.detect_language(file_path)
+            if metadata is not None and language != 'Inconnu' and metadata["size"] <= ANALYSIS_PACK_MAX_FILE_BYTES:
+                candidates.append({"path": file_path, "language": language, "size": metadata["size"]})
+        if len(candidates) < 2:
+            return [[file_path] for file_path in file_list]
+        
+        max_chars = int(ANALYSIS_PACK_MAX_TOKENS * CHARS_PER_TOKEN)
+        for language in {candidate["language"] for candidate in candidates}:
+            prompt = self.create_vulnerability_prompt(language)
+            for model in models:
+                max_chars = min(max_chars, await self.ollama_manager.get_max_code_chars(model, prompt, packed=True))
+        
+        pack_of = {}
+        for pack in plan_packs(candidates, max_chars, ANALYSIS_PACK_MAX_FILES):
+            for file_path in pack:
+                pack_of[file_path] = pack
+        units = []
+        for file_path in file_list:
+            pack = pack_of.get(file_path, [file_path])
+            if pack[0] == file_path:
+                units.append(pack)
+        packed_files = sum(len(unit) for unit in units if len(unit) > 1)
+        if packed_files:
+            logger.info(f"{packed_files} petit(s) fichier(s) regroupé(s) en "
+                        f"{len([unit for unit in units if len(unit) > 1])} prompt(s)")
+        return units
+    
+    async def _analyze_unit(self, file_paths: List[str], models: List[str]) -> List[Dict[str, Any]]:
+        """Analyse une unité (fichier seul ou groupe de petits fichiers)"""
+        if len(file_paths) == 1:
+            with stage_timer("analyze_file"):
+                return [await self.analyze_file(file_paths[0], models)]
+        with stage_timer("analyze_pack"):
+            return await self.analyze_file_pack(file_paths, models)
+    
+    async def _evaluate_job(self, job: Dict[str, Any], model: str,
+                            budget: Optional[ScanBudget] = None) -> Dict[str, Any]:
+        """
+        Analyse le code d'une unité avec un seul modèle, dans la limite du budget
+        
+        Returns:
+            Résultat du modèle (structure de compare_models["results"][model]) ;
+            budget_skipped ou timed_out si le budget n'a pas permis l'analyse
+        """
+        async def evaluate() -> Dict[str, Any]:
+            comparison = await self.ollama_manager.compare_models([model], job["code"], job["prompt"],
+                                                                  packed=job["packed"])
+            return comparison["results"][model]
+        
+        def failed(error: str, **flags) -> Dict[str, Any]:
+            return {"error": error, "quality_score": 0.0, **flags, "response": {"error": error, "vulnerabilities": []}}
+        
+        if budget is None:
+            return await evaluate()
+        
+        exhausted = budget.check()
+        if exhausted:
+            return failed(f"Budget d'analyse épuisé ({exhausted})", budget_skipped=True)
+        file_paths = [item["file_path"] for item in job["members"]]
+        estimated_tokens = self.estimate_prompt_tokens(file_paths, [model])
+        if not budget.reserve(estimated_tokens):
+            return failed("Budget de tokens insuffisant pour ce fichier", budget_skipped=True)
+        
+        timeout = budget.file_timeout()
+        usage = {}
+        try:
+            evaluation = await asyncio.wait_for(evaluate(), timeout=timeout)
+            usage = dict(evaluation["response"].get("usage", {}))
+            if evaluation["response"].get("from_cache") is False and not usage.get("prompt_tokens"):
+                # Compteurs absents de la réponse Ollama : s'en tenir à l'estimation
+                usage["prompt_tokens"] = estimated_tokens
+            return evaluation
+        except asyncio.TimeoutError:
+            limit = "budget de temps" if budget.check() == BUDGET_TIME else "latence maximale par fichier"
+            logger.warning(f"Analyse de {', '.join(file_paths)} par {model} interrompue après {timeout:.1f}s ({limit})")
+            return failed(f"Délai d'analyse dépassé ({limit}, {timeout:.1f}s)", timed_out=True)
+        finally:
+            budget.settle(estimated_tokens, usage.get("prompt_tokens", 0), usage.get("completion_tokens", 0))
+    
+    async def _analyze_files_by_model(self,
+                                      file_list: List[str],
+                                      models: List[str],
+                                      progress_callback: Optional[Callable[[float], None]] = None,
+                                      result_callback: Optional[Callable[[Dict[str, Any]], None]] = None,
+                                      budget: Optional[ScanBudget] = None) -> List[Dict[str, Any]]:
+        """
+        Analyse une liste de fichiers modèle par modèle (OLLAMA_SCHEDULING = "model")
+        
+        Toutes les unités passent par un premier modèle, puis par le suivant :
+        un hôte Ollama qui ne peut garder tous les modèles en mémoire ne les
+        décharge et recharge plus à chaque fichier. Les modèles déjà chargés
+        (/api/ps) passent en premier et chaque modèle est déchargé à la fin de
+        son passage. Les résultats de chaque modèle sont réunis par unité dans
+        la structure de compare_models, et chaque unité est transmise dès sa
+        dernière analyse terminée, pendant le dernier passage. Un groupe de
+        petits fichiers en échec avec un modèle (sans résultat d'un passage
+        précédent) est réanalysé fichier par fichier dans le même passage et
+        les suivants.
+        
+        Args:
+            file_list: Fichiers à analyser (relatifs à la racine du dépôt)
+            models: Liste des modèles à utiliser
+            progress_callback: Fonction de rappel appelée après chaque requête terminée
+            result_callback: Fonction de rappel recevant chaque résultat par fichier
+            budget: Budget de temps et de tokens de l'analyse
+            
+        Returns:
+            Résultats d'analyse, dans le même ordre que file_list
+        """
+        results: List[Optional[Dict[str, Any]]] = [None] * len(file_list)
+        positions = {file_path: index for index, file_path in enumerate(file_list)}
+        
+        def record(unit_results: List[Dict[str, Any]]):
+            for result in unit_results:
+                results[positions[result["file_path"]]] = result
+                ANALYSIS_FILES.inc(status=result.get("reason") or result["status"])
+                if result_callback:
+                    result_callback(result)
+        
+        jobs = []
+        for unit in await self._plan_units(file_list, models):
+            job = self._build_job(unit)
+            if job["members"]:
+                jobs.append(job)
+            else:
+                record(job["prepared"])
+        
+        self.model_order = await self.ollama_manager.order_models_by_residency(models)
+        pass_count = len(self.model_order)
+        worker_count = max(1, min(self.max_concurrency, len(jobs)))
+        logger.info(f"Analyse de {len(file_list)} fichiers modèle par modèle ({' puis '.join(self.model_order)}), "
+                    f"{len(jobs)} requêtes par modèle avec {worker_count} worker(s) en parallèle")
+        
+        # Résultat de chaque modèle par unité
+        evaluations: List[Dict[str, Dict[str, Any]]] = [{} for _ in jobs]
+        # Groupes remplacés par l'analyse séparée de leurs fichiers (voir split_job)
+        split: set = set()
+        completed = 0
+        total = len(jobs) * pass_count
+        progress = 0.0
+        
+        async def finish(index: int):
+            """Réunit les résultats des modèles pour une unité (structure de compare_models) et la transmet"""
+            job, evaluation = jobs[index], evaluations[index]
+            try:
+                if all(e.get("budget_skipped") for e in evaluation.values()):
+                    reason = next(iter(evaluation.values()))["error"]
+                    record([item if "status" in item else self._budget_skipped_result(item["file_path"], reason)
+                            for item in job["prepared"]])
+                    return
+                if all(e.get("timed_out") for e in evaluation.values()):
+                    error = next(iter(evaluation.values()))["error"]
+                    record([item if "status" in item else {
+                        "file_path": item["file_path"],
+                        "language": item["language"],
+                        "status": "erreur",
+                        "error": error,
+                        "timed_out": True
+                    } for item in job["prepared"]])
+                    return
+                model_comparison = self.ollama_manager.join_model_results(models, evaluation)
+                record(await self._job_results(job, model_comparison, models, retry_separately=False))
+            except Exception as e:
+                file_paths = [item["file_path"] for item in job["prepared"]]
+                logger.error(f"Erreur inattendue lors de l'analyse de {', '.join(file_paths)}: {str(e)}")
+                record([{
+                    "file_path": file_path,
+                    "language": self.detect_language(file_path),
+                    "status": "erreur",
+                    "error": str(e)
+                } for file_path in file_paths])
+        
+        for pass_index, model in enumerate(self.model_order):
+            last_pass = pass_index == pass_count - 1
+            queue: asyncio.Queue = asyncio.Queue()
+            for index in range(len(jobs)):
+                if index not in split:
+                    queue.put_nowait(index)
+            
+            def split_job(index: int):
+                """Remplace un groupe en échec par l'analyse de chacun de ses fichiers, dès ce passage"""
+                nonlocal total
+                job = jobs[index]
+                logger.warning(f"Échec de l'analyse groupée de {len(job['members'])} fichiers avec {model} "
+                               f"({evaluations[index][model]['error']}), analyse fichier par fichier")
+                split.add(index)
+                # Les passages précédents (en échec) restent attribués à chaque fichier
+                earlier = {name: e for name, e in evaluations[index].items() if name != model}
+                for item in job["prepared"]:
+                    if "status" in item:
+                        record([item])
+                        continue
+                    jobs.append(self._job_from_prepared([item]))
+                    evaluations.append(dict(earlier))
+                    queue.put_nowait(len(jobs) - 1)
+                remaining = pass_count - pass_index
+                total += len(job["members"]) * remaining - (remaining - 1)
+            
+            async def worker():
+                nonlocal completed, progress
+                while True:
+                    index = await queue.get()
+                    try:
+                        job = jobs[index]
+                        try:
+                            with stage_timer("analyze_model"):
+                                evaluation = await self._evaluate_job(job, model, budget)
+                        except Exception as e:
+                            logger.error(f"Erreur inattendue lors de l'analyse par {model}: {str(e)}")
+                            evaluation = {"error": str(e), "quality_score": 0.0,
+                                          "response": {"error": str(e), "vulnerabilities": []}}
+                        evaluations[index][model] = evaluation
+                        completed += 1
+                        if job["packed"] and "error" in evaluation and not evaluation.get("budget_skipped") \
+                                and not evaluation.get("timed_out") \
+                                and all("error" in e for e in evaluations[index].values()):
+                            split_job(index)
+                        elif last_pass:
+                            await finish(index)
+                        if progress_callback:
+                            progress = max(progress, min(1.0, completed / total))
+                            progress_callback(progress)
+                    finally:
+                        queue.task_done()
+            
+            workers = [asyncio.create_task(worker()) for _ in range(worker_count)]
+            try:
+                with stage_timer("model_pass"):
+                    await queue.join()
+            finally:
+                for task in workers:
+                    task.cancel()
+                await asyncio.gather(*workers, return_exceptions=True)
+            if not last_pass:
+                # Libérer la mémoire pour le modèle suivant ; le dernier reste chargé (keep_alive)
+                await self.ollama_manager.unload_model(model)
+        return results
+    
+    async def _analyze_files_concurrently(self, 
+                                          file_list: List[str], 
+                                          models: List[str],
+                                          progress_callback: Optional[Callable[[float], None]] = None,
+                                          result_callback: Optional[Callable[[Dict[str, Any]], None]] = None,
+                                          budget: Optional[ScanBudget] = None) -> List[Dict[str, Any]]:
+        """
+        Analyse une liste de fichiers avec un pool borné de workers
+        
+        Les requêtes vers chaque modèle restent en plus limitées par
+        OllamaManager (voir get_model_limit). Les petits fichiers d'un même
+        langage sont analysés ensemble (voir _plan_units). Avec
+        OLLAMA_SCHEDULING = "model", l'analyse se fait modèle par modèle
+        (voir _analyze_files_by_model). Avec un budget,
+        aucune nouvelle analyse n'est lancée une fois le budget épuisé et
+        chaque analyse est interrompue au-delà de sa latence maximale.
+        
+        Args:
+            file_list: Fichiers à analyser (relatifs à la racine du dépôt)
+            models: Liste des modèles à utiliser
+            progress_callback: Fonction de rappel appelée après chaque fichier terminé
+            result_callback: Fonction de rappel recevant chaque résultat dès qu'il est disponible
+            budget: Budget de temps et de tokens de l'analyse
+            
+        Returns:
+            Résultats d'analyse, dans le même ordre que file_list
+        """
+        results: List[Optional[Dict[str, Any]]] = [None] * len(file_list)
+        if not file_list:
+            return []
+        if OLLAMA_SCHEDULING == "model" and len(models) > 1:
+            return await self._analyze_files_by_model(file_list, models, progress_callback, result_callback, budget)
+        
+        positions = {file_path: index for index, file_path in enumerate(file_list)}
+        units = await self._plan_units(file_list, models)
+        queue: asyncio.Queue = asyncio.Queue()
+        for unit in units:
+            queue.put_nowait(unit)
+        
+        completed = 0
+        worker_count = min(self.max_concurrency, len(units))
+        logger.info(f"Analyse de {len(file_list)} fichiers ({len(units)} requêtes par modèle) "
+                    f"avec {worker_count} worker(s) en parallèle")
+        
+        async def worker():
+            nonlocal completed
+            while True:
+                try:
+                    unit = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                try:
+                    if budget is None:
+                        unit_results = await self._analyze_unit(unit, models)
+                    else:
+                        unit_results = await self._analyze_unit_within_budget(unit, models, budget)
+                except Exception as e:
+                    logger.error(f"Erreur inattendue lors de l'analyse de {', '.join(unit)}: {str(e)}")
+                    unit_results = [{
+                        "file_path": file_path,
+                        "language": self.detect_language(file_path),
+                        "status": "erreur",
+                        "error": str(e)
+                    } for file_path in unit]
+                for result in unit_results:
+                    results[positions[result["file_path"]]] = result
+                    completed += 1
+                    ANALYSIS_FILES.inc(status=result.get("reason") or result["status"])
+                    
+                    if result_callback:
+                        result_callback(result)
+                    
+                    # Mettre à jour la progression
+                    if progress_callback:
+                        progress_callback(completed / len(file_list))
+        
+        await asyncio.gather(*(worker() for _ in range(worker_count)))
+        return results
+    
+    def _read_remaining_files(self):
+        """
+        Lit les fichiers texte pas encore lus, pour le scanner de secrets
+
+        Tous les fichiers de l'index sont concernés, y compris les fichiers
+        cachés et ceux qui ne sont pas retenus pour l'analyse, hors binaires et
+        fichiers de plus de SECRET_SCAN_MAX_FILE_BYTES.
+        """
+        index = self._get_index()
+        for files in (index.files, index.hidden_files):
+            for relative_path, metadata in files.items():
+                if (metadata["sha256"] is None and not metadata["name"].lower().endswith(BINARY_EXTENSIONS)
+                        and metadata["size"] <= SECRET_SCAN_MAX_FILE_BYTES):
+                    index.get_content(relative_path)
+
+    def _group_identical_files(self, file_list: List[str]) -> Dict[str, str]:
+        """
+        Regroupe les fichiers au contenu identique (même empreinte SHA-256 et même langage)
+        
+        Args:
+            file_list: Fichiers à analyser, du plus au moins prioritaire
+            
+        Returns:
+            Correspondance fichier dupliqué -> fichier analysé à sa place (le plus prioritaire du groupe)
+        """
+        index = self._get_index()
+        representatives = {}
+        duplicates = {}
+        for file_path in file_list:
+            metadata = index.get(file_path)
+            if metadata is None:
+                continue
+            if metadata["sha256"] is None:
+                # Fichier non lu pour le contexte : lu maintenant, son contenu reste conservé pour l'analyse
+                index.get_content(file_path)
+                if metadata["sha256"] is None:
+                    continue
+            key = (metadata["sha256"], metadata["language"])
+            if key in representatives:
+                duplicates[file_path] = representatives[key]
+                index.release(file_path)
+            else:
+                representatives[key] = file_path
+        return duplicates
+    
+    def _duplicate_result(self, result: Dict[str, Any], file_path: str, original_path: str) -> Dict[str, Any]:
+        """Reporte le résultat d'un fichier sur un fichier au contenu identique"""
+        duplicate = copy.deepcopy(result)
+        duplicate["file_path"] = file_path
+        duplicate["duplicate_of"] = original_path
+        for vuln in duplicate.get("vulnerabilities", []):
+            vuln["file_path"] = file_path
+        # Le cache et les tokens ne sont comptés qu'une fois, sur le fichier analysé
+        duplicate.pop("llm_cache", None)
+        duplicate.pop("llm_usage", None)
+        return duplicate
+    
+    def _budget_skipped_result(self, file_path: str, reason: str) -> Dict[str, Any]:
+        """Résultat d'un fichier non analysé faute de budget"""
+        if self.index is not None:
+            self.index.release(file_path)
+        return {
+            "file_path": file_path,
+            "language": self.detect_language(file_path),
+            "status": "ignoré",
+            "reason": reason,
+            "budget_skipped": True
+        }
+    
+    async def _analyze_unit_within_budget(self, file_paths: List[str], models: List[str],
+                                          budget: ScanBudget) -> List[Dict[str, Any]]:
+        """Analyse un fichier ou un groupe de petits fichiers si le budget le permet, en bornant sa durée"""
+        exhausted = budget.check()
+        if exhausted:
+            return [self._budget_skipped_result(f, f"Budget d'analyse épuisé ({exhausted})") for f in file_paths]
+        
+        estimated_tokens = self.estimate_prompt_tokens(file_paths, models)
+        if not budget.reserve(estimated_tokens):
+            return [self._budget_skipped_result(f, "Budget de tokens insuffisant pour ce fichier") for f in file_paths]
+        
+        timeout = budget.file_timeout()
+        usage = {}
+        try:
+            results = await asyncio.wait_for(self._analyze_unit(file_paths, models), timeout=timeout)
+            for result in results:
+                for key, value in result.get("llm_usage", {}).items():
+                    usage[key] = usage.get(key, 0) + value
+            misses = sum(result.get("llm_cache", {}).get("misses", 0) for result in results)
+            if misses and not usage.get("prompt_tokens"):
+                # Compteurs absents de la réponse Ollama : s'en tenir à l'estimation
+                usage["prompt_tokens"] = estimated_tokens * misses // max(len(models), 1)
+            return results
+        except asyncio.TimeoutError:
+            limit = "budget de temps" if budget.check() == BUDGET_TIME else "latence maximale par fichier"
+            logger.warning(f"Analyse de {', '.join(file_paths)} interrompue après {timeout:.1f}s ({limit})")
+            return [{
+                "file_path": file_path,
+                "language": self.detect_language(file_path),
+                "status": "erreur",
+                "error": f"Délai d'analyse dépassé ({limit}, {timeout:.1f}s)",
+                "timed_out": True
+            } for file_path in file_paths]
+        finally:
+            budget.settle(estimated_tokens, usage.get("prompt_tokens", 0), usage.get("completion_tokens", 0))
+    
+    def _summarize_packing(self, results: List[Dict[str, Any]], models: List[str]) -> Dict[str, Any]:
+        """Regroupement des petits fichiers : groupes envoyés, requêtes et tokens de prompt épargnés"""
+        packed = [r["packed"] for r in results if r.get("packed") and not r.get("reused") and not r.get("duplicate_of")]
+        leaders = [p for p in packed if p["position"] == 1]
+        return {
+            "enabled": ANALYSIS_PACKING_ENABLED,
+            "packs": len(leaders),
+            "files_packed": len(packed),
+            "requests_saved": (len(packed) - len(leaders)) * len(models),
+            # Instructions et format de réponse répétés dans chaque prompt individuel (estimation)
+            "prompt_tokens_saved": sum(p.get("prompt_tokens_saved", 0) for p in leaders),
+            # Vulnérabilités rattachées au premier fichier de leur groupe, faute de fichier identifiable
+            "unattributed_vulnerabilities": sum(p.get("unattributed", 0) for p in leaders)
+        }
+    
+    def _summarize_budget(self, budget: Optional[ScanBudget],
+                          results: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Consommation du budget et couverture obtenue (enabled False sans budget)"""
+        if budget is None:
+            return {"enabled": False}
+        analyzed = len([r for r in results if r.get("status") == "analysé"])
+        return {
+            "enabled": True,
+            **budget.summary(),
+            "files_selected": len(results),
+            "files_analyzed": analyzed,
+            "files_skipped": len([r for r in results if r.get("budget_skipped")]),
+            "files_timed_out": len([r for r in results if r.get("timed_out")]),
+            "coverage": round(analyzed / max(len(results), 1) * 100, 1)
+        }
+    
     async def analyze_repository(self, 
                                models: List[str], 
-                               progress_callback: Optional[Callable[[float], None]] = None) -> Dict[str, Any]:
+                               progress_callback: Optional[Callable[[float], None]] = None,
+                               previous_results: Optional[List[Dict[str, Any]]] = None,
+                               changed_files: Optional[List[str]] = None,
+                               result_callback: Optional[Callable[[Dict[str, Any]], None]] = None,
+                               budget: Optional[ScanBudget] = None) -> Dict[str, Any]:
         """
         Analyse l'ensemble du dépôt pour les vulnérabilités
         
+        En mode incrémental (previous_results et changed_files fournis), seuls les
+        fichiers modifiés ou absents de l'analyse précédente passent par
+        analyze_file ; les résultats des autres fichiers sont repris tels quels.
+        
+        Avec un budget, l'analyse s'arrête de lancer de nouveaux fichiers une fois
+        le budget épuisé : le résultat reste complet et cohérent, les fichiers non
+        analysés étant marqués "ignoré" avec budget_skipped.
+        
         Args:
             models: Liste des modèles à utiliser
             progress_callback: Fonction de rappel pour suivre la progression
+            previous_results: Résultats par fichier de l'analyse précédente (file_results)
+            changed_files: Fichiers modifiés depuis l'analyse précédente
+            result_callback: Fonction de rappel recevant chaque résultat par fichier
+                             (y compris les résultats repris) dès qu'il est disponible
+            budget: Budget de fichiers, de temps et de tokens de l'analyse
             
         Returns:
             Résultats de l'analyse pour l'ensemble du dépôt
         """
         self.analysis_start_time = datetime.now()
         
-        # Récupérer le contexte du dépôt
-        repository_context = self.get_repository_context()
-        
+        # Parcourir le dépôt une seule fois : contexte, liste des fichiers et analyse partagent l'index
+        self.build_index()
         file_list = self.get_file_list()
+        total_files_found = len(file_list)
         logger.info(f"Analyse de {len(file_list)} fichiers dans le dépôt")
         
-        # Limiter le nombre de fichiers pour les grands dépôts
-        max_files = 100
-        if len(file_list) > max_files:
-            logger.warning(f"Dépôt trop volumineux, limitation à {max_files} fichiers")
-            file_list = file_list[:max_files]
-        
-        # Analyser les fichiers les plus susceptibles de contenir des vulnérabilités en premier
-        priority_extensions = ['.py', '.js', '.php', '.java', '.rb', '.go', '.cs', '.ts']
-        file_list.sort(key=lambda f: os.path.splitext(f)[1] in priority_extensions, reverse=True)
+        # Classer tous les fichiers par risque, puis réserver le budget aux plus prioritaires
+        ranked_files = self.prioritize_files(file_list)
+        max_files = min(ANALYSIS_MAX_FILES, budget.max_files or ANALYSIS_MAX_FILES) if budget else ANALYSIS_MAX_FILES
+        if len(ranked_files) > max_files:
+            logger.warning(f"Dépôt trop volumineux, limitation aux {max_files} fichiers les plus prioritaires")
+        selected_files = ranked_files[:max_files]
+        file_list = [item["path"] for item in selected_files]
+        file_selection = {
+            "strategy": "risk_score",
+            "candidates": len(ranked_files),
+            "selected": len(selected_files),
+            "dropped": len(ranked_files) - len(selected_files),
+            "min_selected_score": selected_files[-1]["score"] if selected_files else None,
+            "top_files": [{"path": item["path"], "score": item["score"], "reasons": item["reasons"]}
+                          for item in selected_files[:10]]
+        }
         
-        results = []
         all_vulnerabilities = []
         model_performance = {model: {"analyses": 0, "total_score": 0.0, "errors": 0} for model in models}
         
-        # Limiter la concurrence pour éviter de surcharger Ollama
-        semaphore = asyncio.Semaphore(1)
-        
-        async def analyze_with_rate_limit(file_path):
-            async with semaphore:
-                return await self.analyze_file(file_path, models)
-        
-        # Créer les tâches d'analyse
-        tasks = [analyze_with_rate_limit(file_path) for file_path in file_list]
+        # Mode incrémental : reprendre les résultats des fichiers inchangés
+        reused_results = {}
+        incremental = previous_results is not None and changed_files is not None
+        if incremental:
+            changed = set(changed_files)
+            previous_by_path = {r["file_path"]: r for r in previous_results if is_reusable_result(r)}
+            reused_results = {
+                f: {**previous_by_path[f], "reused": True}
+                for f in file_list if f not in changed and f in previous_by_path
+            }
+            logger.info(f"Analyse incrémentale: {len(reused_results)} fichier(s) repris, "
+                        f"{len(file_list) - len(reused_results)} à analyser")
+        files_to_analyze = [f for f in file_list if f not in reused_results]
+        
+        # Le scanner de secrets examine chaque fichier à sa première lecture (contexte, analyse, puis fichiers restants)
+        secret_scanner = SecretScanner() if SECRET_SCAN_ENABLED else None
+        if secret_scanner is not None:
+            index = self.index
+            index.add_reader(lambda path, content: secret_scanner.scan(path, content, (index.get(path) or {}).get("language")))
+        
+        # Récupérer le contexte du dépôt (le contenu des fichiers à analyser est conservé pour ne le lire qu'une fois)
+        self.index.retain(files_to_analyze)
+        with stage_timer("context"):
+            repository_context = self.get_repository_context()
+        if secret_scanner is not None:
+            with stage_timer("read"):
+                self._read_remaining_files()
+        if result_callback:
+            for reused in reused_results.values():
+                result_callback(reused)
+        
+        # Fichiers identiques (bibliothèques copiées, fichiers générés) : un seul exemplaire est analysé
+        duplicates = self._group_identical_files(files_to_analyze)
+        unique_files = [f for f in files_to_analyze if f not in duplicates]
+        if duplicates:
+            logger.info(f"{len(duplicates)} fichier(s) identique(s) à un autre fichier, analysé(s) une seule fois")
+        
+        # Exécuter les analyses avec un nombre borné de workers (l'ordre des fichiers est conservé)
+        analyzed_results = await self._analyze_files_concurrently(
+            unique_files, models, progress_callback, result_callback, budget
+        )
+        analyzed_by_path = dict(zip(unique_files, analyzed_results))
+        for file_path, original_path in duplicates.items():
+            analyzed_by_path[file_path] = self._duplicate_result(analyzed_by_path[original_path], file_path, original_path)
+            if result_callback:
+                result_callback(analyzed_by_path[file_path])
+        results = [reused_results.get(f) or analyzed_by_path[f] for f in file_list]
         
-        # Exécuter les analyses et suivre la progression
-        for i, task in enumerate(asyncio.as_completed(tasks)):
-            result = await task
-            results.append(result)
-            
+        for result in results:
             # Collecter les vulnérabilités
             if result.get("status") == "analysé" and "vulnerabilities" in result:
                 all_vulnerabilities.extend(result["vulnerabilities"])
@@ -1036,10 +1842,14 @@ class RepositoryAnalyzer:
                 # Compter les erreurs pour tous les modèles
                 for model in model_performance:
                     model_performance[model]["errors"] += 1
-            
-            # Mettre à jour la progression
-            if progress_callback:
-                progress_callback((i + 1) / len(file_list))
+        
+        # Secrets détectés par le scanner et non déjà signalés par les modèles
+        if secret_scanner is not None:
+            secret_vulnerabilities = secret_scanner.vulnerabilities(all_vulnerabilities)
+            all_vulnerabilities.extend(secret_vulnerabilities)
+            secret_scan_stats = secret_scanner.summary(len(secret_vulnerabilities))
+        else:
+            secret_scan_stats = {"enabled": False}
         
         self.analysis_end_time = datetime.now()
         analysis_duration = (self.analysis_end_time - self.analysis_start_time).total_seconds()
@@ -1092,14 +1902,28 @@ class RepositoryAnalyzer:
             if severity in file_stats[file_path]["severities"]:
                 file_stats[file_path]["severities"][severity] += 1
         
+        # Utilisation du cache LLM sur l'ensemble de l'analyse
+        cache_hits = sum(r.get("llm_cache", {}).get("hits", 0) for r in results)
+        cache_misses = sum(r.get("llm_cache", {}).get("misses", 0) for r in results)
+        llm_cache_stats = {
+            "enabled": self.ollama_manager.cache is not None,
+            "hits": cache_hits,
+            "misses": cache_misses,
+            "hit_rate": round(cache_hits / max(cache_hits + cache_misses, 1) * 100, 1)
+        }
+        if self.ollama_manager.cache is not None:
+            llm_cache_stats["store"] = self.ollama_manager.cache.get_stats()
+        
         # Statistiques d'analyse des fichiers
         analysis_stats = {
-            "total_files_found": len(self.get_file_list()),
+            "total_files_found": total_files_found,
             "files_analyzed": len([r for r in results if r.get("status") == "analysé"]),
             "files_ignored": len([r for r in results if r.get("status") == "ignoré"]),
+            "files_prefiltered": len([r for r in results if r.get("reason") == PREFILTER_REASON]),
             "files_with_errors": len([r for r in results if r.get("status") == "erreur"]),
             "files_with_vulnerabilities": len([r for r in results if r.get("status") == "analysé" and r.get("vulnerabilities", [])]),
-            "analysis_coverage": round((len([r for r in results if r.get("status") == "analysé"]) / max(len(results), 1)) * 100, 1),
+            # Les fichiers écartés par le pré-filtre ont été examinés : ils comptent dans la couverture
+            "analysis_coverage": round((len([r for r in results if r.get("status") == "analysé" or r.get("reason") == PREFILTER_REASON]) / max(len(results), 1)) * 100, 1),
             "analysis_duration_seconds": round(analysis_duration, 2),
             "analysis_speed": round(len(results) / max(analysis_duration, 1), 2)  # fichiers par seconde
         }
@@ -1183,6 +2007,41 @@ class RepositoryAnalyzer:
             "temporal_analysis": temporal_stats,
             "benchmark_comparison": benchmark_comparison,
             "trend_predictions": trend_predictions,
+            "llm_cache": llm_cache_stats,
+            "file_selection": file_selection,
+            "secret_scan": secret_scan_stats,
+            "exclusions": self.path_classifier.summary() if self.path_classifier is not None else {"enabled": False},
+            "deduplication": {
+                "unique_files": len(unique_files),
+                "duplicate_files": len(duplicates),
+                "duplicate_groups": len(set(duplicates.values()))
+            },
+            "prefilter": {
+                "enabled": ANALYSIS_PREFILTER_ENABLED,
+                "files_prefiltered": analysis_stats["files_prefiltered"],
+                "files_sent_to_models": len([r for r in results if (r.get("prefilter") or {}).get("analyze")]),
+                "signals": count_signals(results)
+            },
+            "streaming": {
+                "enabled": OLLAMA_STREAMING_ENABLED,
+                # Tokens que les modèles pouvaient encore générer quand la réponse JSON était complète
+                # (borne supérieure des tokens épargnés : num_predict moins les tokens générés)
+                "tokens_saved": sum((r.get("llm_usage") or {}).get("tokens_saved", 0) for r in results if not r.get("reused"))
+            },
+            "packing": self._summarize_packing(results, models),
+            "scheduling": {
+                "mode": "model" if self.model_order is not None else "file",
+                "keep_alive": OLLAMA_KEEP_ALIVE,
+                # Ordre des passages par modèle (modèles déjà chargés en premier)
+                "model_order": self.model_order
+            },
+            "budget": self._summarize_budget(budget, results),
+            "incremental": {
+                "enabled": incremental,
+                "changed_files": len(changed_files) if incremental else None,
+                "files_reanalyzed": len(files_to_analyze),
+                "files_reused": len(reused_results)
+            },
             
             "file_results": results  # Résultats détaillés par fichier
         }
\ No newline at end of file
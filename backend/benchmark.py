@@ -0,0 +1,697 @@
+"""
+Banc d'essai du pipeline d'analyse, avec un faux serveur Ollama
+
+Mesure le débit de RepositoryAnalyzer.analyze_repository sur des dépôts
+synthétiques, celui de OllamaManager.compare_models et le coût de
+_extract_json_from_response, sans GPU ni modèle installé. Les résultats
+sont enregistrés en JSON pour comparer deux versions du code.
+
+Exemples :
+    python benchmark.py --sizes 100 1000 --latency 0.02
+    python benchmark.py --sizes 100 --shape mixed --compare benchmark_results/precedent.json
+    OLLAMA_SCHEDULING=model python benchmark.py --sizes 100 --swap-cost 0.5
+    OLLAMA_CHAT_ENABLED=False python benchmark.py --sizes 100 --prompt-rate 2000
+"""
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import logging
+import platform
+import shutil
+import resource
+import subprocess
+import tempfile
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import List, Dict, Any, Optional
+
+from aiohttp import web
+
+# Configuration du logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Formes de réponse du faux serveur (voir build_stub_response)
+RESPONSE_SHAPES = ("json", "fenced", "prose", "chatty", "truncated", "mixed")
+# Taille de contexte annoncée par le faux serveur (/api/show)
+STUB_CONTEXT_LENGTH = 8192
+# Tokens émis entre deux pauses du faux serveur en mode flux
+STUB_TOKENS_PER_SLEEP = 16
+# Modèles que le faux serveur garde chargés simultanément (hôte à mémoire limitée, voir --swap-cost)
+STUB_RESIDENT_MODELS = 1
+# Prompts conservés par modèle dans le cache KV simulé (un emplacement par requête parallèle d'Ollama)
+STUB_CACHE_SLOTS = 4
+# Corpus de réponses de modèles pour le micro-benchmark du parsing JSON
+CORPUS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark_corpus", "model_responses.json")
+# Tailles (caractères) des réponses mal formées du micro-benchmark
+JSON_SCALING_SIZES = (10_000, 100_000, 1_000_000)
+# Intervalle d'échantillonnage du retard de la boucle asyncio (secondes)
+LOOP_LAG_INTERVAL = 0.01
+
+VULNERABILITY_TEMPLATES = [
+    ("Injection SQL", "Requête construite par concaténation", "Élevé"),
+    ("Injection de commandes", "Commande shell construite à partir d'une entrée", "Élevé"),
+    ("Cross-site scripting (XSS)", "Contenu HTML non échappé", "Moyen"),
+    ("Validation incorrecte des entrées", "Paramètre utilisé sans validation", "Faible"),
+]
+
+# Modèles de fichiers synthétiques : (extension, code sensible, code sans signal de risque)
+FILE_TEMPLATES = [
+    (".py",
+     "import subprocess\n\ndef handler_{n}(request):\n    name = request.args.get('name')\n"
+     "    cursor.execute(f\"SELECT * FROM users_{n} WHERE name = '{{name}}'\")\n"
+     "    return subprocess.run('ls ' + name, shell=True)\n",
+     "def compute_{n}(values):\n    total = 0\n    for value in values:\n        total += value * {n}\n    return total\n"),
+    (".js",
+     "const express = require('express');\nfunction render_{n}(req, res) {{\n"
+     "  document.getElementById('out').innerHTML = req.query.q;\n  eval(req.body.code);\n}}\n",
+     "export function format_{n}(items) {{\n  return items.map((item) => item.name + ' #{n}').join(', ');\n}}\n"),
+    (".php",
+     "<?php\n$id = $_GET['id'];\n$result = mysqli_query($db, \"SELECT * FROM t{n} WHERE id = \" . $id);\n"
+     "echo $result;\n",
+     "<?php\nfunction slug_{n}($text) {{\n  return strtolower(trim($text));\n}}\n"),
+    (".java",
+     "public class Service{n} {{\n  void run(HttpServletRequest request) throws Exception {{\n"
+     "    Runtime.getRuntime().exec(request.getParameter(\"cmd\"));\n  }}\n}}\n",
+     "public class Util{n} {{\n  static int add(int a, int b) {{\n    return a + b + {n};\n  }}\n}}\n"),
+]
+
+
+def percentile(values: List[float], ratio: float) -> Optional[float]:
+    """Percentile (rang le plus proche) d'une liste de valeurs"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, int(round(ratio * len(ordered) + 0.5)) - 1))
+    return ordered[rank]
+
+
+def _distribution(values: List[float], scale: float = 1000.0) -> Dict[str, Optional[float]]:
+    """p50 / p95 / max d'une liste de durées (en millisecondes par défaut)"""
+    def scaled(value):
+        return None if value is None else round(value * scale, 3)
+    return {
+        "p50": scaled(percentile(values, 0.50)),
+        "p95": scaled(percentile(values, 0.95)),
+        "max": scaled(max(values) if values else None),
+    }
+
+
+def build_stub_response(shape: str, rng: random.Random, files: Optional[List[str]] = None) -> str:
+    """
+    Construit le texte d'une réponse de modèle
+
+    Args:
+        shape: json (JSON seul), fenced (bloc ```json```), prose (JSON entouré de texte),
+               chatty (JSON suivi d'un long commentaire), truncated (JSON coupé),
+               mixed (une forme au hasard)
+        rng: Générateur aléatoire (reproductible)
+        files: Fichiers d'un prompt groupé : des vulnérabilités sont produites pour
+               chacun, avec le champ "fichier"
+
+    Returns:
+        Texte de la réponse, tel que renvoyé dans le champ "response" d'Ollama
+    """
+    if shape == "mixed":
+        shape = rng.choice(RESPONSE_SHAPES[:-1])
+    vulnerabilities = []
+    for file_path in files or [None]:
+        for _ in range(rng.randint(0, 3)):
+            vuln_type, description, severity = rng.choice(VULNERABILITY_TEMPLATES)
+            line = rng.randint(1, 40)
+            vulnerability = {} if file_path is None else {"fichier": file_path}
+            vulnerabilities.append({
+                **vulnerability,
+                "type_vulnerabilite": vuln_type,
+                "description": description,
+                "severite": severity,
+                "numeros_ligne": [line, f"{line + 1}-{line + 3}"],
+                "recommandation": "Valider les entrées et utiliser des API paramétrées",
+            })
+    document = json.dumps({"vulnerabilities": vulnerabilities}, ensure_ascii=False, indent=2)
+    if shape == "fenced":
+        return f"Voici le résultat de l'analyse :\n```json\n{document}\n```\n"
+    if shape == "prose":
+        return f"Analyse terminée. Résultat : {document} Fin de l'analyse."
+    if shape == "chatty":
+        explanation = " ".join(
+            f"{vuln['type_vulnerabilite']} : {vuln['description']}, à corriger en priorité." for vuln in vulnerabilities
+        ) or "Aucun point bloquant relevé."
+        return f"{document}\n\nExplications : {explanation}\n" + "Bonnes pratiques générales de sécurité. " * 40
+    if shape == "truncated":
+        return document[:max(1, int(len(document) * 0.8))]
+    return document
+
+
+def _serve_stub(port_queue, latency: float, jitter: float, shape: str, seed: int, models: List[str],
+                swap_cost: float = 0.0, prompt_rate: float = 0.0):
+    """Processus du faux serveur Ollama (/api/tags, /api/show, /api/ps, /api/generate, /api/chat)"""
+    from prompt_packer import SECTION_HEADER_PATTERN
+
+    rng = random.Random(seed)
+    # Modèles en mémoire, du plus ancien au plus récent ; un chargement coûte swap_cost secondes
+    loaded: List[str] = []
+    load_lock = asyncio.Lock()
+    # Derniers prompts évalués par modèle : leur plus long préfixe commun avec un nouveau prompt n'est pas réévalué
+    prompt_cache: Dict[str, List[str]] = {}
+
+    async def load(model: str) -> float:
+        """Charge le modèle s'il n'est pas en mémoire (le plus ancien est évincé) ; durée de chargement"""
+        async with load_lock:
+            if model in loaded:
+                return 0.0
+            loaded.append(model)
+            if swap_cost:
+                # Hôte à mémoire limitée : le cache des modèles évincés est perdu
+                await asyncio.sleep(swap_cost)
+                for evicted in loaded[:-STUB_RESIDENT_MODELS]:
+                    prompt_cache.pop(evicted, None)
+                del loaded[:-STUB_RESIDENT_MODELS]
+            return swap_cost
+
+    def render(payload: Dict[str, Any]) -> str:
+        """Texte du prompt après application d'un gabarit de conversation"""
+        messages = payload.get("messages") or [{"role": "user", "content": payload.get("prompt", "")}]
+        return "".join(f"<|{m['role']}|>\n{m['content']}\n" for m in messages) + "<|assistant|>\n"
+
+    def evaluate(model: str, text: str) -> int:
+        """Caractères du prompt à évaluer, hors préfixe déjà présent dans un emplacement du cache"""
+        cache = prompt_cache.setdefault(model, [])
+        reused, slot = 0, None
+        for index, cached in enumerate(cache):
+            common = len(os.path.commonprefix([cached, text]))
+            if common > reused:
+                reused, slot = common, index
+        if slot is not None:
+            del cache[slot]
+        cache.append(text)
+        del cache[:-STUB_CACHE_SLOTS]
+        return len(text) - reused
+
+    def reply(payload: Dict[str, Any], content: str) -> Dict[str, Any]:
+        """Fragment de réponse au format de l'API appelée"""
+        if "messages" in payload:
+            return {"model": payload.get("model"), "message": {"role": "assistant", "content": content}}
+        return {"model": payload.get("model"), "response": content}
+
+    async def tags(request):
+        return web.json_response({"models": [{"name": model, "digest": f"stub-{model}"} for model in models]})
+
+    async def show(request):
+        return web.json_response({"model_info": {"stub.context_length": STUB_CONTEXT_LENGTH}})
+
+    async def ps(request):
+        return web.json_response({"models": [{"name": model, "model": model} for model in loaded]})
+
+    async def generate(request):
+        payload = await request.json()
+        if not payload.get("prompt") and not payload.get("messages") and payload.get("keep_alive") == 0:
+            # Déchargement explicite du modèle
+            if payload.get("model") in loaded:
+                loaded.remove(payload.get("model"))
+            prompt_cache.pop(payload.get("model"), None)
+            return web.json_response({**reply(payload, ""), "done": True})
+        load_duration = int(await load(payload.get("model")) * 1e9)
+        duration = latency + rng.uniform(0, jitter)
+        prompt = render(payload)
+        # Évaluation du prompt (prompt_rate tokens/s) ; sans prompt_rate, comptée dans la latence
+        prompt_tokens = evaluate(payload.get("model"), prompt) // 4
+        prompt_seconds = prompt_tokens / prompt_rate if prompt_rate else duration * 0.2
+        if prompt_rate:
+            await asyncio.sleep(prompt_seconds)
+        counters = {
+            "done": True, "load_duration": load_duration,
+            "prompt_eval_count": prompt_tokens, "prompt_eval_duration": int(prompt_seconds * 1e9),
+        }
+        files = [match.group(2) for match in SECTION_HEADER_PATTERN.finditer(prompt)]
+        text = build_stub_response(shape, rng, files)
+        if payload.get("stream", True):
+            return await stream_generation(request, payload, text, duration, counters)
+        await asyncio.sleep(duration)
+        return web.json_response({
+            **reply(payload, text), **counters,
+            "eval_count": len(text) // 4,
+            "eval_duration": int(duration * 0.8 * 1e9),
+        })
+
+    async def stream_generation(request, payload, text, duration, counters):
+        # Flux NDJSON d'un token (environ 4 caractères) par ligne, généré à vitesse constante
+        tokens = [text[i:i + 4] for i in range(0, len(text), 4)]
+        response = web.StreamResponse(headers={"Content-Type": "application/x-ndjson"})
+        await response.prepare(request)
+        try:
+            for index, token in enumerate(tokens):
+                if index % STUB_TOKENS_PER_SLEEP == 0:
+                    await asyncio.sleep(duration * min(STUB_TOKENS_PER_SLEEP, len(tokens) - index) / len(tokens))
+                line = {**reply(payload, token), "done": False}
+                await response.write((json.dumps(line) + "\n").encode("utf-8"))
+            final = {
+                **reply(payload, ""), **counters,
+                "eval_count": len(tokens), "eval_duration": int(duration * 0.8 * 1e9),
+            }
+            await response.write((json.dumps(final) + "\n").encode("utf-8"))
+            await response.write_eof()
+        except ConnectionResetError:
+            # Le client a interrompu la génération
+            pass
+        return response
+
+    async def serve():
+        app = web.Application(client_max_size=64 * 1024 * 1024)
+        app.router.add_get("/api/tags", tags)
+        app.router.add_post("/api/show", show)
+        app.router.add_get("/api/ps", ps)
+        app.router.add_post("/api/generate", generate)
+        app.router.add_post("/api/chat", generate)
+        runner = web.AppRunner(app, access_log=None)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        port_queue.put(runner.addresses[0][1])
+        await asyncio.Event().wait()
+
+    asyncio.run(serve())
+
+
+class StubOllamaServer:
+    """Faux serveur Ollama exécuté dans un processus séparé (ne perturbe pas les mesures)"""
+
+    def __init__(self, latency: float = 0.02, jitter: float = 0.0, shape: str = "json",
+                 seed: int = 0, models: Optional[List[str]] = None, swap_cost: float = 0.0,
+                 prompt_rate: float = 0.0):
+        self.latency = latency
+        self.jitter = jitter
+        self.shape = shape
+        self.seed = seed
+        self.models = models or ["stub-model"]
+        self.swap_cost = swap_cost
+        self.prompt_rate = prompt_rate
+        self.url: Optional[str] = None
+        self._process = None
+
+    def __enter__(self) -> "StubOllamaServer":
+        context = multiprocessing.get_context("spawn")
+        port_queue = context.Queue()
+        self._process = context.Process(
+            target=_serve_stub,
+            args=(port_queue, self.latency, self.jitter, self.shape, self.seed, self.models, self.swap_cost,
+                  self.prompt_rate),
+            daemon=True
+        )
+        self._process.start()
+        self.url = f"http://127.0.0.1:{port_queue.get(timeout=30)}"
+        logger.info(f"Faux serveur Ollama démarré sur {self.url}")
+        return self
+
+    def __exit__(self, *exc):
+        self._process.terminate()
+        self._process.join()
+
+
+def generate_repository(root: str, file_count: int, seed: int = 0,
+                        risky_ratio: float = 0.5, files_per_directory: int = 50) -> str:
+    """
+    Crée un dépôt synthétique (plusieurs langages, une part de fichiers sensibles)
+
+    Args:
+        root: Dossier à créer
+        file_count: Nombre de fichiers
+        seed: Graine du générateur (dépôts reproductibles)
+        risky_ratio: Part des fichiers contenant des signaux de risque
+        files_per_directory: Nombre de fichiers par dossier
+
+    Returns:
+        Chemin du dépôt
+    """
+    rng = random.Random(seed)
+    for n in range(file_count):
+        extension, risky, benign = FILE_TEMPLATES[n % len(FILE_TEMPLATES)]
+        directory = os.path.join(root, "src", f"module_{n // files_per_directory:04d}")
+        os.makedirs(directory, exist_ok=True)
+        body = (risky if rng.random() < risky_ratio else benign).format(n=n)
+        # Corps de taille variable, contenu unique par fichier (pas de déduplication)
+        filler = "".join(f"{'#' if extension == '.py' else '//'} ligne {n}-{i}\n" for i in range(rng.randint(5, 60)))
+        with open(os.path.join(directory, f"file_{n:05d}{extension}"), "w", encoding="utf-8") as f:
+            f.write(body + filler)
+    return root
+
+
+async def _monitor_loop_lag(samples: List[float], stop: asyncio.Event):
+    """Mesure le retard de réveil de la boucle asyncio (blocages par du code synchrone)"""
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(LOOP_LAG_INTERVAL)
+        samples.append(max(0.0, time.perf_counter() - started - LOOP_LAG_INTERVAL))
+
+
+def _peak_rss_mb() -> float:
+    """Pic de mémoire résidente du processus (Mo)"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux : kilo-octets ; macOS : octets
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def _instrumented_classes():
+    """Sous-classes mesurant la durée de chaque fichier et du parsing JSON (import différé)"""
+    from analyzer import RepositoryAnalyzer
+    from ollama import OllamaManager
+
+    class TimedOllamaManager(OllamaManager):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            self.parse_times: List[float] = []
+            self.request_count = 0
+
+        async def _analyze_code(self, *args, **kwargs) -> Dict[str, Any]:
+            self.request_count += 1
+            return await super()._analyze_code(*args, **kwargs)
+
+        def _extract_json_from_response(self, response_text: str) -> Dict[str, Any]:
+            started = time.perf_counter()
+            try:
+                return super()._extract_json_from_response(response_text)
+            finally:
+                self.parse_times.append(time.perf_counter() - started)
+
+    class TimedAnalyzer(RepositoryAnalyzer):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            self.file_times: List[float] = []
+
+        async def analyze_file(self, file_path: str, models: List[str]) -> Dict[str, Any]:
+            started = time.perf_counter()
+            try:
+                return await super().analyze_file(file_path, models)
+            finally:
+                self.file_times.append(time.perf_counter() - started)
+
+        async def analyze_file_pack(self, file_paths: List[str], models: List[str]) -> List[Dict[str, Any]]:
+            # Chaque fichier d'un groupe attend la réponse du groupe entier
+            started = time.perf_counter()
+            try:
+                return await super().analyze_file_pack(file_paths, models)
+            finally:
+                self.file_times.extend([time.perf_counter() - started] * len(file_paths))
+
+    return TimedAnalyzer, TimedOllamaManager
+
+
+async def _run_pipeline(repo_path: str, base_url: str, models: List[str], concurrency: int) -> Dict[str, Any]:
+    from config import OLLAMA_HTTP_POOL_SIZE, OLLAMA_HTTP_POOL_PER_HOST
+    from http_client import create_client_session
+    from metrics import OLLAMA_LOAD_SECONDS, OLLAMA_EVAL_SECONDS
+    import aiohttp
+
+    TimedAnalyzer, TimedOllamaManager = _instrumented_classes()
+    session = create_client_session(OLLAMA_HTTP_POOL_SIZE, OLLAMA_HTTP_POOL_PER_HOST,
+                                    timeout=aiohttp.ClientTimeout(total=None))
+    lag_samples: List[float] = []
+    stop = asyncio.Event()
+    monitor = asyncio.create_task(_monitor_loop_lag(lag_samples, stop))
+    try:
+        manager = TimedOllamaManager(base_url=base_url, session=session)
+        analyzer = TimedAnalyzer(repo_path, manager, max_concurrency=concurrency)
+        started = time.perf_counter()
+        result = await analyzer.analyze_repository(models)
+        duration = time.perf_counter() - started
+    finally:
+        stop.set()
+        await monitor
+        await session.close()
+
+    stats = result["analysis_stats"]
+    return {
+        "duration_seconds": round(duration, 3),
+        "files": len(result["file_results"]),
+        "files_per_second": round(len(result["file_results"]) / max(duration, 1e-9), 2),
+        "files_sent_to_models": result.get("prefilter", {}).get("files_sent_to_models", stats["files_analyzed"]),
+        "files_with_errors": stats["files_with_errors"],
+        "vulnerabilities": len(result["vulnerabilities"]),
+        "ollama_requests": manager.request_count,
+        "prompt_tokens": sum((r.get("llm_usage") or {}).get("prompt_tokens", 0) for r in result["file_results"]),
+        "packing": result.get("packing"),
+        "scheduling": result.get("scheduling"),
+        # Temps de chargement des modèles rapporté par Ollama (changements de modèle)
+        "model_load_seconds": round(sum(OLLAMA_LOAD_SECONDS.snapshot()["values"].values()), 3),
+        # Temps d'évaluation des prompts rapporté par Ollama (prompt_eval_duration, hors préfixe en cache)
+        "prompt_eval_seconds": round(sum(
+            value for (model, kind), value in OLLAMA_EVAL_SECONDS.snapshot()["values"].items() if kind == "prompt"
+        ), 3),
+        "file_latency_ms": _distribution(analyzer.file_times),
+        "event_loop_lag_ms": _distribution(lag_samples),
+        "json_parse": {
+            "calls": len(manager.parse_times),
+            "total_ms": round(sum(manager.parse_times) * 1000, 3),
+            "per_call_us": _distribution(manager.parse_times, 1e6),
+        },
+    }
+
+
+async def _run_compare_models(base_url: str, models: List[str], calls: int, concurrency: int) -> Dict[str, Any]:
+    from config import OLLAMA_HTTP_POOL_SIZE, OLLAMA_HTTP_POOL_PER_HOST
+    from http_client import create_client_session
+    from ollama import OllamaManager
+
+    session = create_client_session(OLLAMA_HTTP_POOL_SIZE, OLLAMA_HTTP_POOL_PER_HOST)
+    manager = OllamaManager(base_url=base_url, session=session)
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+    prompt = "Analysez le code Python suivant pour identifier les vulnérabilités de sécurité."
+
+    async def one(n: int):
+        async with semaphore:
+            started = time.perf_counter()
+            await manager.compare_models(models, FILE_TEMPLATES[0][1].format(n=n), prompt)
+            latencies.append(time.perf_counter() - started)
+
+    try:
+        started = time.perf_counter()
+        await asyncio.gather(*(one(n) for n in range(calls)))
+        duration = time.perf_counter() - started
+    finally:
+        await session.close()
+    return {
+        "calls": calls,
+        "models": len(models),
+        "calls_per_second": round(calls / max(duration, 1e-9), 2),
+        "latency_ms": _distribution(latencies),
+    }
+
+
+def _pipeline_job(repo_path: str, base_url: str, models: List[str], concurrency: int,
+                  compare_calls: int, verbose: bool) -> Dict[str, Any]:
+    """Exécuté dans un processus neuf : le pic de mémoire mesuré est celui de cette seule analyse"""
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    import analyzer  # noqa: F401 - charge les modules avant de régler les niveaux de log
+    if not verbose:
+        logging.getLogger().setLevel(logging.WARNING)
+        for name in list(logging.root.manager.loggerDict):
+            logging.getLogger(name).setLevel(logging.WARNING)
+
+    metrics = asyncio.run(_run_pipeline(repo_path, base_url, models, concurrency))
+    if compare_calls:
+        metrics["compare_models"] = asyncio.run(_run_compare_models(base_url, models, compare_calls, concurrency))
+    metrics["peak_rss_mb"] = _peak_rss_mb()
+    return metrics
+
+
+def _json_scaling_inputs(size: int, rng: random.Random) -> Dict[str, str]:
+    """Réponses mal formées d'environ size caractères (mesure du temps d'extraction en fonction de la taille)"""
+    document = json.loads(build_stub_response("json", rng))
+    while len(json.dumps(document)) < size:
+        document["vulnerabilities"].extend(json.loads(build_stub_response("json", rng))["vulnerabilities"] or [{}])
+    text = json.dumps(document, ensure_ascii=False, indent=2)
+    return {
+        "truncated": text[:size],
+        "unclosed_braces": ("{ voir " * (size // 7 + 1))[:size],
+        "nested_brackets": ("[" * (size // 2) + "]" * (size // 2)),
+        "nested_objects": ('{"a":' * (size // 5 + 1))[:size],
+        "prose_then_json": "x" * (size // 2) + text[:size // 2],
+    }
+
+
+def bench_json_parsing(iterations: int = 200, seed: int = 0) -> Dict[str, Any]:
+    """
+    Micro-benchmark de OllamaManager._extract_json_from_response
+
+    Trois mesures : les formes de réponse du faux serveur, le corpus de
+    réponses de modèles (benchmark_corpus/model_responses.json, avec le
+    nombre de vulnérabilités extraites pour repérer une régression) et
+    des réponses mal formées de 10 Ko à 1 Mo (le temps par Ko doit rester
+    constant).
+
+    Args:
+        iterations: Nombre de réponses analysées par forme (et de répétitions par réponse du corpus)
+        seed: Graine du générateur
+
+    Returns:
+        Durées par forme, par réponse du corpus et par taille
+    """
+    from ollama import OllamaManager
+
+    manager = OllamaManager()
+    rng = random.Random(seed)
+    results: Dict[str, Any] = {"shapes": {}, "corpus": {}, "scaling": {}}
+    for shape in RESPONSE_SHAPES[:-1]:
+        responses = [build_stub_response(shape, rng) for _ in range(iterations)]
+        times = []
+        for text in responses:
+            started = time.perf_counter()
+            manager._extract_json_from_response(text)
+            times.append(time.perf_counter() - started)
+        results["shapes"][shape] = {
+            "mean_us": round(sum(times) / len(times) * 1e6, 2),
+            "per_call_us": _distribution(times, 1e6),
+            "average_chars": round(sum(len(text) for text in responses) / len(responses)),
+        }
+
+    with open(CORPUS_PATH, "r", encoding="utf-8") as f:
+        corpus = json.load(f)
+    for case in corpus:
+        started = time.perf_counter()
+        for _ in range(iterations):
+            parsed = manager._extract_json_from_response(case["response"])
+        results["corpus"][case["name"]] = {
+            "mean_us": round((time.perf_counter() - started) / iterations * 1e6, 2),
+            "chars": len(case["response"]),
+            "vulnerabilities": len(parsed.get("vulnerabilities") or []),
+        }
+
+    for size in JSON_SCALING_SIZES:
+        for name, text in _json_scaling_inputs(size, rng).items():
+            started = time.perf_counter()
+            manager._extract_json_from_response(text)
+            elapsed = time.perf_counter() - started
+            results["scaling"].setdefault(name, {})[str(size)] = {
+                "ms": round(elapsed * 1000, 3),
+                "us_per_kb": round(elapsed * 1e6 / (len(text) / 1024), 2),
+            }
+    return results
+
+
+def _git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare_reports(current: Dict[str, Any], previous: Dict[str, Any]) -> List[str]:
+    """Lignes de comparaison (débit, requêtes, tokens, latence p95, mémoire par taille de dépôt ; parsing JSON du corpus)"""
+    lines = []
+    previous_runs = {run["size"]: run for run in previous.get("runs", [])}
+    for run in current.get("runs", []):
+        before = previous_runs.get(run["size"])
+        if before is None:
+            continue
+        for label, getter in (
+            ("fichiers/s", lambda r: r["files_per_second"]),
+            ("requêtes Ollama", lambda r: r.get("ollama_requests")),
+            ("tokens de prompt", lambda r: r.get("prompt_tokens")),
+            ("chargements modèles (s)", lambda r: r.get("model_load_seconds")),
+            ("évaluation prompts (s)", lambda r: r.get("prompt_eval_seconds")),
+            ("latence p95 (ms)", lambda r: r["file_latency_ms"]["p95"]),
+            ("retard boucle p95 (ms)", lambda r: r["event_loop_lag_ms"]["p95"]),
+            ("pic RSS (Mo)", lambda r: r["peak_rss_mb"]),
+        ):
+            old, new = getter(before), getter(run)
+            if old and new is not None:
+                lines.append(f"{run['size']:>6} fichiers  {label:<24} {old:>10} -> {new:<10} ({(new - old) / old * 100:+.1f}%)")
+    previous_corpus = previous.get("json_parsing", {}).get("corpus", {})
+    for name, case in current.get("json_parsing", {}).get("corpus", {}).items():
+        before = previous_corpus.get(name)
+        if before and before["mean_us"]:
+            lines.append(f"JSON {name:<24} {before['mean_us']:>10} -> {case['mean_us']:<10} µs "
+                         f"({(case['mean_us'] - before['mean_us']) / before['mean_us'] * 100:+.1f}%), "
+                         f"vulnérabilités {before['vulnerabilities']} -> {case['vulnerabilities']}")
+    return lines
+
+
+def main(argv: Optional[List[str]] = None) -> Dict[str, Any]:
+    parser = argparse.ArgumentParser(description="Banc d'essai du pipeline d'analyse (faux serveur Ollama)")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000],
+                        help="Nombre de fichiers des dépôts synthétiques")
+    parser.add_argument("--models", nargs="+", default=["stub-a", "stub-b"], help="Modèles simulés")
+    parser.add_argument("--latency", type=float, default=0.02, help="Latence de génération simulée (secondes)")
+    parser.add_argument("--jitter", type=float, default=0.01, help="Variation aléatoire de la latence (secondes)")
+    parser.add_argument("--shape", choices=RESPONSE_SHAPES, default="mixed", help="Forme des réponses du modèle")
+    parser.add_argument("--swap-cost", type=float, default=0.0,
+                        help="Durée de chargement d'un modèle (secondes) ; un seul modèle reste chargé à la fois")
+    parser.add_argument("--prompt-rate", type=float, default=0.0,
+                        help="Vitesse d'évaluation des prompts (tokens/s, 0 = incluse dans la latence) ; "
+                             "le préfixe déjà en cache n'est pas réévalué")
+    parser.add_argument("--concurrency", type=int, default=8, help="Fichiers analysés simultanément")
+    parser.add_argument("--compare-calls", type=int, default=200,
+                        help="Appels à compare_models mesurés après chaque analyse (0 = aucun)")
+    parser.add_argument("--json-iterations", type=int, default=500, help="Réponses par forme pour le parsing JSON")
+    parser.add_argument("--risky-ratio", type=float, default=0.5, help="Part des fichiers contenant des signaux de risque")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Fichier JSON des résultats (défaut : benchmark_results/<date>-<commit>.json)")
+    parser.add_argument("--compare", help="Rapport précédent à comparer")
+    parser.add_argument("--verbose", action="store_true", help="Conserver les logs du pipeline")
+    args = parser.parse_args(argv)
+
+    work_dir = tempfile.mkdtemp(prefix="benchmark-")
+    # Configuration lue par les modules du backend dans les processus de mesure
+    os.environ.update({
+        "DATA_DIR": os.path.join(work_dir, "data"),
+        "LLM_CACHE_ENABLED": "False",
+        "ANALYSIS_MAX_FILES": str(max(args.sizes)),
+        "ANALYSIS_MAX_CONCURRENCY": str(args.concurrency),
+        "OLLAMA_MAX_REQUESTS_PER_MODEL": str(args.concurrency),
+    })
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+    report: Dict[str, Any] = {
+        "revision": _git_revision(),
+        "timestamp": datetime.now().isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "parameters": {key: value for key, value in vars(args).items() if key not in ("output", "compare")},
+        "json_parsing": bench_json_parsing(args.json_iterations, args.seed),
+        "runs": [],
+    }
+
+    context = multiprocessing.get_context("spawn")
+    try:
+        with StubOllamaServer(args.latency, args.jitter, args.shape, args.seed, args.models, args.swap_cost,
+                              args.prompt_rate) as server:
+            for size in args.sizes:
+                repo_path = generate_repository(os.path.join(work_dir, f"repo-{size}"), size, args.seed, args.risky_ratio)
+                logger.info(f"Analyse d'un dépôt synthétique de {size} fichiers")
+                with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+                    metrics = executor.submit(
+                        _pipeline_job, repo_path, server.url, args.models, args.concurrency,
+                        args.compare_calls, args.verbose
+                    ).result()
+                report["runs"].append({"size": size, **metrics})
+                logger.info(f"{size} fichiers : {metrics['files_per_second']} fichiers/s, "
+                            f"p95 {metrics['file_latency_ms']['p95']} ms, pic RSS {metrics['peak_rss_mb']} Mo")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    output = args.output or os.path.join(
+        "benchmark_results", f"{datetime.now():%Y%m%d-%H%M%S}-{report['revision'] or 'local'}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    logger.info(f"Résultats enregistrés dans {output}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            for line in compare_reports(report, json.load(f)):
+                print(line)
+    return report
+
+
+if __name__ == "__main__":
+    main()
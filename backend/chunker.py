@@ -0,0 +1,119 @@
+import re
+import logging
+from typing import List, Dict, Any
+
+# Configuration du logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Début de définition (fonction, classe, méthode...) dans les langages courants
+DEFINITION_PATTERN = re.compile(
+    r"^\s*(?:@\w|(?:export\s+)?(?:default\s+)?(?:async\s+)?(?:def|class|function|func|fn|interface|struct|impl|module|trait|enum)\b"
+    r"|(?:public|private|protected|internal|static|abstract|final|override)\b"
+    r"|(?:export\s+)?(?:const|let|var)\s+\w+\s*=\s*(?:async\s*)?(?:\([^)]*\)|\w+)\s*=>)"
+)
+
+# Plage de lignes au format texte ("15", "15-20")
+LINE_RANGE_PATTERN = re.compile(r"^\s*(\d+)\s*(?:-\s*(\d+))?\s*$")
+
+
+def _boundary_rank(line: str) -> int:
+    """
+    Évalue l'intérêt d'une ligne comme point de découpe (plus petit = meilleur)
+
+    0: définition non indentée, 1: définition indentée, 2: ligne vide, 3: autre
+    """
+    if DEFINITION_PATTERN.match(line):
+        return 0 if line[:1] not in (" ", "\t") else 1
+    if not line.strip():
+        return 2
+    return 3
+
+
+def split_code_into_chunks(code: str, max_chars: int, overlap_lines: int = 10) -> List[Dict[str, Any]]:
+    """
+    Découpe du code en morceaux d'au plus max_chars caractères
+
+    Les coupures sont faites de préférence avant une définition de fonction ou
+    de classe, sinon sur une ligne vide, sinon sur une limite de ligne. Chaque
+    morceau reprend les overlap_lines dernières lignes du précédent (au plus un
+    quart du précédent) pour ne pas perdre le contexte d'une vulnérabilité à
+    cheval sur deux morceaux.
+
+    Args:
+        code: Code source complet
+        max_chars: Taille maximale d'un morceau en caractères
+        overlap_lines: Nombre de lignes de recouvrement entre deux morceaux
+
+    Returns:
+        Liste de morceaux {index, start_line, end_line, content} (lignes numérotées à partir de 1)
+    """
+    lines = code.splitlines(keepends=True)
+    if not lines:
+        return []
+
+    max_chars = max(max_chars, 1)
+    chunks = []
+    start = 0
+    while start < len(lines):
+        # Étendre le morceau tant qu'il tient dans la limite (au moins une ligne)
+        end = start
+        size = 0
+        while end < len(lines) and (size + len(lines[end]) <= max_chars or end == start):
+            size += len(lines[end])
+            end += 1
+
+        # Chercher une meilleure coupure dans la seconde moitié du morceau
+        if end < len(lines):
+            best_cut, best_rank = end, _boundary_rank(lines[end])
+            for candidate in range(end - 1, start + (end - start) // 2, -1):
+                rank = _boundary_rank(lines[candidate])
+                if rank < best_rank:
+                    best_cut, best_rank = candidate, rank
+                    if rank == 0:
+                        break
+            end = best_cut
+
+        chunks.append({
+            "index": len(chunks),
+            "start_line": start + 1,
+            "end_line": end,
+            "content": "".join(lines[start:end])
+        })
+
+        if end >= len(lines):
+            break
+        # Recouvrement limité au quart du morceau : le découpage avance d'au moins un demi-morceau
+        # (sinon des lignes très longues donneraient presque un morceau par ligne)
+        length = end - start
+        start = max(end - min(overlap_lines, length // 4), start + max(1, length // 2))
+
+    return chunks
+
+
+def remap_line_numbers(value: Any, offset: int) -> Any:
+    """
+    Convertit des numéros de ligne relatifs à un morceau en numéros de ligne du fichier
+
+    Args:
+        value: Valeur de "numeros_ligne" (nombre, "15-20", liste de ceux-ci...)
+        offset: Décalage à ajouter (start_line du morceau - 1)
+
+    Returns:
+        Valeur de même forme avec les numéros décalés
+    """
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, int):
+        return value + offset
+    if isinstance(value, str):
+        match = LINE_RANGE_PATTERN.match(value)
+        if not match:
+            return value
+        first = int(match.group(1)) + offset
+        if match.group(2):
+            return f"{first}-{int(match.group(2)) + offset}"
+        return str(first)
+    if isinstance(value, list):
+        return [remap_line_numbers(item, offset) for item in value]
+    return value
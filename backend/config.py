@@ -18,4 +18,105 @@ OLLAMA_API_URL = os.getenv("OLLAMA_API_URL", "http://localhost:11434")
 SECRET_KEY = os.getenv("SECRET_KEY", "cle_secrete_par_defaut_a_changer_en_production")
 
 # Origines CORS autorisées
-ALLOWED_ORIGINS = os.getenv("ALLOWED_ORIGINS", "http://localhost:3000").split(",")
\ No newline at end of file
+ALLOWED_ORIGINS = os.getenv("ALLOWED_ORIGINS", "http://localhost:3000").split(",")
+
+# Concurrence de l'analyse
+# Nombre de fichiers analysés simultanément (par défaut aligné sur OLLAMA_NUM_PARALLEL)
+ANALYSIS_MAX_CONCURRENCY = max(1, int(os.getenv("ANALYSIS_MAX_CONCURRENCY", os.getenv("OLLAMA_NUM_PARALLEL", "1"))))
+# Nombre maximal de requêtes simultanées vers un même modèle Ollama
+OLLAMA_MAX_REQUESTS_PER_MODEL = max(1, int(os.getenv("OLLAMA_MAX_REQUESTS_PER_MODEL", str(ANALYSIS_MAX_CONCURRENCY))))
+# Limites spécifiques par modèle, format "modele1=2,modele2=1"
+OLLAMA_MODEL_CONCURRENCY = {
+    name.strip(): max(1, int(limit))
+    for name, limit in (
+        item.split("=", 1) for item in os.getenv("OLLAMA_MODEL_CONCURRENCY", "").split(",") if "=" in item
+    )
+}
+# Nombre maximal de fichiers analysés par dépôt (les plus prioritaires selon leur score de risque)
+ANALYSIS_MAX_FILES = max(1, int(os.getenv("ANALYSIS_MAX_FILES", "100")))
+# Nombre de processus workers exécutant les analyses (0 = dans le processus API)
+# Les limites ci-dessus s'appliquent à chaque processus worker : avec N processus, Ollama reçoit
+# jusqu'à N fois OLLAMA_MAX_REQUESTS_PER_MODEL requêtes simultanées par modèle
+ANALYSIS_WORKER_PROCESSES = max(0, int(os.getenv("ANALYSIS_WORKER_PROCESSES", "1")))
+# Pré-filtre statique : les fichiers sans aucun signal de risque ne sont pas envoyés aux modèles
+ANALYSIS_PREFILTER_ENABLED = os.getenv("ANALYSIS_PREFILTER_ENABLED", "True").lower() in ("true", "1", "t")
+# Scanner de secrets par expressions régulières, exécuté sur tous les fichiers texte du dépôt en plus des modèles
+SECRET_SCAN_ENABLED = os.getenv("SECRET_SCAN_ENABLED", "True").lower() in ("true", "1", "t")
+# Taille maximale (octets) des fichiers examinés par le scanner de secrets (fichiers cachés et non analysés compris)
+SECRET_SCAN_MAX_FILE_BYTES = int(os.getenv("SECRET_SCAN_MAX_FILE_BYTES", str(1024 * 1024)))
+# Exclure le code tiers et généré (.gitignore, linguist-generated/vendored, node_modules, dist, fichiers minifiés...)
+ANALYSIS_EXCLUDE_VENDORED = os.getenv("ANALYSIS_EXCLUDE_VENDORED", "True").lower() in ("true", "1", "t")
+# Exposer les durées par étape, les latences et tokens par modèle au format Prometheus (/metrics)
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "True").lower() in ("true", "1", "t")
+# Regroupement des petits fichiers d'un même langage dans un seul prompt (une requête par groupe et par modèle)
+ANALYSIS_PACKING_ENABLED = os.getenv("ANALYSIS_PACKING_ENABLED", "True").lower() in ("true", "1", "t")
+# Taille maximale (octets) d'un fichier pour être regroupé avec d'autres
+ANALYSIS_PACK_MAX_FILE_BYTES = int(os.getenv("ANALYSIS_PACK_MAX_FILE_BYTES", "2000"))
+# Tokens de code maximum par groupe (plafonnés par le contexte du modèle) et fichiers maximum par groupe
+ANALYSIS_PACK_MAX_TOKENS = int(os.getenv("ANALYSIS_PACK_MAX_TOKENS", "2000"))
+ANALYSIS_PACK_MAX_FILES = max(1, int(os.getenv("ANALYSIS_PACK_MAX_FILES", "8")))
+
+# Comparaison des modèles
+# Interroger les modèles en parallèle plutôt que l'un après l'autre
+OLLAMA_COMPARE_CONCURRENT = os.getenv("OLLAMA_COMPARE_CONCURRENT", "True").lower() in ("true", "1", "t")
+# Nombre maximal de modèles interrogés simultanément pour un fichier (0 = tous)
+OLLAMA_COMPARE_MAX_PARALLEL = max(0, int(os.getenv("OLLAMA_COMPARE_MAX_PARALLEL", "0")))
+# Délai maximal (secondes) pour la comparaison d'un fichier ; au-delà les modèles lents sont marqués en timeout (0 = aucun)
+OLLAMA_COMPARE_TIMEOUT = max(0.0, float(os.getenv("OLLAMA_COMPARE_TIMEOUT", "0")))
+# Ordonnancement avec plusieurs modèles : "file" (tous les modèles pour chaque fichier) ou
+# "model" (tous les fichiers avec un modèle, puis le suivant, en commençant par les modèles déjà chargés)
+OLLAMA_SCHEDULING = os.getenv("OLLAMA_SCHEDULING", "file").strip().lower()
+# Durée de maintien en mémoire d'un modèle après une requête (keep_alive d'Ollama, ex. "10m", "1h", "-1")
+OLLAMA_KEEP_ALIVE = os.getenv("OLLAMA_KEEP_ALIVE", "10m")
+
+# Génération en flux : la requête est interrompue dès que l'objet JSON de la réponse est complet
+OLLAMA_STREAMING_ENABLED = os.getenv("OLLAMA_STREAMING_ENABLED", "True").lower() in ("true", "1", "t")
+# Sortie structurée : la réponse est contrainte par un schéma JSON (paramètre "format", Ollama 0.5 ou plus)
+OLLAMA_STRUCTURED_OUTPUT = os.getenv("OLLAMA_STRUCTURED_OUTPUT", "True").lower() in ("true", "1", "t")
+# Instructions statiques en message système via /api/chat, le code dans le message utilisateur : le préfixe
+# commun à toutes les requêtes reste dans le cache KV d'Ollama (sinon prompt unique via /api/generate)
+OLLAMA_CHAT_ENABLED = os.getenv("OLLAMA_CHAT_ENABLED", "True").lower() in ("true", "1", "t")
+
+# Pools de connexions HTTP partagés (un par service)
+# Nombre total de connexions du pool Ollama et nombre par hôte
+OLLAMA_HTTP_POOL_SIZE = int(os.getenv("OLLAMA_HTTP_POOL_SIZE", "32"))
+OLLAMA_HTTP_POOL_PER_HOST = int(os.getenv("OLLAMA_HTTP_POOL_PER_HOST", "16"))
+# Nombre total de connexions du pool GitHub et nombre par hôte
+GITHUB_HTTP_POOL_SIZE = int(os.getenv("GITHUB_HTTP_POOL_SIZE", "64"))
+GITHUB_HTTP_POOL_PER_HOST = int(os.getenv("GITHUB_HTTP_POOL_PER_HOST", "16"))
+# Durée de mise en cache des résolutions DNS (secondes)
+HTTP_DNS_CACHE_TTL = int(os.getenv("HTTP_DNS_CACHE_TTL", "300"))
+# Durée de conservation des connexions inactives (keep-alive, secondes)
+HTTP_KEEPALIVE_TIMEOUT = float(os.getenv("HTTP_KEEPALIVE_TIMEOUT", "60"))
+
+# Répertoire des données persistantes (caches, état des analyses)
+DATA_DIR = os.getenv("DATA_DIR", str(Path(__file__).resolve().parent / "data"))
+
+# Cache des résultats LLM (clé : modèle + digest + prompt + hash du code)
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "True").lower() in ("true", "1", "t")
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", os.path.join(DATA_DIR, "llm_cache.sqlite3"))
+# Taille maximale du cache en mégaoctets et âge maximal des entrées en jours
+LLM_CACHE_MAX_SIZE_MB = int(os.getenv("LLM_CACHE_MAX_SIZE_MB", "512"))
+LLM_CACHE_MAX_AGE_DAYS = int(os.getenv("LLM_CACHE_MAX_AGE_DAYS", "30"))
+
+# Analyse incrémentale : dernier commit analysé et résultats par fichier, par dépôt
+ANALYSIS_STATE_PATH = os.getenv("ANALYSIS_STATE_PATH", os.path.join(DATA_DIR, "analysis_state.sqlite3"))
+
+# Stockage des tâches d'analyse et de leurs résultats (partagé entre les workers uvicorn)
+TASK_STORE_PATH = os.getenv("TASK_STORE_PATH", os.path.join(DATA_DIR, "tasks.sqlite3"))
+# Durée de conservation d'une tâche après sa dernière mise à jour (heures)
+TASK_TTL_HOURS = int(os.getenv("TASK_TTL_HOURS", "24"))
+
+# Cache local des dépôts (miroirs git nus et superficiels réutilisés entre les analyses)
+REPO_MIRROR_ENABLED = os.getenv("REPO_MIRROR_ENABLED", "True").lower() in ("true", "1", "t")
+REPO_MIRROR_DIR = os.getenv("REPO_MIRROR_DIR", os.path.join(DATA_DIR, "mirrors"))
+# Budget disque des miroirs en mégaoctets (éviction LRU au-delà)
+REPO_MIRROR_MAX_SIZE_MB = int(os.getenv("REPO_MIRROR_MAX_SIZE_MB", "10240"))
+
+# Découpage des gros fichiers en morceaux adaptés à la fenêtre de contexte
+# Taille de contexte demandée à Ollama (plafonnée par la taille native du modèle)
+OLLAMA_NUM_CTX = int(os.getenv("OLLAMA_NUM_CTX", "8192"))
+# Nombre de lignes de recouvrement entre deux morceaux consécutifs
+CHUNK_OVERLAP_LINES = int(os.getenv("CHUNK_OVERLAP_LINES", "10"))
+# Nombre maximal de morceaux analysés par fichier et par modèle
+ANALYSIS_MAX_CHUNKS_PER_FILE = int(os.getenv("ANALYSIS_MAX_CHUNKS_PER_FILE", "50"))
@@ -0,0 +1,113 @@
+import json
+import asyncio
+import logging
+from typing import Dict, Any, List, Optional, AsyncIterator
+
+# Configuration du logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class TaskEventStream:
+    """Flux d'événements d'une tâche d'analyse, rejouable à partir d'un identifiant"""
+
+    def __init__(self):
+        self.events: List[Dict[str, Any]] = []
+        self.closed = False
+        self._changed = asyncio.Event()
+
+    def publish(self, event_type: str, data: Dict[str, Any]):
+        """
+        Ajoute un événement au flux et réveille les abonnés
+
+        Args:
+            event_type: Type d'événement (progress, status, file_result, completed, error)
+            data: Contenu de l'événement (sérialisable en JSON)
+        """
+        if self.closed:
+            return
+        self.events.append({"id": len(self.events), "event": event_type, "data": data})
+        self._notify()
+
+    def close(self):
+        """Termine le flux : les abonnés reçoivent les derniers événements puis s'arrêtent"""
+        self.closed = True
+        self._notify()
+
+    def _notify(self):
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    async def subscribe(self, start: int = 0,
+                        heartbeat: Optional[float] = None) -> AsyncIterator[Optional[Dict[str, Any]]]:
+        """
+        Itère sur les événements à partir de l'identifiant start
+
+        Args:
+            start: Identifiant du premier événement à recevoir
+            heartbeat: Si défini, produit None après ce délai sans événement (en secondes)
+
+        Yields:
+            Événements {id, event, data}, ou None pour un battement de cœur
+        """
+        position = max(start, 0)
+        while True:
+            while position < len(self.events):
+                yield self.events[position]
+                position += 1
+            if self.closed:
+                return
+            waiter = self._changed
+            try:
+                await asyncio.wait_for(waiter.wait(), timeout=heartbeat)
+            except asyncio.TimeoutError:
+                yield None
+
+
+class TaskEventBroker:
+    """Registre des flux d'événements par tâche"""
+
+    def __init__(self):
+        self._streams: Dict[str, TaskEventStream] = {}
+
+    def get_stream(self, task_id: str) -> TaskEventStream:
+        """Retourne (en le créant si besoin) le flux d'une tâche"""
+        stream = self._streams.get(task_id)
+        if stream is None:
+            stream = TaskEventStream()
+            self._streams[task_id] = stream
+        return stream
+
+    def has_stream(self, task_id: str) -> bool:
+        return task_id in self._streams
+
+    def publish(self, task_id: str, event_type: str, data: Dict[str, Any]):
+        """Publie un événement sur le flux d'une tâche"""
+        self.get_stream(task_id).publish(event_type, data)
+
+    def close(self, task_id: str):
+        """Ferme le flux d'une tâche"""
+        if task_id in self._streams:
+            self._streams[task_id].close()
+
+    def discard(self, task_id: str):
+        """Oublie le flux d'une tâche (après fermeture)"""
+        stream = self._streams.pop(task_id, None)
+        if stream is not None:
+            stream.close()
+
+
+def format_sse(event: Optional[Dict[str, Any]]) -> str:
+    """
+    Formate un événement au format Server-Sent Events
+
+    Args:
+        event: Événement {id, event, data}, ou None pour un commentaire de maintien de connexion
+
+    Returns:
+        Bloc texte SSE terminé par une ligne vide
+    """
+    if event is None:
+        return ": ping\n\n"
+    data = json.dumps(event["data"], ensure_ascii=False, default=str)
+    return f"id: {event['id']}\nevent: {event['event']}\ndata: {data}\n\n"
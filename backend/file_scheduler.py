@@ -0,0 +1,147 @@
+import os
+import re
+import math
+import logging
+from typing import List, Dict, Any, Callable, Tuple
+
+# Configuration du logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Poids par langage : code serveur exposé > code client / scripts > configuration > documentation
+LANGUAGE_WEIGHTS = {
+    'PHP': 30, 'Python': 28, 'JavaScript': 26, 'TypeScript': 26, 'Java': 26, 'Ruby': 26,
+    'Go': 24, 'C#': 24, 'C': 24, 'C++': 24, 'Kotlin': 20, 'Rust': 18, 'Swift': 16,
+    'Shell': 22, 'SQL': 20, 'Dockerfile': 14, 'YAML': 10, 'XML': 8, 'TOML': 6,
+    'HTML': 8, 'JSON': 4, 'CSS': 1, 'Markdown': 0
+}
+
+# Mots du chemin signalant du code sensible (préfixes), avec leur poids
+RISKY_PATH_KEYWORDS = [
+    ("authentification", ("auth", "login", "logout", "passw", "session", "token", "oauth", "jwt",
+                          "crypt", "secret", "credential", "permission", "acl", "signin", "signup"), 30),
+    ("API / routage", ("api", "controller", "route", "router", "handler", "endpoint", "view",
+                       "middleware", "resolver", "servlet", "graphql"), 22),
+    ("fonction sensible", ("admin", "upload", "download", "payment", "billing", "webhook", "account"), 20),
+    ("accès aux données", ("sql", "query", "db", "database", "repository", "dao", "model", "orm"), 14),
+    ("exécution / désérialisation", ("exec", "shell", "command", "process", "eval", "template",
+                                     "render", "serializ", "deserializ", "pickle"), 14),
+    ("configuration", ("config", "settings", "env"), 10),
+]
+
+# Découpage d'un chemin en mots (séparateurs et camelCase)
+WORD_PATTERN = re.compile(r"[A-Z]+(?![a-z])|[A-Z]?[a-z]+|\d+")
+
+# Motifs de chemin à faible valeur (tests, exemples, documentation), avec leur pénalité
+LOW_VALUE_PATH_PATTERNS = [
+    (re.compile(r"(^|/)(tests?|spec|__tests__|__mocks__|fixtures?|mocks?)(/|$)|(_test|\.test|\.spec|_spec)\.\w+$|(^|/)test_[^/]*$", re.I), 25),
+    (re.compile(r"(^|/)(docs?|examples?|samples?|demo|benchmarks?)(/|$)", re.I), 20),
+    (re.compile(r"(^|/)(migrations?|locales?|i18n|translations?)(/|$)", re.I), 10),
+]
+
+# Points d'entrée courants (démarrage de l'application, routage principal)
+ENTRY_POINT_NAMES = {
+    'main.py', 'app.py', 'wsgi.py', 'asgi.py', 'manage.py', 'server.py', 'settings.py', 'urls.py',
+    'index.js', 'server.js', 'app.js', 'main.js', 'index.ts', 'server.ts', 'app.ts', 'main.ts',
+    'index.php', 'config.php', 'main.go', 'program.cs', 'startup.cs', 'application.java',
+    'routes.rb', 'application.rb', 'main.rs', 'main.c', 'main.cpp'
+}
+
+# Score des fichiers que l'analyse ignore (langage non pris en charge)
+UNSUPPORTED_SCORE = 0.0
+
+
+def _path_words(path: str) -> List[str]:
+    return [word.lower() for word in WORD_PATTERN.findall(path)]
+
+
+def _matches(words: List[str], keywords: Tuple[str, ...]) -> bool:
+    return any(word.startswith(keywords) for word in words)
+
+
+def score_file(relative_path: str, size: int, language: str,
+               is_config: bool = False, is_dependency: bool = False) -> Tuple[float, List[str]]:
+    """
+    Évalue l'intérêt d'analyser un fichier (plus le score est élevé, plus le fichier est prioritaire)
+
+    Args:
+        relative_path: Chemin relatif à la racine du dépôt
+        size: Taille du fichier en octets
+        language: Langage détecté
+        is_config: Fichier de configuration important (voir RepositoryAnalyzer._is_config_file)
+        is_dependency: Fichier de dépendances (voir RepositoryAnalyzer._is_dependency_file)
+
+    Returns:
+        Score et liste des raisons ayant contribué au score
+    """
+    if language == 'Inconnu':
+        return UNSUPPORTED_SCORE, ["langage non pris en charge"]
+
+    path = relative_path.replace(os.sep, "/")
+    name = os.path.basename(path).lower()
+    score = float(LANGUAGE_WEIGHTS.get(language, 10))
+    reasons = [f"langage {language}"]
+
+    # Mots sensibles : le nom du fichier compte davantage que les dossiers parents
+    name_words = _path_words(os.path.basename(path))
+    directory_words = _path_words(os.path.dirname(path))
+    for label, keywords, weight in RISKY_PATH_KEYWORDS:
+        if _matches(name_words, keywords):
+            score += weight
+            reasons.append(f"nom ({label})")
+        elif _matches(directory_words, keywords):
+            score += weight / 2
+            reasons.append(f"dossier ({label})")
+
+    for pattern, penalty in LOW_VALUE_PATH_PATTERNS:
+        if pattern.search(path):
+            score -= penalty
+            reasons.append("faible valeur (tests, exemples, documentation)")
+            break
+
+    if name in ENTRY_POINT_NAMES:
+        score += 15
+        reasons.append("point d'entrée")
+
+    if is_config:
+        # Secrets en clair, ports exposés, images de base...
+        score += 8 if is_dependency else 15
+        reasons.append("fichier de configuration")
+
+    # Taille : les fichiers minuscules contiennent peu de logique, les très gros coûtent cher
+    if size < 200:
+        score -= 10
+        reasons.append("fichier très petit")
+    else:
+        score += min(math.log2(size / 200), 8)
+        if size > 200 * 1024:
+            score -= 10
+            reasons.append("fichier très volumineux")
+
+    # Profondeur : le code applicatif est rarement très profond
+    score -= max(0, path.count("/") - 4)
+
+    return round(score, 2), reasons
+
+
+def rank_files(file_list: List[str], metadata: Callable[[str], Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Classe tous les fichiers candidats par score de risque décroissant
+
+    Args:
+        file_list: Chemins relatifs des fichiers candidats
+        metadata: Fonction retournant {size, language, is_config, is_dependency} pour un chemin
+
+    Returns:
+        Liste {path, score, reasons} triée (à score égal, ordre alphabétique)
+    """
+    ranked = []
+    for relative_path in file_list:
+        info = metadata(relative_path)
+        score, reasons = score_file(
+            relative_path, info.get("size", 0), info.get("language", "Inconnu"),
+            info.get("is_config", False), info.get("is_dependency", False)
+        )
+        ranked.append({"path": relative_path, "score": score, "reasons": reasons})
+    ranked.sort(key=lambda item: (-item["score"], item["path"]))
+    return ranked
@@ -6,6 +6,8 @@ from typing import List, Dict, Any, Optional
 import json
 from git import Repo
 import asyncio
+from http_client import session_scope
+from repo_mirror import RepositoryMirrorCache
 
 # Configuration du logging
 logging.basicConfig(level=logging.INFO)
@@ -14,14 +16,21 @@ logger = logging.getLogger(__name__)
 class GitHubAPI:
     """Classe pour interagir avec l'API GitHub"""
     
-    def __init__(self, token: str):
+    def __init__(self, token: str, session: Optional[aiohttp.ClientSession] = None,
+                 mirror_cache: Optional[RepositoryMirrorCache] = None):
         """
         Initialise l'API GitHub avec un token d'accès
         
         Args:
             token: Le token d'accès GitHub
+            session: Session aiohttp partagée (pool de connexions) ; si absente,
+                     une session temporaire est ouverte à chaque appel
+            mirror_cache: Cache local de miroirs ; si présent, clone_repository
+                          met à jour le miroir au lieu de recloner le dépôt
         """
         self.token = token
+        self.session = session
+        self.mirror_cache = mirror_cache
         self.base_url = "https://api.github.com"
         self.headers = {
             "Authorization": f"Bearer {token}",
@@ -36,7 +45,7 @@ class GitHubAPI:
         Returns:
             Dict contenant les informations de l'utilisateur
         """
-        async with aiohttp.ClientSession() as session:
+        async with session_scope(self.session) as session:
             async with session.get(
                 f"{self.base_url}/user",
                 headers=self.headers
@@ -59,7 +68,7 @@ class GitHubAPI:
         page = 1
         per_page = 100
         
-        async with aiohttp.ClientSession() as session:
+        async with session_scope(self.session) as session:
             while True:
                 async with session.get(
                     f"{self.base_url}/user/repos",
@@ -100,14 +109,20 @@ class GitHubAPI:
         
         return repos
     
-    async def clone_repository(self, repo_name: str, target_dir: str, shallow: bool = True) -> str:
+    async def clone_repository(self, repo_name: str, target_dir: str, shallow: bool = True,
+                               keep_git: bool = False) -> str:
         """
         Clone un dépôt GitHub dans un répertoire local
         
+        Avec un cache de miroirs, le dépôt n'est téléchargé qu'une fois : les
+        analyses suivantes font un fetch incrémental puis une copie locale.
+        Le miroir respecte shallow (seul le dernier commit est téléchargé).
+        
         Args:
             repo_name: Nom du dépôt (format: "username/repo")
             target_dir: Répertoire cible pour le clone
             shallow: Si True, effectue un clone superficiel (sans historique complet)
+            keep_git: Si True, conserve le dossier .git (nécessaire pour l'analyse incrémentale)
             
         Returns:
             Chemin du dépôt cloné
@@ -117,6 +132,20 @@ class GitHubAPI:
         # Utiliser le token pour l'accès
         repo_url = f"https://{self.token}@github.com/{repo_name}.git"
         
+        if self.mirror_cache is not None:
+            try:
+                await self.mirror_cache.checkout(
+                    repo_name, repo_url, repo_dir,
+                    keep_git=keep_git or not shallow,
+                    secret=self.token,
+                    shallow=shallow
+                )
+                logger.info(f"Dépôt extrait du miroir local dans {repo_dir}")
+                return repo_dir
+            except Exception as e:
+                logger.error(f"Erreur lors de la récupération du dépôt {repo_name}: {str(e)}")
+                raise Exception(f"Erreur lors du clonage du dépôt: {str(e)}")
+        
         try:
             # Exécuter le clone dans un processus distinct pour ne pas bloquer
             def clone_repo():
@@ -127,7 +156,7 @@ class GitHubAPI:
                         
                         # Supprimer le dossier .git pour éviter les problèmes d'accès
                         git_dir = os.path.join(repo_dir, '.git')
-                        if os.path.exists(git_dir):
+                        if not keep_git and os.path.exists(git_dir):
                             try:
                                 shutil.rmtree(git_dir, ignore_errors=True)
                                 logger.info(f"Dossier .git supprimé pour éviter les problèmes d'accès")
@@ -150,6 +179,71 @@ class GitHubAPI:
             logger.error(f"Erreur lors du clonage du dépôt {repo_name}: {str(e)}")
             raise Exception(f"Erreur lors du clonage du dépôt: {str(e)}")
     
+    async def get_head_commit(self, repo_path: str) -> Optional[str]:
+        """
+        Récupère le SHA du commit courant d'un dépôt cloné
+        
+        Args:
+            repo_path: Chemin du dépôt cloné (avec son dossier .git)
+            
+        Returns:
+            SHA du commit HEAD ou None si indisponible
+        """
+        def read_head():
+            return Repo(repo_path).head.commit.hexsha
+        
+        try:
+            return await asyncio.to_thread(read_head)
+        except Exception as e:
+            logger.warning(f"Impossible de lire le commit HEAD de {repo_path}: {str(e)}")
+            return None
+    
+    async def get_changed_files(self, repo_path: str, base_commit: str,
+                                repo_name: Optional[str] = None) -> Optional[List[str]]:
+        """
+        Liste les fichiers modifiés entre un commit de base et HEAD
+        
+        Le commit de base est récupéré depuis GitHub s'il est absent du clone
+        superficiel ; avec un cache de miroirs, il est d'abord ajouté au
+        miroir, origine du clone. Les renommages apparaissent sous l'ancien
+        et le nouveau chemin.
+        
+        Args:
+            repo_path: Chemin du dépôt cloné (avec son dossier .git)
+            base_commit: SHA du commit de référence (dernière analyse)
+            repo_name: Nom du dépôt (format: "username/repo"), requis avec un cache de miroirs
+            
+        Returns:
+            Chemins modifiés, ajoutés ou supprimés (relatifs à la racine), ou None
+            si la différence ne peut pas être calculée
+        """
+        def has_commit() -> bool:
+            try:
+                Repo(repo_path).commit(base_commit)
+                return True
+            except Exception:
+                return False
+        
+        def diff_files():
+            repo = Repo(repo_path)
+            if not has_commit():
+                repo.git.fetch("--depth=1", "origin", base_commit)
+            output = repo.git.diff("--name-only", "--no-renames", base_commit, "HEAD")
+            return [line for line in output.splitlines() if line]
+        
+        try:
+            if self.mirror_cache is not None and repo_name and not await asyncio.to_thread(has_commit):
+                # Le clone a pour origine le miroir local : le commit est ajouté au miroir depuis GitHub
+                await self.mirror_cache.fetch_commit(
+                    repo_name, f"https://{self.token}@github.com/{repo_name}.git", base_commit, secret=self.token
+                )
+            changed = await asyncio.to_thread(diff_files)
+            logger.info(f"{len(changed)} fichier(s) modifié(s) depuis le commit {base_commit[:12]}")
+            return changed
+        except Exception as e:
+            logger.warning(f"Impossible de calculer les modifications depuis {base_commit[:12]}: {str(e)}")
+            return None
+    
     async def get_repository_languages(self, repo_name: str) -> Dict[str, int]:
         """
         Récupère les langages utilisés dans un dépôt GitHub
@@ -160,7 +254,7 @@ class GitHubAPI:
         Returns:
             Dictionnaire des langages avec leur proportion en octets
         """
-        async with aiohttp.ClientSession() as session:
+        async with session_scope(self.session) as session:
             async with session.get(
                 f"{self.base_url}/repos/{repo_name}/languages",
                 headers=self.headers
@@ -183,7 +277,7 @@ class GitHubAPI:
         Returns:
             Liste des fichiers et dossiers à ce chemin
         """
-        async with aiohttp.ClientSession() as session:
+        async with session_scope(self.session) as session:
             async with session.get(
                 f"{self.base_url}/repos/{repo_name}/contents/{path}",
                 headers=self.headers
@@ -206,7 +300,7 @@ class GitHubAPI:
         Returns:
             Contenu du fichier (décodé en texte)
         """
-        async with aiohttp.ClientSession() as session:
+        async with session_scope(self.session) as session:
             async with session.get(
                 f"{self.base_url}/repos/{repo_name}/contents/{file_path}",
                 headers=self.headers
@@ -0,0 +1,66 @@
+import aiohttp
+import logging
+from contextlib import asynccontextmanager
+from typing import Optional, AsyncIterator
+
+from config import HTTP_DNS_CACHE_TTL, HTTP_KEEPALIVE_TIMEOUT
+
+# Configuration du logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def create_client_session(pool_size: int,
+                          pool_per_host: int,
+                          dns_cache_ttl: int = HTTP_DNS_CACHE_TTL,
+                          keepalive_timeout: float = HTTP_KEEPALIVE_TIMEOUT,
+                          timeout: Optional[aiohttp.ClientTimeout] = None,
+                          **session_kwargs) -> aiohttp.ClientSession:
+    """
+    Crée une session aiohttp longue durée avec un pool de connexions
+    
+    Doit être appelée depuis une boucle asyncio en cours d'exécution
+    (par exemple dans le lifespan FastAPI).
+    
+    Args:
+        pool_size: Nombre total de connexions simultanées (0 = illimité)
+        pool_per_host: Nombre de connexions simultanées par hôte (0 = illimité)
+        dns_cache_ttl: Durée de mise en cache des résolutions DNS en secondes
+        keepalive_timeout: Durée de conservation des connexions inactives en secondes
+        timeout: Timeout par défaut des requêtes (défaut aiohttp si None)
+        **session_kwargs: Paramètres supplémentaires pour aiohttp.ClientSession
+        
+    Returns:
+        Session aiohttp partagée
+    """
+    connector = aiohttp.TCPConnector(
+        limit=pool_size,
+        limit_per_host=pool_per_host,
+        use_dns_cache=dns_cache_ttl > 0,
+        ttl_dns_cache=dns_cache_ttl or None,
+        keepalive_timeout=keepalive_timeout
+    )
+    if timeout is not None:
+        session_kwargs["timeout"] = timeout
+    logger.info(f"Création d'un pool HTTP ({pool_size} connexions, {pool_per_host} par hôte)")
+    return aiohttp.ClientSession(connector=connector, **session_kwargs)
+
+
+@asynccontextmanager
+async def session_scope(session: Optional[aiohttp.ClientSession] = None,
+                        **session_kwargs) -> AsyncIterator[aiohttp.ClientSession]:
+    """
+    Fournit la session partagée si elle est disponible, sinon une session temporaire
+    
+    Args:
+        session: Session partagée injectée (peut être None ou fermée)
+        **session_kwargs: Paramètres de la session temporaire
+        
+    Yields:
+        Session aiohttp à utiliser pour la requête
+    """
+    if session is not None and not session.closed:
+        yield session
+    else:
+        async with aiohttp.ClientSession(**session_kwargs) as temporary_session:
+            yield temporary_session
@@ -0,0 +1,338 @@
+import re
+import json
+import logging
+from json.decoder import scanstring
+from typing import List, Any, Optional, Tuple
+
+# Configuration du logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Éléments lexicaux du parsing tolérant (séparateurs ignorés : une virgule manquante ou en trop est acceptée)
+_SEPARATORS = re.compile(r"[\s,:]+")
+_NUMBER = re.compile(r"-?(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?")
+# Plage de lignes sans guillemets ([15-20]) : lue comme la chaîne "15-20", pas comme 15 et -15
+_LINE_RANGE = re.compile(r"(\d+)\s*-\s*(\d+)(?![\d.eE])")
+# Caractères après lesquels un "-" peut commencer un nombre négatif
+_NUMBER_PREFIXES = " \t\r\n,:["
+_WORD = re.compile(r"[A-Za-z_$][\w$-]*")
+_KEY_SEPARATOR = re.compile(r"\s*:")
+# Début plausible d'un JSON : "{" suivi d'une clé ou de "}", "[" suivi d'une valeur (pas "{ voir" ni "[entrée]")
+_JSON_START = re.compile(r"""\{\s*(?:["'}]|//|[A-Za-z_$][\w$-]*\s*:)|\[\s*[\[{"'\d\-\]]""")
+# Profondeur jusqu'à laquelle un conteneur est d'abord décodé par le décodeur C de json (cas valide)
+_FAST_DECODE_DEPTH = 3
+# Au-delà de cette profondeur, la réponse n'est plus une analyse : le parsing s'arrête
+_MAX_DEPTH = 32
+_OPENING_RUN = re.compile(r"[\[{\s]*")
+_DECODER = json.JSONDecoder()
+# Littéraux JSON, et leurs équivalents Python que certains modèles produisent
+_LITERALS = {"true": True, "false": False, "null": None, "True": True, "False": False, "None": None}
+_ESCAPES = {'"': '"', "'": "'", "\\": "\\", "/": "/", "b": "\b", "f": "\f", "n": "\n", "r": "\r", "t": "\t"}
+
+
+class JSONObjectStream:
+    """
+    Repère, au fil d'une génération en flux, le premier objet JSON complet de la réponse
+
+    Chaque caractère n'est examiné qu'une fois : l'état (profondeur des
+    accolades, chaîne en cours, échappement) est conservé d'un fragment à
+    l'autre. Les accolades apparaissant dans une chaîne JSON sont ignorées.
+    """
+
+    def __init__(self, required_key: str = "vulnerabilities"):
+        """
+        Args:
+            required_key: Clé que doit contenir l'objet attendu (les autres objets sont ignorés)
+        """
+        self.required_key = required_key
+        self._parts: List[str] = []
+        self._object_parts: List[str] = []
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._trailing: List[str] = []
+        self.object_text: Optional[str] = None
+
+    @property
+    def text(self) -> str:
+        """Texte reçu jusqu'ici"""
+        return "".join(self._parts)
+
+    @property
+    def trailing_text(self) -> str:
+        """Texte reçu après l'objet JSON complet"""
+        return "".join(self._trailing)
+
+    def feed(self, fragment: str) -> Optional[str]:
+        """
+        Ajoute un fragment de la réponse
+
+        Args:
+            fragment: Texte généré depuis le fragment précédent
+
+        Returns:
+            Texte de l'objet JSON dès qu'il est complet et valide, None sinon
+        """
+        if not fragment:
+            return self.object_text
+        self._parts.append(fragment)
+        if self.object_text is not None:
+            self._trailing.append(fragment)
+            return self.object_text
+        segment_start = 0 if self._depth > 0 else None
+
+        for i, char in enumerate(fragment):
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                # Guillemets hors d'un objet (prose) : sans effet sur la structure
+                self._in_string = self._depth > 0
+            elif char == "{":
+                if self._depth == 0:
+                    segment_start = i
+                    self._object_parts = []
+                self._depth += 1
+            elif char == "}" and self._depth > 0:
+                self._depth -= 1
+                if self._depth == 0:
+                    candidate = "".join(self._object_parts) + fragment[segment_start:i + 1]
+                    self._object_parts = []
+                    segment_start = None
+                    if self._is_expected_object(candidate):
+                        self.object_text = candidate
+                        self._trailing.append(fragment[i + 1:])
+                        return candidate
+
+        if self._depth > 0 and segment_start is not None:
+            self._object_parts.append(fragment[segment_start:])
+        return None
+
+    def _is_expected_object(self, candidate: str) -> bool:
+        try:
+            parsed = json.loads(candidate)
+        except ValueError:
+            # Objet invalide (virgule en trop...) : la réponse complète passera par l'extraction tolérante
+            return False
+        return isinstance(parsed, dict) and isinstance(parsed.get(self.required_key), list)
+
+
+def _scan_string(text: str, start: int) -> Tuple[str, int]:
+    """
+    Lit une chaîne entre guillemets doubles ou simples
+
+    Une chaîne non terminée (réponse tronquée) s'étend jusqu'à la fin du
+    texte ; les retours à la ligne non échappés sont acceptés.
+
+    Returns:
+        (valeur, position suivant la chaîne)
+    """
+    quote = text[start]
+    if quote == '"':
+        try:
+            return scanstring(text, start + 1, False)
+        except ValueError:
+            # Chaîne non terminée ou échappement invalide : lecture tolérante ci-dessous
+            pass
+
+    parts = []
+    position = start + 1
+    length = len(text)
+    next_quote = text.find(quote, position)
+    next_escape = text.find("\\", position)
+    while position < length:
+        # Positions mises en cache : chaque caractère n'est parcouru qu'une fois
+        if next_quote != -1 and next_quote < position:
+            next_quote = text.find(quote, position)
+        if next_escape != -1 and next_escape < position:
+            next_escape = text.find("\\", position)
+        if next_quote == -1 and next_escape == -1:
+            parts.append(text[position:])
+            return "".join(parts), length
+        if next_escape == -1 or (next_quote != -1 and next_quote < next_escape):
+            parts.append(text[position:next_quote])
+            return "".join(parts), next_quote + 1
+        parts.append(text[position:next_escape])
+        escaped = text[next_escape + 1:next_escape + 2]
+        if escaped == "u" and re.fullmatch(r"[0-9a-fA-F]{4}", text[next_escape + 2:next_escape + 6]):
+            parts.append(chr(int(text[next_escape + 2:next_escape + 6], 16)))
+            position = next_escape + 6
+        else:
+            parts.append(_ESCAPES.get(escaped, escaped))
+            position = next_escape + 2
+    return "".join(parts), length
+
+
+def _attach(stack: List[list], value: Any) -> bool:
+    """Ajoute une valeur au conteneur ouvert ; False si elle ne peut pas y prendre place"""
+    container, key = stack[-1]
+    if isinstance(container, list):
+        container.append(value)
+    elif key is None:
+        if not isinstance(value, str):
+            return False
+        stack[-1][1] = value
+    else:
+        container[key] = value
+        stack[-1][1] = None
+    return True
+
+
+def parse_tolerant(text: str, start: int = 0, decode_limit: Optional[List[int]] = None) -> Tuple[Any, int]:
+    """
+    Parse une valeur JSON en temps linéaire
+
+    Les conteneurs des premiers niveaux sont d'abord confiés au décodeur
+    C de json ; en cas d'échec, le parsing tolérant reprend caractère par
+    caractère. Le décodeur C n'est plus tenté avant la position où il a
+    déjà échoué : chaque caractère n'est décodé qu'une fois par lui, même
+    lorsque l'appelant relance le parsing plus loin dans le texte.
+
+    Tolère les défauts courants des réponses de modèles : virgules en trop
+    ou manquantes, commentaires // et /* */, chaînes entre guillemets
+    simples, littéraux Python (True, None), clés sans guillemets et
+    réponse tronquée (les conteneurs ouverts sont refermés, une clé sans
+    valeur est ignorée). Une plage de lignes sans guillemets (15-20) est
+    lue comme la chaîne "15-20". Le parsing s'arrête au premier élément
+    inattendu ou au-delà de _MAX_DEPTH niveaux d'imbrication.
+
+    Args:
+        text: Texte de la réponse
+        start: Position du début de la valeur (en général "{" ou "[")
+        decode_limit: [position] avant laquelle le décodeur C n'est pas tenté,
+                      mise à jour en place (partagée entre les appels sur un même texte)
+
+    Returns:
+        (valeur ou None, position où le parsing s'est arrêté)
+    """
+    stack: List[list] = []
+    position = start
+    if decode_limit is None:
+        decode_limit = [0]
+    length = len(text)
+    while position < length:
+        separator = _SEPARATORS.match(text, position)
+        if separator:
+            position = separator.end()
+            continue
+        char = text[position]
+        if text.startswith("//", position):
+            end = text.find("\n", position)
+            position = length if end == -1 else end + 1
+            continue
+        if text.startswith("/*", position):
+            end = text.find("*/", position + 2)
+            position = length if end == -1 else end + 2
+            continue
+
+        if char == "{" or char == "[":
+            value = None
+            if len(stack) < _FAST_DECODE_DEPTH and position >= decode_limit[0]:
+                # Conteneur valide (cas courant) : décodé d'un bloc ; sinon parsing tolérant
+                try:
+                    value, position = _DECODER.raw_decode(text, position)
+                except json.JSONDecodeError as e:
+                    # Les conteneurs imbriqués avant l'erreur échoueraient au même endroit
+                    decode_limit[0] = max(decode_limit[0], e.pos)
+                    value = None
+                except RecursionError:
+                    # Imbrication trop profonde pour le décodeur C : parsing tolérant jusqu'au bout
+                    decode_limit[0] = length
+                    value = None
+            if value is None:
+                if len(stack) >= _MAX_DEPTH:
+                    # Les ouvertures suivantes ne sont pas des points de départ à réessayer
+                    position = _OPENING_RUN.match(text, position).end()
+                    break
+                stack.append([{} if char == "{" else [], None])
+                position += 1
+                continue
+        elif char == "}" or char == "]":
+            if not stack:
+                break
+            # Un crochet fermant d'un autre type ferme tout de même le conteneur ouvert
+            value = stack.pop()[0]
+            position += 1
+        elif char == '"' or char == "'":
+            value, position = _scan_string(text, position)
+        else:
+            expects_value = stack and (isinstance(stack[-1][0], list) or stack[-1][1] is not None)
+            line_range = _LINE_RANGE.match(text, position) if expects_value else None
+            number = None if line_range else _NUMBER.match(text, position)
+            if number and char == "-" and position > start and text[position - 1] not in _NUMBER_PREFIXES:
+                # "-" collé à la valeur précédente (plage coupée par la fin du texte...) : pas un nombre négatif
+                number = None
+            word = None if line_range or number else _WORD.match(text, position)
+            if (line_range or number) and (line_range or number).end() == length:
+                # Nombre coupé par la fin de la réponse : valeur incertaine, ignorée
+                break
+            if line_range:
+                value = f"{line_range.group(1)}-{line_range.group(2)}"
+                position = line_range.end()
+            elif number:
+                literal = number.group()
+                value = float(literal) if any(c in literal for c in ".eE") else int(literal)
+                position = number.end()
+            elif word and word.group() in _LITERALS:
+                value = _LITERALS[word.group()]
+                position = word.end()
+            elif word and stack and isinstance(stack[-1][0], dict) and stack[-1][1] is None \
+                    and _KEY_SEPARATOR.match(text, word.end()):
+                value = word.group()
+                position = word.end()
+            else:
+                break
+
+        if not stack:
+            return value, position
+        if not _attach(stack, value):
+            break
+
+    # Fin du texte ou élément inattendu : refermer les conteneurs encore ouverts
+    value = None
+    while stack:
+        value = stack.pop()[0]
+        if stack:
+            _attach(stack, value)
+    return value, position
+
+
+def extract_json(text: str, required_key: str = "vulnerabilities") -> Optional[Any]:
+    """
+    Extrait le JSON d'une réponse de modèle en temps linéaire
+
+    Chaque "{" ou "[" pouvant commencer un JSON est un point de départ du
+    parsing tolérant, et la recherche reprend là où le parsing précédent
+    s'est arrêté.
+
+    Args:
+        text: Texte de la réponse (JSON seul, bloc ```json, JSON entouré de texte...)
+        required_key: Clé de l'objet attendu
+
+    Returns:
+        Premier objet contenant la liste required_key, à défaut le premier objet
+        non vide ou une liste d'objets (enveloppée dans {required_key: liste}),
+        None si la réponse ne contient pas de JSON
+    """
+    fallback = None
+    position = 0
+    decode_limit = [0]
+    while True:
+        match = _JSON_START.search(text, position)
+        if match is None:
+            return fallback
+        start = match.start()
+        value, end = parse_tolerant(text, start, decode_limit)
+        if isinstance(value, dict):
+            if isinstance(value.get(required_key), list):
+                return value
+            if fallback is None and value:
+                fallback = value
+        elif isinstance(value, list) and value and all(isinstance(item, dict) for item in value):
+            if fallback is None:
+                fallback = {required_key: value}
+        position = max(end, start + 1)
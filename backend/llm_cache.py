@@ -0,0 +1,200 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+import asyncio
+from typing import Dict, Any, Optional
+
+from config import LLM_CACHE_PATH, LLM_CACHE_MAX_SIZE_MB, LLM_CACHE_MAX_AGE_DAYS
+
+# Configuration du logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Version du format des entrées : à incrémenter si le prompt final ou le parsing change
+CACHE_FORMAT_VERSION = 2
+
+
+class LLMResultCache:
+    """Cache persistant (SQLite) des réponses d'analyse Ollama, adressé par contenu"""
+
+    def __init__(self, db_path: str = LLM_CACHE_PATH,
+                 max_size_bytes: int = LLM_CACHE_MAX_SIZE_MB * 1024 * 1024,
+                 max_age_seconds: int = LLM_CACHE_MAX_AGE_DAYS * 24 * 3600,
+                 eviction_interval: int = 100):
+        """
+        Initialise le cache des résultats LLM
+
+        Args:
+            db_path: Chemin du fichier SQLite
+            max_size_bytes: Taille maximale des réponses stockées (éviction LRU au-delà)
+            max_age_seconds: Âge maximal d'une entrée avant suppression
+            eviction_interval: Nombre d'écritures entre deux passes d'éviction
+        """
+        self.db_path = db_path
+        self.max_size_bytes = max_size_bytes
+        self.max_age_seconds = max_age_seconds
+        self.eviction_interval = max(1, eviction_interval)
+        self.hits = 0
+        self.misses = 0
+        self._writes_since_eviction = 0
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(os.path.abspath(db_path))
+        os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS llm_results (
+                cache_key TEXT PRIMARY KEY,
+                model TEXT NOT NULL,
+                response TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_results_access ON llm_results(last_access)")
+        self._conn.commit()
+        self._evict()
+
+    @staticmethod
+    def make_key(model: str, model_digest: Optional[str], prompt: str, code: str,
+                 options: Optional[Dict[str, Any]] = None) -> str:
+        """
+        Construit la clé de cache d'une analyse
+
+        Args:
+            model: Nom du modèle
+            model_digest: Digest du modèle (change quand le modèle est mis à jour)
+            prompt: Instructions d'analyse (create_vulnerability_prompt)
+            code: Code source analysé
+            options: Options de génération envoyées à Ollama
+
+        Returns:
+            Clé hexadécimale SHA-256
+        """
+        material = json.dumps({
+            "version": CACHE_FORMAT_VERSION,
+            "model": model,
+            "digest": model_digest or "",
+            "prompt": hashlib.sha256(prompt.encode("utf-8")).hexdigest(),
+            "code": hashlib.sha256(code.encode("utf-8")).hexdigest(),
+            "options": options or {}
+        }, sort_keys=True)
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Récupère une réponse en cache
+
+        Args:
+            key: Clé de cache (voir make_key)
+
+        Returns:
+            Réponse d'analyse ou None si absente ou expirée
+        """
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response, created_at FROM llm_results WHERE cache_key = ?", (key,)
+            ).fetchone()
+            if row is None or now - row[1] > self.max_age_seconds:
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE llm_results SET last_access = ? WHERE cache_key = ?", (now, key))
+            self._conn.commit()
+            self.hits += 1
+        try:
+            return json.loads(row[0])
+        except json.JSONDecodeError:
+            logger.warning(f"Entrée de cache illisible ignorée: {key}")
+            return None
+
+    def set(self, key: str, model: str, response: Dict[str, Any]):
+        """
+        Enregistre une réponse dans le cache
+
+        Args:
+            key: Clé de cache (voir make_key)
+            model: Nom du modèle (pour information)
+            response: Réponse d'analyse à stocker
+        """
+        payload = json.dumps(response, ensure_ascii=False)
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_results (cache_key, model, response, size, created_at, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, model, payload, len(payload.encode("utf-8")), now, now)
+            )
+            self._conn.commit()
+            self._writes_since_eviction += 1
+            if self._writes_since_eviction >= self.eviction_interval:
+                self._writes_since_eviction = 0
+                self._evict_locked()
+
+    async def aget(self, key: str) -> Optional[Dict[str, Any]]:
+        """Version asynchrone de get (exécutée hors de la boucle d'événements)"""
+        return await asyncio.to_thread(self.get, key)
+
+    async def aset(self, key: str, model: str, response: Dict[str, Any]):
+        """Version asynchrone de set (exécutée hors de la boucle d'événements)"""
+        await asyncio.to_thread(self.set, key, model, response)
+
+    def _evict(self):
+        """Supprime les entrées expirées puis les moins récemment utilisées au-delà de la taille maximale"""
+        with self._lock:
+            self._evict_locked()
+
+    def _evict_locked(self):
+        try:
+            cutoff = time.time() - self.max_age_seconds
+            expired = self._conn.execute("DELETE FROM llm_results WHERE created_at < ?", (cutoff,)).rowcount
+
+            total_size = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM llm_results").fetchone()[0]
+            removed = 0
+            if total_size > self.max_size_bytes:
+                rows = self._conn.execute("SELECT cache_key, size FROM llm_results ORDER BY last_access ASC")
+                to_delete = []
+                for cache_key, size in rows:
+                    if total_size <= self.max_size_bytes:
+                        break
+                    to_delete.append((cache_key,))
+                    total_size -= size
+                self._conn.executemany("DELETE FROM llm_results WHERE cache_key = ?", to_delete)
+                removed = len(to_delete)
+            self._conn.commit()
+
+            if expired or removed:
+                logger.info(f"Cache LLM: {expired} entrée(s) expirée(s) et {removed} entrée(s) LRU supprimée(s)")
+        except sqlite3.Error as e:
+            logger.warning(f"Erreur lors de l'éviction du cache LLM: {str(e)}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Statistiques globales du cache
+
+        Returns:
+            Compteurs de hits/misses, nombre d'entrées et taille stockée
+        """
+        with self._lock:
+            entries, size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM llm_results"
+            ).fetchone()
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total * 100, 1) if total else 0.0,
+            "entries": entries,
+            "size_bytes": size
+        }
+
+    def close(self):
+        """Ferme la connexion SQLite"""
+        with self._lock:
+            self._conn.close()
@@ -1,29 +1,91 @@
-from fastapi import FastAPI, HTTPException, Depends, Body, BackgroundTasks
+from fastapi import FastAPI, HTTPException, BackgroundTasks, Header, Query
+from fastapi.responses import StreamingResponse, JSONResponse, Response
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import List, Dict, Any, Optional
 import logging
 import os
 import tempfile
+import uuid
 import shutil
-import json
+import asyncio
+import aiohttp
+from contextlib import asynccontextmanager
 from datetime import datetime
 
 # Import du module de configuration
-from config import ALLOWED_ORIGINS, OLLAMA_API_URL, DEBUG
+from config import (
+    ALLOWED_ORIGINS, DEBUG,
+    OLLAMA_HTTP_POOL_SIZE, OLLAMA_HTTP_POOL_PER_HOST,
+    GITHUB_HTTP_POOL_SIZE, GITHUB_HTTP_POOL_PER_HOST, LLM_CACHE_ENABLED, REPO_MIRROR_ENABLED,
+    ANALYSIS_WORKER_PROCESSES, METRICS_ENABLED
+)
 
 # Import des modules personnalisés
 from github import GitHubAPI
 from ollama import OllamaManager
 from analyzer import RepositoryAnalyzer
 from report import ReportGenerator
+from http_client import create_client_session
+from llm_cache import LLMResultCache
+from analysis_state import AnalysisStateStore
+from repo_mirror import RepositoryMirrorCache
+from events import TaskEventBroker, format_sse
+from task_store import TaskStore, SQLiteTaskStore, FINAL_STATUSES
+from worker_pool import AnalysisWorkerPool, run_cancellable
+from scan_budget import ScanBudget
+from metrics import REGISTRY, stage_timer, ANALYSIS_TASKS, ANALYSIS_TASKS_IN_FLIGHT
+from result_query import (
+    parse_list_param, select_fields, filter_vulnerabilities, paginate,
+    compute_result_etag, make_etag, etag_matches
+)
 
 # Configuration du logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+@asynccontextmanager
+async def analysis_resources(app: FastAPI):
+    """Crée les ressources partagées (pools HTTP, caches, stockages) et les libère en sortie"""
+    app.state.ollama_session = create_client_session(
+        OLLAMA_HTTP_POOL_SIZE,
+        OLLAMA_HTTP_POOL_PER_HOST,
+        timeout=aiohttp.ClientTimeout(total=None)  # Les modèles locaux peuvent être lents
+    )
+    app.state.github_session = create_client_session(GITHUB_HTTP_POOL_SIZE, GITHUB_HTTP_POOL_PER_HOST)
+    app.state.llm_cache = LLMResultCache() if LLM_CACHE_ENABLED else None
+    app.state.analysis_state = AnalysisStateStore()
+    app.state.task_store = SQLiteTaskStore()
+    app.state.repo_mirrors = RepositoryMirrorCache() if REPO_MIRROR_ENABLED else None
+    # Gestionnaire partagé : les limites par modèle s'appliquent à toutes les analyses
+    app.state.ollama_manager = OllamaManager(session=app.state.ollama_session, cache=app.state.llm_cache)
+    try:
+        yield
+    finally:
+        await app.state.ollama_session.close()
+        await app.state.github_session.close()
+        logger.info("Pools de connexions HTTP fermés")
+        if app.state.llm_cache is not None:
+            app.state.llm_cache.close()
+        app.state.analysis_state.close()
+        app.state.task_store.close()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Démarre les ressources partagées et le pool de workers d'analyse, puis les arrête"""
+    async with analysis_resources(app):
+        app.state.worker_pool = None
+        if ANALYSIS_WORKER_PROCESSES > 0:
+            app.state.worker_pool = AnalysisWorkerPool(ANALYSIS_WORKER_PROCESSES, app.state.task_store, task_events)
+            await app.state.worker_pool.start()
+        try:
+            yield
+        finally:
+            if app.state.worker_pool is not None:
+                await app.state.worker_pool.stop()
+
 # Création de l'application FastAPI
-app = FastAPI(title="Analyseur de Vulnérabilités GitHub")
+app = FastAPI(title="Analyseur de Vulnérabilités GitHub", lifespan=lifespan)
 
 # Configuration CORS pour permettre les requêtes depuis le frontend
 app.add_middleware(
@@ -49,16 +111,28 @@ class Repository(BaseModel):
     language: Optional[str] = None
     default_branch: str
 
+class AnalysisBudget(BaseModel):
+    max_files: Optional[int] = Field(None, gt=0)  # Plafonné par ANALYSIS_MAX_FILES
+    max_seconds: Optional[float] = Field(None, gt=0)  # Durée totale de l'analyse (hors attente en file)
+    max_prompt_tokens: Optional[int] = Field(None, gt=0)  # Tokens de prompt, tous modèles confondus
+    max_file_seconds: Optional[float] = Field(None, gt=0)  # Latence maximale par fichier
+
 class AnalysisRequest(BaseModel):
     token: str
     repo_name: str
     models: List[str] = []  # Si vide, tous les modèles disponibles seront utilisés
+    max_concurrency: Optional[int] = None  # Si vide, ANALYSIS_MAX_CONCURRENCY est utilisé
+    incremental: bool = False  # Ne réanalyser que les fichiers modifiés depuis la dernière analyse
+    budget: Optional[AnalysisBudget] = None  # Si défini, résultat partiel une fois le budget épuisé
 
 class AnalysisStatus(BaseModel):
     task_id: str
     status: str
     progress: float = 0.0
-    result: Optional[Dict[str, Any]] = None
+    counters: Dict[str, int] = {}
+    error: Optional[str] = None
+    result_available: bool = False
+    queue_position: Optional[int] = None
 
 class VulnerabilityReport(BaseModel):
     repo_name: str
@@ -67,18 +141,65 @@ class VulnerabilityReport(BaseModel):
     summary: Dict[str, Any]
     best_model: str
 
-# Stockage des tâches en cours (en mémoire - à remplacer par une base de données pour la production)
-tasks = {}
+def get_github_api(token: str) -> GitHubAPI:
+    """Crée un client GitHub utilisant le pool de connexions et le cache de miroirs partagés"""
+    return GitHubAPI(
+        token,
+        session=getattr(app.state, "github_session", None),
+        mirror_cache=getattr(app.state, "repo_mirrors", None)
+    )
+
+def get_ollama_manager() -> OllamaManager:
+    """Retourne le gestionnaire Ollama partagé (ou un gestionnaire autonome hors lifespan)"""
+    return getattr(app.state, "ollama_manager", None) or OllamaManager()
+
+def get_analysis_state_store() -> AnalysisStateStore:
+    """Retourne le stockage partagé de l'état des analyses incrémentales"""
+    if getattr(app.state, "analysis_state", None) is None:
+        app.state.analysis_state = AnalysisStateStore()
+    return app.state.analysis_state
+
+def get_task_store() -> TaskStore:
+    """Retourne le stockage partagé des tâches d'analyse"""
+    if getattr(app.state, "task_store", None) is None:
+        app.state.task_store = SQLiteTaskStore()
+    return app.state.task_store
+
+# Flux d'événements des tâches (progression et résultats partiels en temps réel)
+task_events = TaskEventBroker()
+
+# Intervalle des battements de cœur SSE (secondes)
+SSE_HEARTBEAT_SECONDS = 15
+
+# Intervalle de relecture du stockage pour une tâche exécutée par un autre worker (secondes)
+TASK_POLL_SECONDS = 1.0
+
+def update_task(task_id: str, **fields):
+    """Met à jour l'état d'une tâche et publie les changements de statut et de progression"""
+    get_task_store().update(task_id, **fields)
+    if "status" in fields:
+        task_events.publish(task_id, "status", {"status": fields["status"]})
+    if "progress" in fields:
+        task_events.publish(task_id, "progress", {"progress": fields["progress"]})
 
 # Route pour tester la connexion
 @app.get("/api/health")
 def health_check():
     return {"status": "ok", "message": "Service opérationnel"}
 
+# Route des métriques Prometheus (workers compris)
+@app.get("/metrics")
+def get_metrics():
+    if not METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail="Métriques désactivées")
+    worker_pool = getattr(app.state, "worker_pool", None)
+    extra = worker_pool.metrics_snapshots() if worker_pool is not None else []
+    return Response(content=REGISTRY.render(extra), media_type="text/plain; version=0.0.4")
+
 # Route pour valider un token GitHub
 @app.post("/api/auth/validate")
 async def validate_github_token(token_data: GitHubToken):
-    github_api = GitHubAPI(token_data.token)
+    github_api = get_github_api(token_data.token)
     try:
         user = await github_api.get_user()
         return {"valid": True, "user": user}
@@ -89,7 +210,7 @@ async def validate_github_token(token_data: GitHubToken):
 # Route pour obtenir la liste des dépôts
 @app.post("/api/repos/list")
 async def list_repositories(token_data: GitHubToken):
-    github_api = GitHubAPI(token_data.token)
+    github_api = get_github_api(token_data.token)
     try:
         repos = await github_api.get_repositories()
         return {"repositories": repos}
@@ -101,7 +222,7 @@ async def list_repositories(token_data: GitHubToken):
 @app.get("/api/ollama/models")
 async def list_ollama_models():
     try:
-        ollama_manager = OllamaManager()
+        ollama_manager = get_ollama_manager()
         models = await ollama_manager.list_models()
         return {"models": models}
     except Exception as e:
@@ -111,34 +232,76 @@ async def list_ollama_models():
 # Route pour démarrer une analyse
 @app.post("/api/analysis/start")
 async def start_analysis(analysis_request: AnalysisRequest, background_tasks: BackgroundTasks):
-    task_id = f"task_{datetime.now().strftime('%Y%m%d%H%M%S')}_{analysis_request.repo_name.replace('/', '_')}"
+    # Suffixe aléatoire : deux analyses du même dépôt lancées dans la même seconde ont des identifiants distincts
+    task_id = (f"task_{datetime.now().strftime('%Y%m%d%H%M%S')}_{analysis_request.repo_name.replace('/', '_')}"
+               f"_{uuid.uuid4().hex[:8]}")
     
-    # Initialisation de l'état de la tâche
-    tasks[task_id] = {
-        "status": "initialisé",
-        "progress": 0.0,
-        "result": None,
-        "repo_name": analysis_request.repo_name,
+    # Purge des tâches expirées et de leurs flux d'événements
+    task_store = get_task_store()
+    for expired_task_id in task_store.evict_expired():
+        task_events.discard(expired_task_id)
+    
+    # Initialisation de l'état de la tâche (le token n'est jamais enregistré)
+    task_store.create(
+        task_id,
+        analysis_request.repo_name,
+        analysis_request.models,
+        {"files_completed": 0, "files_with_vulnerabilities": 0, "vulnerabilities": 0}
+    )
+    # Flux créé dès maintenant : un client SSE peut s'abonner avant le démarrage de l'analyse
+    task_events.get_stream(task_id)
+    
+    job_arguments = {
         "token": analysis_request.token,
-        "models": analysis_request.models
+        "repo_name": analysis_request.repo_name,
+        "models": analysis_request.models,
+        "max_concurrency": analysis_request.max_concurrency,
+        "incremental": analysis_request.incremental,
+        "budget": analysis_request.budget.model_dump() if analysis_request.budget else None
     }
+    worker_pool = getattr(app.state, "worker_pool", None)
+    if worker_pool is not None:
+        # L'API se contente de mettre l'analyse en file : un processus worker l'exécutera
+        update_task(task_id, status="en attente")
+        worker_pool.submit(task_id, **job_arguments)
+        return {"task_id": task_id, "status": "en attente"}
     
-    # Démarrage de l'analyse en arrière-plan
+    # Sans pool de workers : analyse en arrière-plan dans le processus API
     background_tasks.add_task(
-        run_analysis_task,
-        task_id,
-        analysis_request.token,
-        analysis_request.repo_name,
-        analysis_request.models
+        run_cancellable,
+        run_analysis_task(task_id, **job_arguments),
+        lambda: task_store.is_cancel_requested(task_id)
     )
     
     return {"task_id": task_id, "status": "initialisé"}
 
-async def run_analysis_task(task_id: str, token: str, repo_name: str, models: List[str]):
+# Route pour annuler une analyse (en attente ou en cours)
+@app.post("/api/analysis/cancel/{task_id}")
+async def cancel_analysis(task_id: str):
+    task_store = get_task_store()
+    task = task_store.get_status(task_id)
+    if task is None:
+        raise HTTPException(status_code=404, detail="Tâche non trouvée")
+    if not task_store.request_cancel(task_id):
+        raise HTTPException(status_code=409, detail=f"Analyse déjà terminée (statut : {task['status']})")
+    
+    worker_pool = getattr(app.state, "worker_pool", None)
+    if worker_pool is not None and worker_pool.cancel_queued(task_id):
+        return {"task_id": task_id, "status": "annulé"}
+    # Analyse en cours : le processus qui l'exécute l'interrompt à sa prochaine vérification
+    return {"task_id": task_id, "status": "annulation demandée"}
+
+async def run_analysis_task(task_id: str, token: str, repo_name: str, models: List[str],
+                            max_concurrency: Optional[int] = None, incremental: bool = False,
+                            budget: Optional[Dict[str, Any]] = None):
     """Fonction qui exécute l'analyse en arrière-plan"""
     temp_dir = None
+    # Le budget de temps court dès le début de l'exécution (clone compris)
+    scan_budget = ScanBudget.from_dict(budget)
+    final_status = "erreur"
+    ANALYSIS_TASKS_IN_FLIGHT.inc()
     try:
-        tasks[task_id]["status"] = "en cours"
+        update_task(task_id, status="en cours")
         
         # Création d'un répertoire temporaire pour le clone
         temp_dir = tempfile.mkdtemp()
@@ -146,14 +309,16 @@ async def run_analysis_task(task_id: str, token: str, repo_name: str, models: Li
         
         try:
             # 1. Clone du dépôt
-            tasks[task_id]["progress"] = 0.1
-            github_api = GitHubAPI(token)
-            repo_path = await github_api.clone_repository(repo_name, temp_dir)
+            update_task(task_id, progress=0.1)
+            github_api = get_github_api(token)
+            with stage_timer("clone"):
+                repo_path = await github_api.clone_repository(repo_name, temp_dir, keep_git=incremental)
             
             # 2. Récupération des modèles Ollama
-            tasks[task_id]["progress"] = 0.2
-            ollama_manager = OllamaManager()
-            available_models = await ollama_manager.list_models()
+            update_task(task_id, progress=0.2)
+            ollama_manager = get_ollama_manager()
+            with stage_timer("list_models"):
+                available_models = await ollama_manager.list_models()
             
             # Si aucun modèle n'est spécifié, utiliser tous les modèles disponibles
             if not models:
@@ -164,22 +329,63 @@ async def run_analysis_task(task_id: str, token: str, repo_name: str, models: Li
                 if not models:
                     raise ValueError(f"Aucun des modèles demandés n'est disponible localement")
             
+            # Mode incrémental : retrouver la dernière analyse et les fichiers modifiés depuis
+            head_commit = await github_api.get_head_commit(repo_path) if incremental else None
+            previous_state = None
+            changed_files = None
+            if head_commit:
+                previous_state = get_analysis_state_store().get(repo_name, models)
+                if previous_state:
+                    if previous_state["commit_sha"] == head_commit:
+                        changed_files = []
+                    else:
+                        changed_files = await github_api.get_changed_files(
+                            repo_path, previous_state["commit_sha"], repo_name
+                        )
+                if changed_files is None:
+                    logger.info(f"Pas d'analyse précédente exploitable pour {repo_name}, analyse complète")
+            
             # 3. Analyse du dépôt
-            tasks[task_id]["progress"] = 0.3
-            analyzer = RepositoryAnalyzer(repo_path, ollama_manager)
+            update_task(task_id, progress=0.3)
+            analyzer = RepositoryAnalyzer(repo_path, ollama_manager, max_concurrency=max_concurrency)
             
             # Progression de l'analyse (30% à 80%)
             def progress_callback(progress):
                 progress_scaled = 0.3 + (progress * 0.5)  # Scale from 0-1 to 0.3-0.8
-                tasks[task_id]["progress"] = progress_scaled
+                update_task(task_id, progress=progress_scaled)
+            
+            # Diffusion de chaque résultat par fichier dès qu'il est disponible
+            counters = {"files_completed": 0, "files_with_vulnerabilities": 0, "vulnerabilities": 0}
+            def result_callback(file_result):
+                vulnerabilities_found = len(file_result.get("vulnerabilities") or [])
+                counters["files_completed"] += 1
+                counters["vulnerabilities"] += vulnerabilities_found
+                if vulnerabilities_found:
+                    counters["files_with_vulnerabilities"] += 1
+                update_task(task_id, counters=counters)
+                task_events.publish(task_id, "file_result", file_result)
+            
+            with stage_timer("analysis"):
+                analysis_results = await analyzer.analyze_repository(
+                    models,
+                    progress_callback,
+                    previous_results=previous_state["file_results"] if changed_files is not None else None,
+                    changed_files=changed_files,
+                    result_callback=result_callback,
+                    budget=scan_budget
+                )
             
-            analysis_results = await analyzer.analyze_repository(models, progress_callback)
+            if head_commit:
+                analysis_results["incremental"]["base_commit"] = previous_state["commit_sha"] if changed_files is not None else None
+                analysis_results["incremental"]["head_commit"] = head_commit
+                get_analysis_state_store().save(repo_name, models, head_commit, analysis_results["file_results"])
             
             # 4. Génération du rapport formaté pour PDF (optionnel)
-            tasks[task_id]["progress"] = 0.9
+            update_task(task_id, progress=0.9)
             report_generator = ReportGenerator(repo_name, analysis_results.get("vulnerabilities", []), 
                                               best_model=analysis_results.get("best_model"))
-            formatted_report = report_generator.generate_report()
+            with stage_timer("report"):
+                formatted_report = report_generator.generate_report()
             
             # 5. Merger les résultats complets avec le rapport formaté
             # Les résultats d'analyse contiennent toutes les données avancées
@@ -198,9 +404,15 @@ async def run_analysis_task(task_id: str, token: str, repo_name: str, models: Li
             full_result["formatted_report"] = formatted_report
             
             # 6. Finalisation
-            tasks[task_id]["progress"] = 1.0
-            tasks[task_id]["status"] = "terminé"
-            tasks[task_id]["result"] = full_result
+            with stage_timer("persist"):
+                get_task_store().set_result(task_id, full_result, compute_result_etag(full_result))
+            update_task(task_id, progress=1.0, status="terminé")
+            final_status = "terminé"
+            task_events.publish(task_id, "completed", {
+                "vulnerabilities": len(full_result.get("vulnerabilities", [])),
+                "analysis_stats": full_result.get("analysis_stats", {}),
+                "best_model": full_result.get("best_model")
+            })
             
             logger.info(f"Analyse terminée pour {repo_name}. Résultats disponibles avec {len(analysis_results.get('vulnerabilities', []))} vulnérabilités détectées.")
             
@@ -208,11 +420,20 @@ async def run_analysis_task(task_id: str, token: str, repo_name: str, models: Li
             logger.error(f"Erreur lors de l'analyse dans le bloc interne: {str(e)}")
             raise
             
+    except asyncio.CancelledError:
+        logger.info(f"Analyse annulée : {task_id}")
+        update_task(task_id, status="annulé")
+        task_events.publish(task_id, "cancelled", {})
+        final_status = "annulé"
+        raise
     except Exception as e:
         logger.error(f"Erreur lors de l'analyse : {str(e)}")
-        tasks[task_id]["status"] = "erreur"
-        tasks[task_id]["error"] = str(e)
+        update_task(task_id, status="erreur", error=str(e))
+        task_events.publish(task_id, "error", {"error": str(e)})
     finally:
+        ANALYSIS_TASKS_IN_FLIGHT.dec()
+        ANALYSIS_TASKS.inc(status=final_status)
+        task_events.close(task_id)
         # Nettoyage du répertoire temporaire
         if temp_dir and os.path.exists(temp_dir):
             try:
@@ -222,28 +443,175 @@ async def run_analysis_task(task_id: str, token: str, repo_name: str, models: Li
                 logger.warning(f"Erreur lors du nettoyage du répertoire temporaire: {str(cleanup_error)}")
                 # Continuer même en cas d'erreur de nettoyage
 
-# Route pour vérifier l'état d'une analyse
-@app.get("/api/analysis/status/{task_id}")
+# Route pour vérifier l'état d'une analyse (léger : sans le résultat complet)
+@app.get("/api/analysis/status/{task_id}", response_model=AnalysisStatus)
 async def get_analysis_status(task_id: str):
-    if task_id not in tasks:
+    task = get_task_store().get_status(task_id)
+    if task is None:
         raise HTTPException(status_code=404, detail="Tâche non trouvée")
     
-    task = tasks[task_id]
+    worker_pool = getattr(app.state, "worker_pool", None)
     return {
         "task_id": task_id,
         "status": task["status"],
         "progress": task["progress"],
-        "result": task["result"]
+        "counters": task["counters"],
+        "error": task["error"],
+        "result_available": task["result_available"],
+        "queue_position": worker_pool.queue_position(task_id) if worker_pool is not None else None
     }
 
+def get_completed_task(task_id: str) -> Dict[str, Any]:
+    """Retourne l'état d'une tâche terminée (sans son résultat) ou lève l'erreur HTTP adaptée"""
+    task = get_task_store().get_status(task_id)
+    if task is None:
+        raise HTTPException(status_code=404, detail="Tâche non trouvée")
+    if task["status"] != "terminé" or not task["result_available"]:
+        raise HTTPException(status_code=409, detail=f"Résultat non disponible (statut : {task['status']})")
+    return task
+
+def load_task_result(task_id: str) -> Dict[str, Any]:
+    """Charge le résultat complet d'une tâche terminée (après la vérification de l'ETag)"""
+    result = get_task_store().get_result(task_id)
+    if result is None:
+        raise HTTPException(status_code=404, detail="Résultat expiré ou introuvable")
+    return result
+
+def etag_headers(etag: str) -> Dict[str, str]:
+    """En-têtes de cache des vues d'un résultat (revalidation systématique par ETag)"""
+    return {"ETag": etag, "Cache-Control": "private, no-cache"}
+
+def not_modified(etag: str) -> Response:
+    """Réponse 304 : le client possède déjà cette version"""
+    return Response(status_code=304, headers=etag_headers(etag))
+
+# Route pour récupérer le résultat d'une analyse (avec sélection des sections)
+@app.get("/api/analysis/results/{task_id}")
+async def get_analysis_results(task_id: str,
+                               fields: Optional[str] = None,
+                               if_none_match: Optional[str] = Header(None)):
+    task = get_completed_task(task_id)
+    selected = parse_list_param(fields)
+    etag = make_etag(task["result_etag"], "result", selected)
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+    return JSONResponse(content=select_fields(load_task_result(task_id), selected), headers=etag_headers(etag))
+
+# Route pour parcourir les vulnérabilités d'une analyse (pagination et filtres)
+@app.get("/api/analysis/results/{task_id}/vulnerabilities")
+async def list_analysis_vulnerabilities(task_id: str,
+                                        page: int = Query(1, ge=1),
+                                        page_size: int = Query(50, ge=1, le=500),
+                                        severity: Optional[str] = None,
+                                        file: Optional[str] = None,
+                                        type: Optional[str] = None,
+                                        fields: Optional[str] = None,
+                                        if_none_match: Optional[str] = Header(None)):
+    task = get_completed_task(task_id)
+    severities = parse_list_param(severity)
+    selected = parse_list_param(fields)
+    etag = make_etag(task["result_etag"], "vulnerabilities", page, page_size, severities, file, type, selected)
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+    
+    vulnerabilities = filter_vulnerabilities(load_task_result(task_id).get("vulnerabilities", []), severities, file, type)
+    page_data = paginate(vulnerabilities, page, page_size)
+    page_data["items"] = [select_fields(v, selected) for v in page_data["items"]]
+    return JSONResponse(content=page_data, headers=etag_headers(etag))
+
+# Route pour parcourir les résultats par fichier d'une analyse
+@app.get("/api/analysis/results/{task_id}/files")
+async def list_analysis_files(task_id: str,
+                              page: int = Query(1, ge=1),
+                              page_size: int = Query(50, ge=1, le=500),
+                              status: Optional[str] = None,
+                              file: Optional[str] = None,
+                              fields: Optional[str] = None,
+                              if_none_match: Optional[str] = Header(None)):
+    task = get_completed_task(task_id)
+    statuses = parse_list_param(status)
+    selected = parse_list_param(fields)
+    etag = make_etag(task["result_etag"], "files", page, page_size, statuses, file, selected)
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+    
+    file_results = [
+        r for r in load_task_result(task_id).get("file_results", [])
+        if (not statuses or r.get("status") in statuses)
+        and (not file or r.get("file_path") == file
+             or (file.endswith("/") and r.get("file_path", "").startswith(file)))
+    ]
+    page_data = paginate(file_results, page, page_size)
+    page_data["items"] = [select_fields(r, selected) for r in page_data["items"]]
+    return JSONResponse(content=page_data, headers=etag_headers(etag))
+
+# Route pour suivre une analyse en temps réel (Server-Sent Events)
+@app.get("/api/analysis/events/{task_id}")
+async def stream_analysis_events(task_id: str,
+                                 last_event_id: Optional[int] = None,
+                                 last_event_id_header: Optional[str] = Header(None, alias="Last-Event-ID")):
+    if get_task_store().get_status(task_id) is None:
+        raise HTTPException(status_code=404, detail="Tâche non trouvée")
+    
+    # Reprise après reconnexion : EventSource renvoie l'en-tête Last-Event-ID
+    if last_event_id is None and last_event_id_header and last_event_id_header.isdigit():
+        last_event_id = int(last_event_id_header)
+    start = last_event_id + 1 if last_event_id is not None else 0
+    
+    async def event_generator():
+        if not task_events.has_stream(task_id):
+            # Tâche exécutée par un autre worker (ou avant un redémarrage) : suivre le stockage
+            async for event in poll_task_events(task_id):
+                yield format_sse(event)
+            return
+        async for event in task_events.get_stream(task_id).subscribe(start, heartbeat=SSE_HEARTBEAT_SECONDS):
+            yield format_sse(event)
+    
+    return StreamingResponse(
+        event_generator(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+async def poll_task_events(task_id: str):
+    """
+    Reconstitue les événements d'une tâche à partir du stockage
+    
+    Seuls les changements de progression et de compteurs sont disponibles
+    (pas les résultats par fichier), ainsi que l'événement final.
+    """
+    event_id = 0
+    last_state = None
+    while True:
+        task = get_task_store().get_status(task_id)
+        if task is None:
+            return
+        state = (task["progress"], task["counters"])
+        if state != last_state:
+            last_state = state
+            yield {"id": event_id, "event": "progress",
+                   "data": {"progress": task["progress"], "counters": task["counters"]}}
+            event_id += 1
+        if task["status"] == "erreur":
+            yield {"id": event_id, "event": "error", "data": {"error": task["error"]}}
+            return
+        if task["status"] == "annulé":
+            yield {"id": event_id, "event": "cancelled", "data": {}}
+            return
+        if task["status"] in FINAL_STATUSES:
+            yield {"id": event_id, "event": "completed", "data": {"counters": task["counters"]}}
+            return
+        await asyncio.sleep(TASK_POLL_SECONDS)
+
 # Route pour générer un PDF à partir du rapport
 @app.get("/api/report/pdf/{task_id}")
 async def generate_pdf_report(task_id: str):
-    if task_id not in tasks or tasks[task_id]["status"] != "terminé":
+    task = get_task_store().get_status(task_id)
+    if task is None or task["status"] != "terminé" or not task["result_available"]:
         raise HTTPException(status_code=404, detail="Rapport non disponible")
     
     try:
-        full_result = tasks[task_id]["result"]
+        full_result = load_task_result(task_id)
         
         # Utiliser le rapport formaté s'il existe, sinon créer un nouveau
         if "formatted_report" in full_result:
@@ -256,7 +624,7 @@ async def generate_pdf_report(task_id: str):
         else:
             # Fallback: créer un nouveau rapport formaté
             report_generator = ReportGenerator(
-                tasks[task_id]["repo_name"], 
+                task["repo_name"], 
                 full_result.get("vulnerabilities", []),
                 best_model=full_result.get("best_model")
             )
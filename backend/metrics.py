@@ -0,0 +1,269 @@
+import time
+import logging
+import threading
+from bisect import bisect_left
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import List, Dict, Any, Tuple, Iterable, Optional
+
+# Configuration du logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Bornes des histogrammes de durée (secondes) : du parsing JSON à l'analyse complète d'un dépôt
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800)
+
+
+class Metric:
+    """Métrique étiquetée (compteur, jauge ou histogramme), sûre entre threads"""
+
+    type = "untyped"
+
+    def __init__(self, name: str, help_text: str, label_names: Tuple[str, ...] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self._values: Dict[Tuple[str, ...], Any] = {}
+        self._lock = threading.Lock()
+        if not self.label_names and self.type != "histogram":
+            # Série unique présente dès le départ (0 tant que rien n'est mesuré)
+            self._values[()] = 0.0
+
+    def _key(self, labels: Dict[str, Any]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.label_names)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """État sérialisable de la métrique (transmis par les processus workers)"""
+        with self._lock:
+            values = {key: (list(value) if isinstance(value, list) else value) for key, value in self._values.items()}
+        return {"type": self.type, "help": self.help_text, "labels": self.label_names, "values": values}
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+
+class Gauge(Metric):
+    type = "gauge"
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    @contextmanager
+    def track(self, **labels):
+        """Incrémente la jauge pendant l'exécution du bloc (opérations en cours)"""
+        self.inc(**labels)
+        try:
+            yield
+        finally:
+            self.dec(**labels)
+
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(self, name: str, help_text: str, label_names: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        super().__init__(name, help_text, label_names)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            # [compte par borne..., compte au-delà, somme, nombre]
+            state = self._values.get(key)
+            if state is None:
+                state = [0] * (len(self.buckets) + 1) + [0.0, 0]
+                self._values[key] = state
+            state[bisect_left(self.buckets, value)] += 1
+            state[-2] += value
+            state[-1] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """Mesure la durée du bloc"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def snapshot(self) -> Dict[str, Any]:
+        snapshot = super().snapshot()
+        snapshot["buckets"] = self.buckets
+        return snapshot
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra is not None:
+        pairs.append(f'{extra[0]}="{extra[1]}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+def merge_snapshots(snapshots: Iterable[Dict[str, Dict[str, Any]]]) -> "OrderedDict[str, Dict[str, Any]]":
+    """
+    Additionne les instantanés de plusieurs registres (processus API et workers)
+
+    Les compteurs, les jauges (opérations en cours) et les histogrammes
+    s'additionnent série par série.
+    """
+    merged: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+    for snapshot in snapshots:
+        for name, metric in snapshot.items():
+            target = merged.get(name)
+            if target is None:
+                merged[name] = {**metric, "values": {
+                    key: (list(value) if isinstance(value, list) else value) for key, value in metric["values"].items()
+                }}
+                continue
+            for key, value in metric["values"].items():
+                if key not in target["values"]:
+                    target["values"][key] = list(value) if isinstance(value, list) else value
+                elif isinstance(value, list):
+                    target["values"][key] = [a + b for a, b in zip(target["values"][key], value)]
+                else:
+                    target["values"][key] += value
+    return merged
+
+
+def render(metrics: Dict[str, Dict[str, Any]]) -> str:
+    """Format d'exposition texte de Prometheus (version 0.0.4)"""
+    lines: List[str] = []
+    for name, metric in metrics.items():
+        lines.append(f"# HELP {name} {metric['help']}")
+        lines.append(f"# TYPE {name} {metric['type']}")
+        labels = tuple(metric["labels"])
+        for key in sorted(metric["values"]):
+            value = metric["values"][key]
+            if metric["type"] != "histogram":
+                lines.append(f"{name}{_format_labels(labels, key)} {_format_number(value)}")
+                continue
+            cumulative = 0
+            for bound, count in zip(list(metric["buckets"]) + [float("inf")], value[:-2]):
+                cumulative += count
+                bucket_labels = _format_labels(labels, key, ("le", _format_number(float(bound))))
+                lines.append(f"{name}_bucket{bucket_labels} {cumulative}")
+            lines.append(f"{name}_sum{_format_labels(labels, key)} {_format_number(value[-2])}")
+            lines.append(f"{name}_count{_format_labels(labels, key)} {value[-1]}")
+    return "\n".join(lines) + "\n"
+
+
+class MetricsRegistry:
+    """Registre des métriques d'un processus"""
+
+    def __init__(self):
+        self._metrics: "OrderedDict[str, Metric]" = OrderedDict()
+
+    def _register(self, metric: Metric) -> Metric:
+        existing = self._metrics.get(metric.name)
+        if existing is not None:
+            return existing
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help_text: str, label_names: Tuple[str, ...] = ()) -> Counter:
+        return self._register(Counter(name, help_text, label_names))
+
+    def gauge(self, name: str, help_text: str, label_names: Tuple[str, ...] = ()) -> Gauge:
+        return self._register(Gauge(name, help_text, label_names))
+
+    def histogram(self, name: str, help_text: str, label_names: Tuple[str, ...] = (),
+                  buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, help_text, label_names, buckets))
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """Instantané de toutes les métriques du registre"""
+        return {name: metric.snapshot() for name, metric in self._metrics.items()}
+
+    def render(self, extra_snapshots: Iterable[Dict[str, Dict[str, Any]]] = ()) -> str:
+        """
+        Expose les métriques de ce registre, additionnées à celles d'autres processus
+
+        Args:
+            extra_snapshots: Instantanés des registres des processus workers
+
+        Returns:
+            Texte au format Prometheus
+        """
+        return render(merge_snapshots([self.snapshot(), *extra_snapshots]))
+
+
+# Registre du processus et métriques de l'analyse
+REGISTRY = MetricsRegistry()
+
+STAGE_SECONDS = REGISTRY.histogram(
+    "analysis_stage_seconds",
+    "Durée des étapes de l'analyse (clone, parcours, lecture, prompt, attente Ollama, génération, parsing, rapport)",
+    ("stage",)
+)
+ANALYSIS_TASKS = REGISTRY.counter("analysis_tasks_total", "Analyses terminées, par statut final", ("status",))
+ANALYSIS_TASKS_IN_FLIGHT = REGISTRY.gauge("analysis_tasks_in_flight", "Analyses en cours d'exécution")
+ANALYSIS_QUEUE_DEPTH = REGISTRY.gauge("analysis_queue_depth", "Analyses en attente d'un processus worker")
+ANALYSIS_FILES = REGISTRY.counter("analysis_files_total", "Fichiers traités, par statut", ("status",))
+OLLAMA_REQUEST_SECONDS = REGISTRY.histogram(
+    "ollama_request_seconds", "Durée des requêtes de génération Ollama, par modèle", ("model",)
+)
+OLLAMA_TOKENS = REGISTRY.counter(
+    "ollama_tokens_total", "Tokens traités par Ollama (prompt_eval_count / eval_count)", ("model", "kind")
+)
+OLLAMA_TOKENS_SAVED = REGISTRY.counter(
+    "ollama_tokens_saved_total",
+    "Borne supérieure des tokens de génération épargnés par l'arrêt anticipé des réponses en flux "
+    "(num_predict moins les tokens déjà générés)", ("model",)
+)
+OLLAMA_EARLY_STOPS = REGISTRY.counter(
+    "ollama_early_stops_total", "Générations interrompues dès que le JSON de la réponse était complet", ("model",)
+)
+OLLAMA_EVAL_SECONDS = REGISTRY.counter(
+    "ollama_eval_seconds_total", "Temps de calcul rapporté par Ollama (prompt_eval_duration / eval_duration)",
+    ("model", "kind")
+)
+OLLAMA_LOAD_SECONDS = REGISTRY.counter(
+    "ollama_load_seconds_total", "Temps de chargement des modèles en mémoire rapporté par Ollama (load_duration)",
+    ("model",)
+)
+OLLAMA_IN_FLIGHT = REGISTRY.gauge("ollama_requests_in_flight", "Requêtes Ollama en cours, par modèle", ("model",))
+OLLAMA_WAITING = REGISTRY.gauge(
+    "ollama_requests_waiting", "Requêtes en attente de la limite de concurrence du modèle", ("model",)
+)
+
+
+def stage_timer(stage: str):
+    """Chronomètre une étape de l'analyse (histogramme analysis_stage_seconds)"""
+    return STAGE_SECONDS.time(stage=stage)
+
+
+def record_ollama_usage(model: str, result: Dict[str, Any]):
+    """Enregistre les tokens et durées de calcul d'une réponse /api/generate d'Ollama"""
+    OLLAMA_TOKENS.inc(result.get("prompt_eval_count", 0) or 0, model=model, kind="prompt")
+    OLLAMA_TOKENS.inc(result.get("eval_count", 0) or 0, model=model, kind="completion")
+    # Ollama exprime les durées en nanosecondes
+    OLLAMA_EVAL_SECONDS.inc((result.get("prompt_eval_duration", 0) or 0) / 1e9, model=model, kind="prompt")
+    OLLAMA_EVAL_SECONDS.inc((result.get("eval_duration", 0) or 0) / 1e9, model=model, kind="completion")
+    # Non nul quand le modèle a dû être (re)chargé : mesure le coût des changements de modèle
+    OLLAMA_LOAD_SECONDS.inc((result.get("load_duration", 0) or 0) / 1e9, model=model)
@@ -1,27 +1,147 @@
+import copy
 import aiohttp
 import asyncio
 import logging
 from typing import List, Dict, Any, Optional
 import json
 import re
-from config import OLLAMA_API_URL
+from config import (
+    OLLAMA_API_URL, OLLAMA_MAX_REQUESTS_PER_MODEL, OLLAMA_MODEL_CONCURRENCY,
+    OLLAMA_COMPARE_CONCURRENT, OLLAMA_COMPARE_MAX_PARALLEL, OLLAMA_COMPARE_TIMEOUT,
+    OLLAMA_NUM_CTX, CHUNK_OVERLAP_LINES, ANALYSIS_MAX_CHUNKS_PER_FILE, OLLAMA_STREAMING_ENABLED,
+    OLLAMA_STRUCTURED_OUTPUT, OLLAMA_KEEP_ALIVE, OLLAMA_CHAT_ENABLED
+)
+from http_client import session_scope
+from llm_cache import LLMResultCache
+from chunker import split_code_into_chunks, remap_line_numbers
+from json_stream import JSONObjectStream, extract_json
+from metrics import (
+    stage_timer, record_ollama_usage, OLLAMA_REQUEST_SECONDS, OLLAMA_IN_FLIGHT, OLLAMA_WAITING,
+    OLLAMA_TOKENS_SAVED, OLLAMA_EARLY_STOPS
+)
 
 # Configuration du logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Options de génération envoyées à Ollama (font partie de la clé de cache)
+GENERATION_OPTIONS = {
+    "temperature": 0.1,
+    "num_predict": 2048
+}
+
+# Schéma JSON de la réponse (paramètre "format" d'Ollama) : la génération est contrainte à ce format
+ANALYSIS_RESPONSE_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "vulnerabilities": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "type_vulnerabilite": {"type": "string"},
+                    "severite": {"type": "string", "enum": ["Élevé", "Moyen", "Faible"]},
+                    "description": {"type": "string"},
+                    "numeros_ligne": {"type": "array", "items": {"anyOf": [{"type": "integer"}, {"type": "string"}]}},
+                    "recommandation": {"type": "string"}
+                },
+                "required": ["type_vulnerabilite", "severite", "description", "numeros_ligne", "recommandation"]
+            }
+        }
+    },
+    "required": ["vulnerabilities"]
+}
+# Schéma d'une analyse groupée (plusieurs fichiers par prompt) : chaque vulnérabilité désigne son fichier
+PACKED_RESPONSE_SCHEMA = copy.deepcopy(ANALYSIS_RESPONSE_SCHEMA)
+PACKED_RESPONSE_SCHEMA["properties"]["vulnerabilities"]["items"]["properties"]["fichier"] = {"type": "string"}
+PACKED_RESPONSE_SCHEMA["properties"]["vulnerabilities"]["items"]["required"].insert(0, "fichier")
+
+# Début du message système (/api/chat), identique pour toutes les requêtes : suivi des instructions
+# d'analyse, il forme le préfixe que le cache KV d'Ollama réutilise d'une requête à l'autre
+SYSTEM_PROMPT_FORMAT = """Vous êtes un outil d'analyse de sécurité du code source.
+
+IMPORTANT: Vous DEVEZ répondre UNIQUEMENT avec un JSON valide dans ce format exact :
+{
+  "vulnerabilities": [
+    {
+      "type_vulnerabilite": "type_de_vulnérabilité",
+      "severite": "Élevé",
+      "description": "Description détaillée de la vulnérabilité",
+      "numeros_ligne": [10, 15],
+      "recommandation": "Comment corriger cette vulnérabilité"
+    }
+  ]
+}
+
+Les valeurs possibles pour "severite" sont exactement : "Élevé", "Moyen", "Faible"
+Les "numeros_ligne" peuvent être un tableau de nombres ou de plages.
+
+Si aucune vulnérabilité n'est trouvée, répondez avec :
+{
+  "vulnerabilities": []
+}
+
+Ne ajoutez AUCUN texte avant ou après le JSON. Commencez directement par { et terminez par }.
+"""
+
+# Estimation grossière du nombre de caractères par token (code source)
+CHARS_PER_TOKEN = 3.5
+# Taille minimale d'un morceau de code, même pour un très petit contexte
+MIN_CHUNK_CHARS = 2000
+# Consommation de tokens d'une réponse servie sans appel au modèle (cache)
+EMPTY_USAGE = {"prompt_tokens": 0, "completion_tokens": 0, "tokens_saved": 0}
+# Erreur 400 d'un Ollama antérieur à 0.5 sur le schéma JSON ("invalid format", "cannot unmarshal
+# ... GenerateRequest.format") : les autres erreurs 400 ne désactivent pas la sortie structurée
+SCHEMA_ERROR_PATTERN = re.compile(r"(?i)\bformat\b|schema")
+
 class OllamaManager:
     """Gestionnaire pour l'API Ollama"""
     
-    def __init__(self, base_url: str = OLLAMA_API_URL):
+    def __init__(self, base_url: str = OLLAMA_API_URL,
+                 max_requests_per_model: int = OLLAMA_MAX_REQUESTS_PER_MODEL,
+                 model_concurrency: Optional[Dict[str, int]] = None,
+                 session: Optional[aiohttp.ClientSession] = None,
+                 cache: Optional[LLMResultCache] = None):
         """
         Initialise le gestionnaire Ollama
         
         Args:
             base_url: URL de base de l'API Ollama (par défaut depuis config.py)
+            max_requests_per_model: Nombre maximal de requêtes simultanées par modèle
+            model_concurrency: Limites spécifiques par modèle (remplacent la valeur par défaut)
+            session: Session aiohttp partagée (pool de connexions) ; si absente,
+                     une session temporaire est ouverte à chaque requête
+            cache: Cache persistant des résultats d'analyse (désactivé si None)
         """
         self.base_url = base_url
         self.api_url = f"{base_url}/api"
+        self.max_requests_per_model = max(1, max_requests_per_model)
+        self.model_concurrency = dict(OLLAMA_MODEL_CONCURRENCY if model_concurrency is None else model_concurrency)
+        self._model_semaphores: Dict[str, asyncio.Semaphore] = {}
+        self.session = session
+        self.cache = cache
+        self._model_digests: Dict[str, str] = {}
+        self._context_lengths: Dict[str, int] = {}
+        # Analyses en cours par clé de cache : un code identique n'est envoyé qu'une fois au modèle
+        self._inflight: Dict[str, asyncio.Future] = {}
+        # Modèles servis par une version d'Ollama sans sortie structurée (format limité à "json")
+        self._schema_unsupported: set = set()
+    
+    def _uses_schema(self, model: str) -> bool:
+        """Indique si la réponse du modèle est contrainte par ANALYSIS_RESPONSE_SCHEMA"""
+        return OLLAMA_STRUCTURED_OUTPUT and model not in self._schema_unsupported
+    
+    def get_model_limit(self, model: str) -> int:
+        """Retourne le nombre maximal de requêtes simultanées autorisées pour un modèle"""
+        return max(1, self.model_concurrency.get(model, self.max_requests_per_model))
+    
+    def _get_model_semaphore(self, model: str) -> asyncio.Semaphore:
+        """Retourne (en le créant si besoin) le sémaphore limitant les requêtes vers un modèle"""
+        semaphore = self._model_semaphores.get(model)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self.get_model_limit(model))
+            self._model_semaphores[model] = semaphore
+        return semaphore
     
     async def list_models(self) -> List[str]:
         """
@@ -31,7 +151,7 @@ class OllamaManager:
             Liste des noms des modèles
         """
         try:
-            async with aiohttp.ClientSession() as session:
+            async with session_scope(self.session) as session:
                 async with session.get(f"{self.api_url}/tags") as response:
                     if response.status != 200:
                         error_msg = await response.text()
@@ -39,28 +159,336 @@ class OllamaManager:
                         raise Exception(f"Erreur lors de la récupération des modèles: {response.status}")
                     
                     data = await response.json()
-                    return [model["name"] for model in data.get("models", [])]
+                    models = data.get("models", [])
+                    self._model_digests.update({
+                        model["name"]: model.get("digest", "") for model in models
+                    })
+                    return [model["name"] for model in models]
         except aiohttp.ClientConnectorError:
             logger.error("Impossible de se connecter à Ollama. Assurez-vous qu'Ollama est en cours d'exécution.")
             raise Exception("Ollama n'est pas accessible. Veuillez vérifier qu'Ollama est démarré.")
     
-    async def analyze_code(self, model: str, code: str, prompt: str) -> Dict[str, Any]:
+    async def list_loaded_models(self) -> List[str]:
+        """
+        Liste les modèles actuellement chargés en mémoire par Ollama (/api/ps)
+        
+        Returns:
+            Noms des modèles chargés (liste vide si l'information n'est pas disponible)
+        """
+        try:
+            async with session_scope(self.session) as session:
+                async with session.get(f"{self.api_url}/ps") as response:
+                    if response.status != 200:
+                        logger.warning(f"Modèles chargés indisponibles (/api/ps): {response.status}")
+                        return []
+                    data = await response.json()
+                    return [model.get("name") or model.get("model") for model in data.get("models", [])]
+        except Exception as e:
+            logger.warning(f"Impossible de récupérer les modèles chargés: {str(e)}")
+            return []
+    
+    async def order_models_by_residency(self, models: List[str]) -> List[str]:
+        """
+        Ordonne les modèles en commençant par ceux déjà chargés en mémoire
+        
+        Args:
+            models: Modèles demandés
+            
+        Returns:
+            Modèles chargés (dans l'ordre demandé), puis les autres
+        """
+        loaded = set(await self.list_loaded_models())
+        return [m for m in models if m in loaded] + [m for m in models if m not in loaded]
+    
+    async def unload_model(self, model: str) -> bool:
+        """
+        Décharge un modèle de la mémoire d'Ollama (requête sans prompt avec keep_alive à 0)
+        
+        Args:
+            model: Nom du modèle
+            
+        Returns:
+            True si Ollama a accepté la demande
+        """
+        try:
+            async with session_scope(self.session) as session:
+                payload = {"model": model, "keep_alive": 0, "stream": False}
+                async with session.post(f"{self.api_url}/generate", json=payload) as response:
+                    if response.status != 200:
+                        logger.warning(f"Déchargement du modèle {model} refusé: {await response.text()}")
+                        return False
+                    logger.info(f"Modèle {model} déchargé de la mémoire d'Ollama")
+                    return True
+        except Exception as e:
+            logger.warning(f"Impossible de décharger le modèle {model}: {str(e)}")
+            return False
+    
+    async def analyze_code(self, model: str, code: str, prompt: str, packed: bool = False) -> Dict[str, Any]:
         """
         Analyse du code avec un modèle Ollama spécifique
         
+        Le nombre de requêtes simultanées vers un même modèle est borné
+        (voir get_model_limit) pour ne pas dépasser la capacité d'Ollama.
+        Un code trop long pour la fenêtre de contexte du modèle est découpé
+        en morceaux analysés en parallèle, et les numéros de ligne sont
+        ramenés à ceux du fichier d'origine.
+        
         Args:
             model: Nom du modèle Ollama à utiliser
             code: Code source à analyser
             prompt: Instructions pour l'analyse
+            packed: Code de plusieurs fichiers en sections (voir prompt_packer) ;
+                    jamais découpé, le regroupement respectant la taille maximale
             
         Returns:
             Résultat de l'analyse
         """
+        with stage_timer("analyze_code"):
+            max_code_chars = await self.get_max_code_chars(model, prompt, packed)
+            if packed or len(code) <= max_code_chars:
+                return await self._analyze_code_cached(model, code, prompt, packed)
+        
+            chunks = split_code_into_chunks(code, max_code_chars, CHUNK_OVERLAP_LINES)
+            total_lines = len(code.splitlines())
+            skipped_chunks = chunks[ANALYSIS_MAX_CHUNKS_PER_FILE:]
+            chunks = chunks[:ANALYSIS_MAX_CHUNKS_PER_FILE]
+            logger.info(f"Code de {len(code)} caractères découpé en {len(chunks) + len(skipped_chunks)} morceaux "
+                        f"pour le modèle {model} (max {max_code_chars} caractères par morceau)")
+            if skipped_chunks:
+                logger.warning(f"{len(skipped_chunks)} morceau(x) non analysé(s) "
+                               f"(limite de {ANALYSIS_MAX_CHUNKS_PER_FILE} par fichier)")
+        
+            chunk_results = await asyncio.gather(*(
+                self._analyze_code_cached(model, chunk["content"], prompt) for chunk in chunks
+            ))
+            return self._merge_chunk_results(chunks, chunk_results, total_lines, len(skipped_chunks))
+    
+    def _merge_chunk_results(self, chunks: List[Dict[str, Any]], chunk_results: List[Dict[str, Any]],
+                             total_lines: int, skipped_chunks: int) -> Dict[str, Any]:
+        """
+        Fusionne les analyses des morceaux d'un fichier en un seul résultat
+        
+        Args:
+            chunks: Morceaux analysés (voir split_code_into_chunks)
+            chunk_results: Résultat d'analyse de chaque morceau
+            total_lines: Nombre de lignes du fichier complet
+            skipped_chunks: Nombre de morceaux non analysés (limite atteinte)
+            
+        Returns:
+            Résultat unique avec numéros de ligne du fichier et couverture
+        """
+        vulnerabilities = []
+        seen = set()
+        errors = []
+        covered_lines = 0
+        last_covered = 0
+        
+        for chunk, result in zip(chunks, chunk_results):
+            if "error" in result:
+                errors.append(f"Lignes {chunk['start_line']}-{chunk['end_line']}: {result['error']}")
+                continue
+            covered_lines += max(0, chunk["end_line"] - max(chunk["start_line"] - 1, last_covered))
+            last_covered = max(last_covered, chunk["end_line"])
+            
+            offset = chunk["start_line"] - 1
+            for vuln in result.get("vulnerabilities", []):
+                if not isinstance(vuln, dict):
+                    continue
+                vuln = dict(vuln)
+                for field in ("numeros_ligne", "line_numbers"):
+                    if field in vuln:
+                        vuln[field] = remap_line_numbers(vuln[field], offset)
+                
+                # Une même vulnérabilité peut être signalée deux fois dans un recouvrement
+                key = (
+                    vuln.get("type_vulnerabilite") or vuln.get("vulnerability_type"),
+                    json.dumps(vuln.get("numeros_ligne") or vuln.get("line_numbers"), sort_keys=True)
+                )
+                if key in seen:
+                    continue
+                seen.add(key)
+                vulnerabilities.append(vuln)
+        
+        merged: Dict[str, Any] = {
+            "vulnerabilities": vulnerabilities,
+            "chunks": {
+                "count": len(chunks) + skipped_chunks,
+                "analyzed": len(chunks) - len(errors),
+                "failed": len(errors),
+                "skipped": skipped_chunks,
+                "lines_covered": covered_lines,
+                "total_lines": total_lines,
+                "coverage": round(covered_lines / max(total_lines, 1) * 100, 1)
+            }
+        }
+        if errors:
+            merged["chunk_errors"] = errors
+            if len(errors) == len(chunks):
+                merged["error"] = f"Échec de l'analyse de tous les morceaux: {errors[0]}"
+        merged["usage"] = {
+            key: sum(r.get("usage", {}).get(key, 0) for r in chunk_results) for key in EMPTY_USAGE
+        }
+        if self.cache is not None:
+            merged["from_cache"] = all(r.get("from_cache") for r in chunk_results)
+        return merged
+    
+    async def _cache_key(self, model: str, prompt: str, code: str, options: Dict[str, Any],
+                         packed: bool = False) -> str:
+        """Clé du cache LLM d'une requête, selon l'état actuel de la sortie structurée du modèle"""
+        # La sortie structurée change les réponses : elle fait partie de la clé
+        key_options = {**options, "format": "schema"} if self._uses_schema(model) else options
+        if packed:
+            key_options = {**key_options, "packed": True}
+        if OLLAMA_CHAT_ENABLED:
+            key_options = {**key_options, "chat": True}
+        return LLMResultCache.make_key(model, await self.get_model_digest(model), prompt, code, key_options)
+    
+    async def _analyze_code_cached(self, model: str, code: str, prompt: str, packed: bool = False) -> Dict[str, Any]:
+        """Analyse un code tenant dans le contexte du modèle, via le cache LLM s'il est activé"""
+        options = await self.get_generation_options(model)
+        cache_key = None
+        if self.cache is not None:
+            cache_key = await self._cache_key(model, prompt, code, options, packed)
+            cached = await self.cache.aget(cache_key)
+            if cached is not None:
+                logger.info(f"Résultat en cache pour le modèle {model}")
+                return {**cached, "from_cache": True, "usage": dict(EMPTY_USAGE)}
+            
+            # Même code en cours d'analyse (fichier identique, autre dépôt) : attendre ce résultat
+            while cache_key in self._inflight:
+                shared = await asyncio.shield(self._inflight[cache_key])
+                if shared is not None:
+                    logger.info(f"Résultat partagé avec une analyse en cours pour le modèle {model}")
+                    return {**copy.deepcopy(shared), "from_cache": True, "usage": dict(EMPTY_USAGE)}
+            future = asyncio.get_running_loop().create_future()
+            self._inflight[cache_key] = future
+        
+        result = None
+        try:
+            semaphore = self._get_model_semaphore(model)
+            with OLLAMA_WAITING.track(model=model), stage_timer("ollama_wait"):
+                await semaphore.acquire()
+            try:
+                with OLLAMA_IN_FLIGHT.track(model=model), OLLAMA_REQUEST_SECONDS.time(model=model):
+                    result = await self._analyze_code(model, code, prompt, options, packed)
+            finally:
+                semaphore.release()
+            schema_fallback = result.pop("schema_fallback", False)
+        finally:
+            if cache_key is not None:
+                # En cas d'erreur ou d'interruption, les analyses en attente refont leur propre appel
+                del self._inflight[cache_key]
+                future.set_result(copy.deepcopy(result) if result is not None and "error" not in result else None)
+        
+        if cache_key is not None:
+            # Les erreurs ne sont pas mises en cache pour pouvoir être réessayées
+            if "error" not in result:
+                if schema_fallback:
+                    # Réponse obtenue sans sortie structurée : rangée sous la clé correspondante
+                    cache_key = await self._cache_key(model, prompt, code, options, packed)
+                await self.cache.aset(cache_key, model, result)
+            result["from_cache"] = False
+        return result
+    
+    async def get_context_length(self, model: str) -> int:
+        """
+        Retourne la taille de contexte utilisée pour un modèle
+        
+        La taille native du modèle (via /api/show) plafonne OLLAMA_NUM_CTX.
+        
+        Args:
+            model: Nom du modèle Ollama
+            
+        Returns:
+            Taille de contexte en tokens
+        """
+        if model not in self._context_lengths:
+            context_length = OLLAMA_NUM_CTX
+            try:
+                async with session_scope(self.session) as session:
+                    async with session.post(f"{self.api_url}/show", json={"model": model}) as response:
+                        if response.status == 200:
+                            data = await response.json()
+                            native = [
+                                value for key, value in data.get("model_info", {}).items()
+                                if key.endswith(".context_length") and isinstance(value, int)
+                            ]
+                            if native:
+                                context_length = min(context_length, native[0])
+            except Exception as e:
+                logger.warning(f"Impossible de récupérer la taille de contexte du modèle {model}: {str(e)}")
+            self._context_lengths[model] = context_length
+        return self._context_lengths[model]
+    
+    async def get_generation_options(self, model: str) -> Dict[str, Any]:
+        """Options de génération envoyées à Ollama pour un modèle"""
+        return {**GENERATION_OPTIONS, "num_ctx": await self.get_context_length(model)}
+    
+    async def get_max_code_chars(self, model: str, prompt: str, packed: bool = False) -> int:
+        """
+        Calcule la taille maximale de code (en caractères) tenant dans le contexte du modèle
+        
+        Args:
+            model: Nom du modèle Ollama
+            prompt: Instructions pour l'analyse
+            packed: Prompt d'une analyse groupée (voir build_messages)
+            
+        Returns:
+            Nombre de caractères de code envoyables en une requête
+        """
+        context_length = await self.get_context_length(model)
+        overhead_tokens = self.prompt_length(prompt, "", packed) / CHARS_PER_TOKEN
+        available_tokens = context_length - GENERATION_OPTIONS["num_predict"] - overhead_tokens
+        return max(MIN_CHUNK_CHARS, int(available_tokens * CHARS_PER_TOKEN))
+    
+    async def get_model_digest(self, model: str) -> Optional[str]:
+        """
+        Retourne le digest d'un modèle (rafraîchi depuis /api/tags si inconnu)
+        
+        Args:
+            model: Nom du modèle Ollama
+            
+        Returns:
+            Digest du modèle ou None s'il n'a pas pu être déterminé
+        """
+        if model not in self._model_digests:
+            try:
+                await self.list_models()
+                # Éviter de réinterroger Ollama pour un modèle qui n'expose pas de digest
+                self._model_digests.setdefault(model, "")
+            except Exception as e:
+                logger.warning(f"Impossible de récupérer le digest du modèle {model}: {str(e)}")
+        return self._model_digests.get(model) or None
+    
+    def build_full_prompt(self, prompt: str, code: str, packed: bool = False) -> str:
+        """
+        Construit le prompt unique envoyé à /api/generate (OLLAMA_CHAT_ENABLED=False)
+        
+        Args:
+            prompt: Instructions pour l'analyse
+            code: Code source à analyser
+            packed: Code de plusieurs fichiers en sections délimitées (voir prompt_packer) :
+                    chaque vulnérabilité doit alors indiquer son fichier
+            
+        Returns:
+            Prompt complet (instructions, code et format de réponse attendu)
+        """
+        if packed:
+            code_title = "FICHIERS À ANALYSER (chaque fichier est délimité par ses lignes ===== FICHIER ... =====)"
+            file_field = '      "fichier": "chemin/du/fichier tel qu\'indiqué dans son en-tête",\n'
+            file_rules = ("Chaque vulnérabilité indique dans \"fichier\" le chemin du fichier concerné, "
+                          "et ses \"numeros_ligne\" sont comptés à partir de la première ligne de ce fichier "
+                          "(la ligne qui suit son en-tête).\n")
+        else:
+            code_title = "CODE À ANALYSER"
+            file_field = ""
+            file_rules = ""
+        
         # Créer un prompt compatible avec analyzer.py
-        full_prompt = f"""
+        return f"""
 {prompt}
 
-CODE À ANALYSER:
+{code_title}:
 ```
 {code}
 ```
@@ -69,7 +497,7 @@ IMPORTANT: Vous DEVEZ répondre UNIQUEMENT avec un JSON valide dans ce format ex
 {{
   "vulnerabilities": [
     {{
-      "type_vulnerabilite": "type_de_vulnérabilité",
+{file_field}      "type_vulnerabilite": "type_de_vulnérabilité",
       "severite": "Élevé",
       "description": "Description détaillée de la vulnérabilité",
       "numeros_ligne": [10, 15],
@@ -80,7 +508,7 @@ IMPORTANT: Vous DEVEZ répondre UNIQUEMENT avec un JSON valide dans ce format ex
 
 Les valeurs possibles pour "severite" sont exactement : "Élevé", "Moyen", "Faible"
 Les "numeros_ligne" peuvent être un tableau de nombres ou de plages.
-
+{file_rules}
 Si aucune vulnérabilité n'est trouvée, répondez avec :
 {{
   "vulnerabilities": []
@@ -88,65 +516,114 @@ Si aucune vulnérabilité n'est trouvée, répondez avec :
 
 Ne ajoutez AUCUN texte avant ou après le JSON. Commencez directement par {{ et terminez par }}.
 """
+    
+    def build_messages(self, prompt: str, code: str, packed: bool = False) -> List[Dict[str, str]]:
+        """
+        Construit les messages envoyés à /api/chat
         
+        Le message système (format de réponse puis instructions d'analyse)
+        ne dépend pas du code : identique d'une requête à l'autre, il n'est
+        évalué qu'une fois par Ollama, qui conserve le préfixe déjà calculé
+        tant que le modèle reste chargé. Le message utilisateur ne contient
+        que le code et les consignes propres à la requête.
+        
+        Args:
+            prompt: Instructions pour l'analyse
+            code: Code source à analyser
+            packed: Code de plusieurs fichiers en sections délimitées (voir prompt_packer)
+            
+        Returns:
+            Messages système et utilisateur
+        """
+        if packed:
+            code_title = ("FICHIERS À ANALYSER (chaque fichier est délimité par ses lignes ===== FICHIER ... =====).\n"
+                          "Chaque vulnérabilité indique aussi dans \"fichier\" le chemin du fichier concerné, "
+                          "tel qu'indiqué dans son en-tête, et ses \"numeros_ligne\" sont comptés à partir de la "
+                          "première ligne de ce fichier (la ligne qui suit son en-tête)")
+        else:
+            code_title = "CODE À ANALYSER"
+        return [
+            {"role": "system", "content": f"{SYSTEM_PROMPT_FORMAT}\n{prompt.strip()}\n"},
+            {"role": "user", "content": f"{code_title}:\n```\n{code}\n```\n"}
+        ]
+    
+    def prompt_length(self, prompt: str, code: str, packed: bool = False) -> int:
+        """Taille en caractères du prompt envoyé à Ollama (selon OLLAMA_CHAT_ENABLED)"""
+        if OLLAMA_CHAT_ENABLED:
+            return sum(len(message["content"]) for message in self.build_messages(prompt, code, packed))
+        return len(self.build_full_prompt(prompt, code, packed))
+    
+    async def _analyze_code(self, model: str, code: str, prompt: str,
+                            options: Optional[Dict[str, Any]] = None, packed: bool = False) -> Dict[str, Any]:
+        """Envoie la requête d'analyse à Ollama (sans limitation de concurrence ni découpage)"""
         try:
             logger.info(f"Envoi de la requête à Ollama avec le modèle {model}")
             logger.info(f"Longueur du code: {len(code)} caractères")
-            logger.info(f"Longueur totale du prompt: {len(full_prompt)} caractères")
-            
-            # Si le texte est trop long, le tronquer
-            if len(full_prompt) > 32000:  # Une limite raisonnable pour la plupart des modèles
-                logger.warning(f"Prompt trop long ({len(full_prompt)} caractères), troncature à 32000 caractères")
-                truncated_code = code[:16000]  # Garder la première moitié du code
-                full_prompt = f"""
-{prompt}
-
-CODE À ANALYSER (tronqué car trop long):
-```
-{truncated_code}
-...
-[Code tronqué - trop long pour l'analyse]
-```
-
-Veuillez formater votre réponse sous la forme d'un JSON valide.
-"""
-                logger.info(f"Nouvelle longueur du prompt après troncature: {len(full_prompt)} caractères")
+            logger.info(f"Longueur totale du prompt: {self.prompt_length(prompt, code, packed)} caractères")
             
             # Pas de timeout pour les modèles locaux - ils peuvent prendre le temps qu'il faut
             logger.info(f"Exécution du modèle {model} sans timeout (peut prendre du temps selon votre machine)")
             
             # Effectuer la requête sans timeout
             try:
-                async with aiohttp.ClientSession(
-                    timeout=aiohttp.ClientTimeout(total=None)  # Pas de timeout
-                ) as session:
+                no_timeout = aiohttp.ClientTimeout(total=None)  # Pas de timeout
+                async with session_scope(self.session, timeout=no_timeout) as session:
                     payload = {
                         "model": model,
-                        "prompt": full_prompt,
-                        "stream": False,
-                        "options": {
-                            "temperature": 0.1,
-                            "num_predict": 2048
-                        }
+                        "stream": OLLAMA_STREAMING_ENABLED,
+                        "options": options or dict(GENERATION_OPTIONS),
+                        "keep_alive": OLLAMA_KEEP_ALIVE
                     }
+                    if OLLAMA_CHAT_ENABLED:
+                        endpoint = "chat"
+                        payload["messages"] = self.build_messages(prompt, code, packed)
+                    else:
+                        endpoint = "generate"
+                        payload["prompt"] = self.build_full_prompt(prompt, code, packed)
+                    if self._uses_schema(model):
+                        payload["format"] = PACKED_RESPONSE_SCHEMA if packed else ANALYSIS_RESPONSE_SCHEMA
                     
-                    async with session.post(f"{self.api_url}/generate", json=payload) as response:
+                    async with session.post(f"{self.api_url}/{endpoint}", json=payload, timeout=no_timeout) as response:
                         if response.status != 200:
                             error_msg = await response.text()
+                            if response.status == 400 and "format" in payload and SCHEMA_ERROR_PATTERN.search(error_msg):
+                                # Ollama antérieur à 0.5 : schéma refusé, nouvel essai sans sortie structurée
+                                logger.warning(f"Sortie structurée non prise en charge pour {model}: {error_msg}")
+                                self._schema_unsupported.add(model)
+                                fallback = await self._analyze_code(model, code, prompt, options, packed)
+                                fallback["schema_fallback"] = True
+                                return fallback
                             logger.error(f"Erreur Ollama API: {error_msg}")
                             return {
                                 "error": f"Erreur Ollama API: {response.status} - {error_msg}",
                                 "vulnerabilities": []
                             }
                         
-                        result = await response.json()
+                        if OLLAMA_STREAMING_ENABLED:
+                            result = await self._read_generation_stream(response, model, payload)
+                        else:
+                            result = await response.json()
+                            if "message" in result:
+                                result["response"] = (result["message"] or {}).get("content", "")
+                        if result.get("error"):
+                            logger.error(f"Erreur Ollama API: {result['error']}")
+                            return {"error": f"Erreur Ollama API: {result['error']}", "vulnerabilities": []}
                         response_text = result.get("response", "")
+                        record_ollama_usage(model, result)
                         
                         logger.info(f"Réponse reçue d'Ollama pour le modèle {model}")
                         logger.info(f"Longueur de la réponse: {len(response_text)} caractères")
                         
                         # Tenter d'extraire un JSON de la réponse
-                        return self._extract_json_from_response(response_text)
+                        with stage_timer("json_extraction"):
+                            parsed = self._extract_json_from_response(response_text)
+                        # Tokens consommés, tels que comptés par Ollama (hors préfixe déjà en cache)
+                        parsed["usage"] = {
+                            "prompt_tokens": result.get("prompt_eval_count", 0),
+                            "completion_tokens": result.get("eval_count", 0),
+                            "tokens_saved": result.get("tokens_saved", 0)
+                        }
+                        return parsed
                         
             except aiohttp.ClientConnectorError as e:
                 logger.error(f"Erreur de connexion avec Ollama: {str(e)}")
@@ -165,10 +642,80 @@ Veuillez formater votre réponse sous la forme d'un JSON valide.
                 "vulnerabilities": []
             }
     
+    async def _read_generation_stream(self, response: aiohttp.ClientResponse, model: str,
+                                      payload: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Lit le flux NDJSON d'une génération Ollama
+        
+        La génération est interrompue (connexion fermée, ce qui arrête le
+        modèle côté Ollama) dès que la réponse contient un objet JSON complet
+        avec la liste "vulnerabilities" : le texte que les modèles ajoutent
+        souvent après le JSON n'est pas attendu.
+        
+        Args:
+            response: Réponse HTTP en flux de /api/generate ou /api/chat
+            model: Nom du modèle
+            payload: Requête envoyée (prompt et options)
+            
+        Returns:
+            Équivalent de la réponse non streamée (response, prompt_eval_count,
+            eval_count...), avec tokens_saved : tokens que le modèle pouvait
+            encore générer (num_predict) au moment de l'arrêt, borne supérieure
+            des tokens réellement épargnés ; prompt_eval_count
+            est absent quand la génération est interrompue avant la fin du flux
+        """
+        stream = JSONObjectStream()
+        generated_tokens = 0
+        buffer = b""
+        async for data in response.content.iter_any():
+            buffer += data
+            *lines, buffer = buffer.split(b"\n")
+            for line in lines:
+                if not line.strip():
+                    continue
+                message = json.loads(line)
+                if message.get("error"):
+                    return {"error": message["error"]}
+                # /api/generate : "response" ; /api/chat : "message.content"
+                token = message.get("response") or (message.get("message") or {}).get("content", "")
+                if token:
+                    # Ollama envoie un token par message
+                    generated_tokens += 1
+                complete = stream.feed(token)
+                if message.get("done"):
+                    return {**message, "response": stream.text, "tokens_saved": 0}
+                # Arrêt dès que le modèle poursuit au-delà du JSON (hors fin de bloc ```) :
+                # un modèle qui s'arrête de lui-même n'est pas compté comme interrompu
+                if complete is not None and stream.trailing_text.strip().strip("`"):
+                    response.close()
+                    num_predict = payload["options"].get("num_predict", GENERATION_OPTIONS["num_predict"])
+                    # Borne supérieure : le modèle se serait souvent arrêté bien avant num_predict
+                    tokens_saved = max(0, num_predict - generated_tokens)
+                    OLLAMA_EARLY_STOPS.inc(model=model)
+                    OLLAMA_TOKENS_SAVED.inc(tokens_saved, model=model)
+                    logger.info(f"Génération interrompue pour le modèle {model}: JSON complet après "
+                                f"{generated_tokens} tokens")
+                    # Ollama ne transmet ses compteurs qu'en fin de flux : prompt_eval_count reste absent
+                    # (l'appelant s'en tient à son estimation, hors métriques des tokens d'Ollama)
+                    return {
+                        "response": stream.object_text,
+                        "eval_count": generated_tokens,
+                        "tokens_saved": tokens_saved
+                    }
+        if buffer.strip():
+            message = json.loads(buffer)
+            if message.get("done") or message.get("error"):
+                return {**message, "response": stream.text, "tokens_saved": 0}
+        return {"response": stream.text, "eval_count": generated_tokens, "tokens_saved": 0}
+    
     def _extract_json_from_response(self, response_text: str) -> Dict[str, Any]:
         """
         Extrait et parse le JSON de la réponse d'Ollama
         
+        Un seul passage linéaire sur la réponse (voir json_stream.extract_json),
+        tolérant aux réponses tronquées ou mal formées ; le texte libre n'est
+        exploité qu'en l'absence de tout JSON.
+        
         Args:
             response_text: Texte de réponse d'Ollama
             
@@ -180,91 +727,13 @@ Veuillez formater votre réponse sous la forme d'un JSON valide.
             return {"raw_response": "", "vulnerabilities": []}
             
         try:
-            # Log de la réponse complète pour déboguer
-            logger.info("=== DÉBUT DE LA RÉPONSE COMPLÈTE ===")
-            logger.info(response_text)
-            logger.info("=== FIN DE LA RÉPONSE COMPLÈTE ===")
-            
-            logger.debug(f"Tentative d'extraction JSON de: {response_text[:200]}...")
-            
-            # Recherche de blocs JSON dans la réponse - version plus robuste
-            # Chercher des JSON complets avec des accolades équilibrées
-            json_matches = []
-            brace_count = 0
-            start_pos = -1
-            
-            for i, char in enumerate(response_text):
-                if char == '{':
-                    if brace_count == 0:
-                        start_pos = i
-                    brace_count += 1
-                elif char == '}':
-                    brace_count -= 1
-                    if brace_count == 0 and start_pos != -1:
-                        json_matches.append(response_text[start_pos:i+1])
-            
-            # Essayer de parser chaque JSON trouvé
-            for json_str in json_matches:
-                try:
-                    logger.info(f"Tentative de parsing JSON: {json_str[:100]}...")
-                    parsed_json = json.loads(json_str)
-                    logger.info("JSON parsé avec succès")
-                    return parsed_json
-                except json.JSONDecodeError as je:
-                    logger.debug(f"Échec du parsing pour ce JSON: {str(je)}")
-                    # Essayer de compléter le JSON incomplet
-                    fixed_json = self._try_fix_incomplete_json(json_str)
-                    if fixed_json:
-                        try:
-                            parsed_json = json.loads(fixed_json)
-                            logger.info("JSON incomplet réparé avec succès")
-                            return parsed_json
-                        except:
-                            logger.debug("Échec de la réparation du JSON")
-                    continue
+            logger.debug(f"Réponse complète du modèle: {response_text}")
             
-            # Si aucun JSON complet n'est trouvé, essayer la méthode regex comme fallback
-            json_match = re.search(r'\{[^{}]*(?:\{[^{}]*\}[^{}]*)*\}', response_text, re.DOTALL)
-            if json_match:
-                json_str = json_match.group(0)
-                logger.info(f"JSON trouvé avec regex")
-                try:
-                    parsed_json = json.loads(json_str)
-                    return parsed_json
-                except json.JSONDecodeError as je:
-                    logger.warning(f"JSON invalide trouvé dans la réponse: {str(je)}")
-                    # Essayer de réparer le JSON
-                    fixed_json = self._try_fix_incomplete_json(json_str)
-                    if fixed_json:
-                        try:
-                            parsed_json = json.loads(fixed_json)
-                            logger.info("JSON réparé avec succès")
-                            return parsed_json
-                        except:
-                            logger.warning("Échec de la réparation du JSON")
-                    
-                    # Tentative de nettoyage du JSON
-                    cleaned_json_str = re.sub(r',\s*}', '}', json_str)
-                    cleaned_json_str = re.sub(r',\s*]', ']', cleaned_json_str)
-                    try:
-                        parsed_json = json.loads(cleaned_json_str)
-                        logger.info("JSON nettoyé avec succès")
-                        return parsed_json
-                    except Exception as clean_error:
-                        logger.warning(f"Échec du nettoyage du JSON: {str(clean_error)}")
-            
-            # Essayer de trouver une liste JSON
-            json_list_match = re.search(r'\[[^\[\]]*(?:\[[^\[\]]*\][^\[\]]*)*\]', response_text, re.DOTALL)
-            if json_list_match:
-                json_str = json_list_match.group(0)
-                logger.info(f"Liste JSON trouvée dans la réponse")
-                try:
-                    parsed_list = json.loads(json_str)
-                    return {"vulnerabilities": parsed_list}
-                except json.JSONDecodeError as je:
-                    logger.warning(f"Liste JSON invalide: {str(je)}")
-            
-            # Si toujours pas de JSON, essayer d'extraire des vulnérabilités du texte libre
+            parsed = extract_json(response_text)
+            if parsed is not None:
+                return self._normalize_analysis(parsed)
+            
+            # Pas de JSON : extraire les vulnérabilités du texte libre
             logger.warning(f"Aucun JSON valide trouvé, tentative d'extraction depuis le texte libre")
             extracted_vulns = self._extract_vulnerabilities_from_text(response_text)
             if extracted_vulns:
@@ -279,47 +748,20 @@ Veuillez formater votre réponse sous la forme d'un JSON valide.
             logger.debug(f"Traceback: {traceback.format_exc()}")
             return {"raw_response": response_text or "", "error": str(extract_error), "vulnerabilities": []}
     
-    def _try_fix_incomplete_json(self, json_str: str) -> Optional[str]:
+    def _normalize_analysis(self, parsed: Dict[str, Any]) -> Dict[str, Any]:
         """
-        Essaie de réparer un JSON incomplet
+        Ramène un JSON extrait au format attendu : une liste "vulnerabilities" d'objets
         
-        Args:
-            json_str: Chaîne JSON potentiellement incomplète
-            
-        Returns:
-            JSON réparé ou None si impossible
+        Un objet décrivant directement une vulnérabilité est enveloppé dans la
+        liste ; les éléments qui ne sont pas des objets (réponse tronquée ou
+        mal formée) sont écartés.
         """
-        try:
-            # Compter les accolades et crochets pour voir ce qui manque
-            open_braces = json_str.count('{')
-            close_braces = json_str.count('}')
-            open_brackets = json_str.count('[')
-            close_brackets = json_str.count(']')
-            
-            # Si il manque des accolades de fermeture
-            missing_braces = open_braces - close_braces
-            missing_brackets = open_brackets - close_brackets
-            
-            if missing_braces > 0 or missing_brackets > 0:
-                fixed = json_str
-                
-                # Vérifier si le JSON se termine par une virgule incomplète
-                fixed = re.sub(r',\s*$', '', fixed.strip())
-                
-                # Ajouter les fermetures manquantes
-                for _ in range(missing_brackets):
-                    fixed += ']'
-                for _ in range(missing_braces):
-                    fixed += '}'
-                
-                logger.info(f"Tentative de réparation: ajout de {missing_braces} }} et {missing_brackets} ]")
-                return fixed
-            
-            return None
-            
-        except Exception as e:
-            logger.error(f"Erreur lors de la réparation du JSON: {str(e)}")
-            return None
+        vulnerabilities = parsed.get("vulnerabilities")
+        if vulnerabilities is None and "type_vulnerabilite" in parsed:
+            return {"vulnerabilities": [parsed]}
+        if not isinstance(vulnerabilities, list):
+            vulnerabilities = []
+        return {**parsed, "vulnerabilities": [v for v in vulnerabilities if isinstance(v, dict)]}
     
     def _extract_vulnerabilities_from_text(self, text: str) -> List[Dict[str, Any]]:
         """
@@ -527,7 +969,102 @@ Veuillez formater votre réponse sous la forme d'un JSON valide.
             logger.debug(f"Traceback: {traceback.format_exc()}")
             return 0.0
     
-    async def compare_models(self, models: List[str], code: str, prompt: str) -> Dict[str, Any]:
+    async def _evaluate_model(self, model: str, code: str, prompt: str, packed: bool = False) -> Dict[str, Any]:
+        """
+        Analyse le code avec un modèle et évalue la qualité de sa réponse
+        
+        Args:
+            model: Nom du modèle Ollama
+            code: Code source à analyser
+            prompt: Instructions pour l'analyse
+            packed: Code de plusieurs fichiers en sections (voir analyze_code)
+            
+        Returns:
+            Entrée de résultat pour ce modèle (response, quality_score, error éventuelle)
+        """
+        try:
+            logger.info(f"Analyse avec le modèle {model}")
+            response = await self.analyze_code(model, code, prompt, packed)
+            
+            # Si une erreur s'est produite
+            if "error" in response:
+                logger.warning(f"Erreur dans la réponse du modèle {model}: {response.get('error')}")
+                return {
+                    "response": response,
+                    "quality_score": 0.0,
+                    "error": response.get("error")
+                }
+            
+            # Évaluer la qualité de la réponse
+            quality_score = self.evaluate_response_quality(response)
+            logger.info(f"Score de qualité pour {model}: {quality_score}")
+            
+            return {
+                "response": response,
+                "quality_score": quality_score
+            }
+                
+        except Exception as e:
+            logger.error(f"Erreur avec le modèle {model}: {str(e)}")
+            import traceback
+            logger.debug(f"Traceback pour {model}: {traceback.format_exc()}")
+            return {
+                "error": str(e),
+                "quality_score": 0.0,
+                "response": {"error": str(e), "vulnerabilities": []}
+            }
+    
+    async def _evaluate_models_concurrently(self, models: List[str], code: str, prompt: str,
+                                            max_parallel: int, timeout: Optional[float],
+                                            packed: bool = False) -> Dict[str, Dict[str, Any]]:
+        """
+        Interroge plusieurs modèles en parallèle avec un plafond et un délai maximal
+        
+        Args:
+            models: Liste des modèles à interroger
+            code: Code source à analyser
+            prompt: Instructions pour l'analyse
+            max_parallel: Nombre maximal de modèles interrogés simultanément (0 = tous)
+            timeout: Délai maximal en secondes (None = aucun)
+            packed: Code de plusieurs fichiers en sections (voir analyze_code)
+            
+        Returns:
+            Résultats par modèle ; les modèles hors délai sont marqués "timed_out"
+        """
+        semaphore = asyncio.Semaphore(max_parallel or len(models))
+        
+        async def run(model: str) -> Dict[str, Any]:
+            async with semaphore:
+                return await self._evaluate_model(model, code, prompt, packed)
+        
+        pending_tasks = {model: asyncio.create_task(run(model)) for model in models}
+        done, pending = await asyncio.wait(pending_tasks.values(), timeout=timeout)
+        
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+        
+        results = {}
+        for model, task in pending_tasks.items():
+            if task in done:
+                results[model] = task.result()
+            else:
+                error = f"Délai dépassé ({timeout}s) pour le modèle {model}"
+                logger.warning(error)
+                results[model] = {
+                    "error": error,
+                    "quality_score": 0.0,
+                    "timed_out": True,
+                    "response": {"error": error, "vulnerabilities": []}
+                }
+        return results
+    
+    async def compare_models(self, models: List[str], code: str, prompt: str,
+                             concurrent: bool = OLLAMA_COMPARE_CONCURRENT,
+                             max_parallel: int = OLLAMA_COMPARE_MAX_PARALLEL,
+                             timeout: Optional[float] = OLLAMA_COMPARE_TIMEOUT or None,
+                             packed: bool = False) -> Dict[str, Any]:
         """
         Compare les résultats d'analyse entre différents modèles
         
@@ -535,14 +1072,16 @@ Veuillez formater votre réponse sous la forme d'un JSON valide.
             models: Liste des modèles à comparer
             code: Code source à analyser
             prompt: Instructions pour l'analyse
+            concurrent: Si True, interroge tous les modèles en parallèle
+            max_parallel: Nombre maximal de modèles interrogés simultanément (0 = tous)
+            timeout: Délai maximal en secondes en mode parallèle ; les modèles
+                     plus lents sont enregistrés comme en timeout
+            packed: Code de plusieurs fichiers en sections (voir prompt_packer) ;
+                    chaque vulnérabilité désigne alors son fichier
             
         Returns:
             Résultats des modèles avec scores et meilleur modèle
         """
-        results = {}
-        best_model = None
-        best_score = -1
-        
         if not models:
             logger.warning("Aucun modèle fourni pour l'analyse")
             return {
@@ -552,45 +1091,40 @@ Veuillez formater votre réponse sous la forme d'un JSON valide.
                 "error": "Aucun modèle fourni"
             }
         
+        if concurrent and len(models) > 1:
+            results = await self._evaluate_models_concurrently(models, code, prompt, max_parallel, timeout, packed)
+        else:
+            results = {}
+            for model in models:
+                results[model] = await self._evaluate_model(model, code, prompt, packed)
+        
+        return self.join_model_results(models, results)
+    
+    def join_model_results(self, models: List[str], results: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Assemble les résultats de chaque modèle pour un même code en une comparaison
+        
+        Utilisé par compare_models, et pour les analyses ordonnancées par
+        modèle dont les résultats par modèle sont obtenus séparément.
+        
+        Args:
+            models: Modèles comparés, par ordre de préférence
+            results: Résultat de chaque modèle (response, quality_score, error éventuelle)
+            
+        Returns:
+            Résultats des modèles avec scores et meilleur modèle (structure de compare_models)
+        """
+        best_model = None
+        best_score = -1
+        
+        # Sélectionner le meilleur modèle (dans l'ordre des modèles demandés)
         for model in models:
-            try:
-                logger.info(f"Analyse avec le modèle {model}")
-                response = await self.analyze_code(model, code, prompt)
-                
-                # Si une erreur s'est produite
-                if "error" in response:
-                    logger.warning(f"Erreur dans la réponse du modèle {model}: {response.get('error')}")
-                    results[model] = {
-                        "response": response,
-                        "quality_score": 0.0,
-                        "error": response.get("error")
-                    }
-                    continue
-                
-                # Évaluer la qualité de la réponse
-                quality_score = self.evaluate_response_quality(response)
-                
-                results[model] = {
-                    "response": response,
-                    "quality_score": quality_score
-                }
-                
-                logger.info(f"Score de qualité pour {model}: {quality_score}")
-                
-                # Mettre à jour le meilleur modèle si nécessaire
-                if quality_score > best_score:
-                    best_score = quality_score
-                    best_model = model
-                    
-            except Exception as e:
-                logger.error(f"Erreur avec le modèle {model}: {str(e)}")
-                import traceback
-                logger.debug(f"Traceback pour {model}: {traceback.format_exc()}")
-                results[model] = {
-                    "error": str(e),
-                    "quality_score": 0.0,
-                    "response": {"error": str(e), "vulnerabilities": []}
-                }
+            result = results[model]
+            if "error" in result:
+                continue
+            if result["quality_score"] > best_score:
+                best_score = result["quality_score"]
+                best_model = model
         
         # Si aucun modèle n'a réussi
         if best_model is None and models:
@@ -602,4 +1136,4 @@ Veuillez formater votre réponse sous la forme d'un JSON valide.
             "results": results,
             "best_model": best_model,
             "best_score": best_score
-        }
\ No newline at end of file
+        }
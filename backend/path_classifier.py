@@ -0,0 +1,249 @@
+import os
+import re
+import logging
+from collections import Counter
+from typing import List, Dict, Any, Optional, Tuple
+
+# Configuration du logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Raisons d'exclusion
+EXCLUDED_GITIGNORE = "gitignore"
+EXCLUDED_GENERATED = "linguist-generated"
+EXCLUDED_VENDORED = "linguist-vendored"
+EXCLUDED_VENDOR_DIRECTORY = "dossier tiers"
+EXCLUDED_GENERATED_FILE = "fichier généré"
+EXCLUDED_LOCK_FILE = "fichier de verrouillage"
+EXCLUDED_MINIFIED = "fichier minifié"
+
+# Dossiers de dépendances, de build et d'environnements (jamais du code du projet)
+VENDOR_DIRECTORIES = {
+    'node_modules', 'bower_components', 'jspm_packages', 'vendor', 'third_party', 'thirdparty',
+    'dist', 'build', 'target', 'coverage', 'htmlcov', '__pycache__', 'site-packages',
+    'venv', 'virtualenv', 'Pods', 'Carthage', 'DerivedData'
+}
+
+LOCK_FILES = {
+    'package-lock.json', 'npm-shrinkwrap.json', 'yarn.lock', 'pnpm-lock.yaml', 'poetry.lock',
+    'pipfile.lock', 'composer.lock', 'cargo.lock', 'gemfile.lock', 'go.sum', 'packages.lock.json'
+}
+
+# Fichiers générés reconnaissables à leur nom
+GENERATED_FILE_PATTERN = re.compile(
+    r"\.(min|bundle|chunk)\.(js|mjs|css)$|\.map$|_pb2(_grpc)?\.py$|\.pb\.go$|\.pb\.(cc|h)$"
+    r"|\.g\.(cs|dart)$|\.designer\.cs$|\.generated\.\w+$|(^|[-.])bundle\.js$",
+    re.I
+)
+
+# Détection du code minifié : seuls les premiers octets des fichiers concernés sont lus
+MINIFIABLE_EXTENSIONS = {'.js', '.mjs', '.cjs', '.css'}
+MINIFIED_SAMPLE_BYTES = 8192
+MINIFIED_MAX_LINE_LENGTH = 1000
+MINIFIED_AVERAGE_LINE_LENGTH = 200
+
+
+def _glob_to_regex(pattern: str) -> str:
+    """Traduit un motif de style .gitignore (*, ?, **, [...]) en expression régulière"""
+    regex = ""
+    i = 0
+    while i < len(pattern):
+        char = pattern[i]
+        if pattern.startswith("**/", i):
+            regex += "(?:.*/)?"
+            i += 3
+            continue
+        if pattern.startswith("/**", i) and i + 3 == len(pattern):
+            regex += "/.*"
+            i += 3
+            continue
+        if pattern.startswith("**", i):
+            regex += ".*"
+            i += 2
+            continue
+        if char == "*":
+            regex += "[^/]*"
+        elif char == "?":
+            regex += "[^/]"
+        elif char == "[":
+            end = pattern.find("]", i + 1)
+            if end == -1:
+                regex += re.escape(char)
+            else:
+                regex += "[" + pattern[i + 1:end].replace("!", "^", 1).replace("\\", "\\\\") + "]"
+                i = end
+        else:
+            regex += re.escape(char)
+        i += 1
+    return regex
+
+
+def compile_pattern(pattern: str, base: str) -> Optional[Tuple[re.Pattern, bool, bool, str]]:
+    """
+    Compile une ligne de .gitignore ou de .gitattributes
+
+    Args:
+        pattern: Motif (éventuellement précédé de "!")
+        base: Dossier (relatif) contenant le fichier de règles
+
+    Returns:
+        (expression, négation, dossiers uniquement, base), None pour un commentaire ou une ligne vide
+    """
+    pattern = pattern.rstrip("\n").rstrip()
+    if not pattern or pattern.startswith("#"):
+        return None
+    negate = pattern.startswith("!")
+    if negate:
+        pattern = pattern[1:]
+    if pattern.startswith("\\"):
+        pattern = pattern[1:]
+    directory_only = pattern.endswith("/")
+    pattern = pattern.rstrip("/")
+    if not pattern:
+        return None
+    # Un motif contenant "/" (hors fin) est relatif au dossier du fichier de règles
+    anchored = "/" in pattern
+    regex = _glob_to_regex(pattern.lstrip("/"))
+    regex = f"^{regex}$" if anchored else f"^(?:.*/)?{regex}$"
+    return re.compile(regex), negate, directory_only, base
+
+
+def _matches(rule: Tuple[re.Pattern, bool, bool, str], path: str, is_dir: bool) -> bool:
+    regex, _, directory_only, base = rule
+    if directory_only and not is_dir:
+        return False
+    if base:
+        if not path.startswith(base + "/"):
+            return False
+        path = path[len(base) + 1:]
+    return regex.match(path) is not None
+
+
+def is_minified(sample: str) -> bool:
+    """Indique si un extrait de fichier ressemble à du code minifié (lignes très longues)"""
+    lines = sample.splitlines() or [""]
+    # La dernière ligne de l'extrait peut être tronquée
+    complete = lines[:-1] if len(lines) > 1 else lines
+    if any(len(line) > MINIFIED_MAX_LINE_LENGTH for line in complete):
+        return True
+    return len(sample) >= 1024 and len(sample) / len(lines) > MINIFIED_AVERAGE_LINE_LENGTH
+
+
+class PathClassifier:
+    """Classe les chemins d'un dépôt : code du projet, ou code tiers / généré à exclure de l'analyse"""
+
+    def __init__(self, repo_path: str):
+        """
+        Initialise le classificateur (les règles sont chargées dossier par dossier, au fil du parcours)
+
+        Args:
+            repo_path: Chemin du dépôt cloné localement
+        """
+        self.repo_path = repo_path
+        self._ignore_rules: List[Tuple[re.Pattern, bool, bool, str]] = []
+        self._attribute_rules: List[Tuple[Tuple[re.Pattern, bool, bool, str], Dict[str, bool]]] = []
+        self.excluded: Dict[str, str] = {}
+        self.excluded_directories = 0
+
+    def _read_rules(self, relative_dir: str, name: str) -> List[str]:
+        path = os.path.join(self.repo_path, relative_dir, name)
+        try:
+            with open(path, 'r', encoding='utf-8', errors='ignore') as f:
+                return f.readlines()
+        except OSError:
+            return []
+
+    def enter_directory(self, relative_dir: str):
+        """Charge le .gitignore et le .gitattributes d'un dossier avant d'en classer les entrées"""
+        base = relative_dir.replace(os.sep, "/")
+        for line in self._read_rules(relative_dir, ".gitignore"):
+            rule = compile_pattern(line, base)
+            if rule is not None:
+                self._ignore_rules.append(rule)
+        for line in self._read_rules(relative_dir, ".gitattributes"):
+            parts = line.split()
+            if len(parts) < 2:
+                continue
+            rule = compile_pattern(parts[0], base)
+            if rule is None or rule[1]:
+                continue
+            attributes = {}
+            for attribute in parts[1:]:
+                unset = attribute.startswith("-")
+                name, _, value = attribute.lstrip("-!").partition("=")
+                if name in ("linguist-generated", "linguist-vendored"):
+                    attributes[name] = not unset and value.lower() not in ("false", "0")
+            if attributes:
+                self._attribute_rules.append((rule, attributes))
+
+    def _attribute(self, path: str, name: str) -> bool:
+        value = False
+        for rule, attributes in self._attribute_rules:
+            if name in attributes and _matches(rule, path, False):
+                value = attributes[name]
+        return value
+
+    def _ignored(self, path: str, is_dir: bool) -> bool:
+        ignored = False
+        for rule in self._ignore_rules:
+            if _matches(rule, path, is_dir):
+                ignored = not rule[1]
+        return ignored
+
+    def classify(self, relative_path: str, is_dir: bool) -> Optional[str]:
+        """
+        Détermine si un chemin doit être exclu (les dossiers exclus ne sont pas parcourus)
+
+        Args:
+            relative_path: Chemin relatif à la racine du dépôt
+            is_dir: True pour un dossier
+
+        Returns:
+            Raison de l'exclusion, ou None pour du code du projet
+        """
+        path = relative_path.replace(os.sep, "/")
+        name = path.rsplit("/", 1)[-1]
+        if is_dir:
+            if name in VENDOR_DIRECTORIES:
+                reason = EXCLUDED_VENDOR_DIRECTORY
+            elif self._ignored(path, True):
+                reason = EXCLUDED_GITIGNORE
+            else:
+                reason = None
+        elif self._attribute(path, "linguist-generated"):
+            reason = EXCLUDED_GENERATED
+        elif self._attribute(path, "linguist-vendored"):
+            reason = EXCLUDED_VENDORED
+        elif name.lower() in LOCK_FILES:
+            reason = EXCLUDED_LOCK_FILE
+        elif GENERATED_FILE_PATTERN.search(name):
+            reason = EXCLUDED_GENERATED_FILE
+        elif self._ignored(path, False):
+            reason = EXCLUDED_GITIGNORE
+        elif os.path.splitext(name)[1].lower() in MINIFIABLE_EXTENSIONS and self._looks_minified(relative_path):
+            reason = EXCLUDED_MINIFIED
+        else:
+            reason = None
+
+        if reason is not None:
+            self.excluded[relative_path] = reason
+            if is_dir:
+                self.excluded_directories += 1
+        return reason
+
+    def _looks_minified(self, relative_path: str) -> bool:
+        try:
+            with open(os.path.join(self.repo_path, relative_path), 'r', encoding='utf-8', errors='ignore') as f:
+                return is_minified(f.read(MINIFIED_SAMPLE_BYTES))
+        except OSError:
+            return False
+
+    def summary(self, sample_size: int = 20) -> Dict[str, Any]:
+        """Chemins exclus, pour le résultat de l'analyse"""
+        return {
+            "enabled": True,
+            "directories": self.excluded_directories,
+            "files": len(self.excluded) - self.excluded_directories,
+            "by_reason": dict(Counter(self.excluded.values()).most_common()),
+            "paths": [{"path": path, "reason": reason} for path, reason in list(self.excluded.items())[:sample_size]]
+        }
@@ -0,0 +1,179 @@
+import re
+import ast
+import logging
+from typing import List, Dict, Any, Set
+
+# Configuration du logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Raison enregistrée pour les fichiers écartés par le pré-filtre
+PREFILTER_REASON = "pré-filtré"
+
+# Signaux de risque détectés par expressions régulières (catégorie, motif)
+SIGNAL_PATTERNS = [
+    ("sql_dynamique", re.compile(
+        r"(?i)(execute|executemany|query|raw|prepare)\s*\(\s*(f[\"']|[\"'][^\"'\n]*[\"']\s*(\+|%|\.format))"
+        r"|[\"'`]\s*(select|insert|update|delete)\s[^\"'`\n]*[\"'`]\s*(\+|%|\.format|\.\.)"
+        r"|\bf[\"'](select|insert|update|delete)\s"
+        r"|`(select|insert|update|delete)\s[^`]*\$\{")),
+    ("execution_commande", re.compile(
+        r"\b(subprocess\.|os\.system|os\.popen|os\.exec\w*|child_process|execSync|execFile|shell_exec|passthru"
+        r"|proc_open|popen\s*\(|Runtime\.getRuntime\(\)\.exec|ProcessBuilder|exec\.Command)")),
+    ("evaluation_dynamique", re.compile(
+        r"(?<![\w.])(eval|exec)\s*\(|\bnew\s+Function\s*\(|\bcreate_function\s*\(|\bassert\s*\(\s*\$"
+        r"|\bsetTimeout\s*\(\s*[\"'`]")),
+    ("deserialisation", re.compile(
+        r"\b(pickle\.loads?|cPickle|marshal\.loads?|jsonpickle|yaml\.load\s*\((?![^)]*SafeLoader)|yaml\.unsafe_load"
+        r"|unserialize\s*\(|ObjectInputStream|readObject\s*\(|BinaryFormatter|Marshal\.load|node-serialize)")),
+    ("secret", re.compile(
+        r"(?i)(password|passwd|pwd|secret|api[_-]?key|access[_-]?key|private[_-]?key|auth[_-]?token|client[_-]?secret)"
+        r"[\"']?\s*[:=]\s*[\"'][^\"'\s]{6,}[\"']"
+        r"|AKIA[0-9A-Z]{16}|-----BEGIN (RSA |EC |DSA |OPENSSH )?PRIVATE KEY-----|gh[pousr]_[A-Za-z0-9]{36}"
+        r"|xox[baprs]-[A-Za-z0-9-]{10,}|sk_live_[A-Za-z0-9]{16,}")),
+    ("entree_utilisateur", re.compile(
+        r"\$_(GET|POST|REQUEST|COOKIE|FILES|SERVER)\b"
+        r"|\brequest\.(args|form|values|json|data|files|cookies|headers|GET|POST|query_params|body|params)\b"
+        r"|\breq\.(body|query|params|cookies|headers)\b"
+        r"|@(app|router|bp|blueprint|api)\.(route|get|post|put|delete|patch)\b"
+        r"|@(Get|Post|Put|Delete|Patch|Request)Mapping|HttpServletRequest|getParameter\s*\("
+        r"|\bctx\.(request|query|params)\b|\.FormValue\s*\(|URL\.Query\(\)|\bparams\[[:\"']")),
+    ("injection_html", re.compile(
+        r"innerHTML|outerHTML|dangerouslySetInnerHTML|document\.write|v-html|\|\s*safe\b|mark_safe|Markup\s*\("
+        r"|html_safe|\{\{\{|<%-|render_template_string")),
+    ("fichier_chemin", re.compile(
+        r"\b(send_file|sendFile|send_from_directory|file_get_contents|fopen|readFileSync|createReadStream"
+        r"|move_uploaded_file|os\.path\.join\s*\([^)]*request)\b|\b(include|require)(_once)?\s*\(?\s*\$")),
+    ("requete_sortante", re.compile(
+        r"\b(requests\.(get|post|put|delete|request)|urllib\.request|urlopen|httpx\.|axios\.|curl_exec"
+        r"|HttpClient|http\.Get|RestTemplate)\b|\bfetch\s*\(")),
+    ("crypto_faible", re.compile(
+        r"(?i)\b(md5|sha1|des|rc4)\s*\(|hashlib\.(md5|sha1)|MODE_ECB|Math\.random\s*\(|random\.random\s*\("
+        r"|verify\s*=\s*False|rejectUnauthorized\s*:\s*false|InsecureSkipVerify|CURLOPT_SSL_VERIFYPEER")),
+    ("configuration_risquee", re.compile(
+        r"(?i)\bdebug\s*[:=]\s*true\b|\bprivileged\s*:\s*true|allow_origins?\s*[:=]\s*\[?\s*[\"']\*"
+        r"|Access-Control-Allow-Origin[\"']?\s*[:,]\s*[\"']\*|ALLOWED_HOSTS\s*=\s*\[\s*[\"']\*|chmod\s+(-R\s+)?777"
+        r"|^\s*USER\s+root\b|--no-check-certificate|curl[^\n|]*\|\s*(ba)?sh")),
+    ("xml_externe", re.compile(
+        r"\b(DocumentBuilderFactory|SAXParserFactory|XMLInputFactory|simplexml_load_\w+|LIBXML_NOENT"
+        r"|resolve_entities|etree\.(parse|fromstring)|xml\.dom\.minidom|xml\.sax)\b")),
+    ("redirection", re.compile(
+        r"\bredirect\s*\(\s*(request|req|params|\$_)|\bres\.redirect\s*\(\s*req|header\s*\(\s*[\"']Location:\s*[\"']?\s*\.\s*\$")),
+]
+
+# Catégories de signaux pertinentes pour les fichiers de données et la documentation
+DATA_LANGUAGES = {'JSON', 'YAML', 'XML', 'TOML', 'CSS'}
+DATA_SIGNALS = {"secret", "configuration_risquee"}
+DOCUMENT_LANGUAGES = {'Markdown'}
+DOCUMENT_SIGNALS = {"secret"}
+
+# Appels Python dangereux reconnus par l'analyse de l'AST
+PYTHON_DANGEROUS_CALLS = {
+    "eval": "evaluation_dynamique", "exec": "evaluation_dynamique", "compile": "evaluation_dynamique",
+    "__import__": "evaluation_dynamique",
+    "pickle.load": "deserialisation", "pickle.loads": "deserialisation", "marshal.loads": "deserialisation",
+    "shelve.open": "deserialisation", "yaml.unsafe_load": "deserialisation",
+    "os.system": "execution_commande", "os.popen": "execution_commande",
+    "subprocess.call": "execution_commande", "subprocess.run": "execution_commande",
+    "subprocess.Popen": "execution_commande", "subprocess.check_output": "execution_commande",
+    "subprocess.check_call": "execution_commande",
+}
+# Méthodes exécutant du SQL : signal si la requête n'est pas une chaîne constante
+PYTHON_SQL_METHODS = {"execute", "executemany", "executescript", "raw", "extra"}
+
+
+def _call_name(node: ast.AST) -> str:
+    """Nom qualifié d'un appel (ex. "subprocess.run"), vide s'il n'est pas statique"""
+    if isinstance(node, ast.Name):
+        return node.id
+    if isinstance(node, ast.Attribute):
+        parent = _call_name(node.value)
+        return f"{parent}.{node.attr}" if parent else node.attr
+    return ""
+
+
+def _python_ast_signals(content: str) -> Set[str]:
+    """Signaux issus de l'AST d'un fichier Python (ensemble vide si le code ne se parse pas)"""
+    try:
+        tree = ast.parse(content)
+    except (SyntaxError, ValueError):
+        return set()
+
+    signals = set()
+    for node in ast.walk(tree):
+        if not isinstance(node, ast.Call):
+            continue
+        name = _call_name(node.func)
+        if name in PYTHON_DANGEROUS_CALLS:
+            signals.add(PYTHON_DANGEROUS_CALLS[name])
+        elif name == "yaml.load" and not any(k.arg == "Loader" and "Safe" in _call_name(k.value) for k in node.keywords):
+            signals.add("deserialisation")
+        method = name.rsplit(".", 1)[-1]
+        if method in PYTHON_SQL_METHODS and node.args:
+            query = node.args[0]
+            # Requête construite dynamiquement : f-string, concaténation, % ou .format()
+            if isinstance(query, (ast.JoinedStr, ast.BinOp)) or \
+                    (isinstance(query, ast.Call) and _call_name(query.func).endswith("format")):
+                signals.add("sql_dynamique")
+        if any(k.arg == "shell" and isinstance(k.value, ast.Constant) and k.value.value is True for k in node.keywords):
+            signals.add("execution_commande")
+    return signals
+
+
+def screen_file(file_path: str, language: str, content: str) -> Dict[str, Any]:
+    """
+    Détermine si un fichier mérite une analyse par les modèles
+
+    Un fichier est analysé dès qu'un signal de risque pertinent pour son type
+    est présent (construction de requêtes SQL, exécution de commandes,
+    désérialisation, secrets, entrées utilisateur...). Pour les fichiers de
+    données et la documentation, seuls les secrets et les configurations
+    risquées comptent.
+
+    Args:
+        file_path: Chemin du fichier (relatif à la racine du dépôt)
+        language: Langage détecté
+        content: Contenu du fichier
+
+    Returns:
+        Dictionnaire {analyze, signals}
+    """
+    if language in DOCUMENT_LANGUAGES:
+        relevant = DOCUMENT_SIGNALS
+    elif language in DATA_LANGUAGES:
+        relevant = DATA_SIGNALS
+    else:
+        relevant = None
+
+    signals = set()
+    if language == 'Python':
+        signals |= _python_ast_signals(content)
+    for category, pattern in SIGNAL_PATTERNS:
+        if category in signals or (relevant is not None and category not in relevant):
+            continue
+        if pattern.search(content):
+            signals.add(category)
+    if relevant is not None:
+        signals &= relevant
+
+    return {"analyze": bool(signals), "signals": sorted(signals)}
+
+
+def prefiltered_result(file_path: str, language: str, screening: Dict[str, Any]) -> Dict[str, Any]:
+    """Résultat d'un fichier écarté par le pré-filtre (aucun appel aux modèles)"""
+    return {
+        "file_path": file_path,
+        "language": language,
+        "status": "ignoré",
+        "reason": PREFILTER_REASON,
+        "prefilter": screening
+    }
+
+
+def count_signals(results: List[Dict[str, Any]]) -> Dict[str, int]:
+    """Nombre de fichiers analysés par signal déclencheur"""
+    counts: Dict[str, int] = {}
+    for result in results:
+        for signal in (result.get("prefilter") or {}).get("signals", []):
+            counts[signal] = counts.get(signal, 0) + 1
+    return counts
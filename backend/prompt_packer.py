@@ -0,0 +1,180 @@
+import re
+import logging
+from typing import List, Dict, Any, Optional, Tuple
+
+from chunker import remap_line_numbers, LINE_RANGE_PATTERN
+
+# Configuration du logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Délimiteurs des sections d'un prompt groupé (une section par fichier)
+SECTION_HEADER = "===== FICHIER {index} : {path} ({lines} lignes) ====="
+SECTION_FOOTER = "===== FIN DU FICHIER {index} ====="
+SECTION_HEADER_PATTERN = re.compile(r"^===== FICHIER (\d+) : (.+) \(\d+ lignes\) =====$", re.MULTILINE)
+# Référence à une section par son numéro ("FICHIER 2", "fichier 2")
+SECTION_INDEX_PATTERN = re.compile(r"^\s*fichier\s+(\d+)\s*$", re.IGNORECASE)
+
+
+def section_overhead(file_path: str) -> int:
+    """Caractères ajoutés au code d'un fichier par ses délimiteurs de section"""
+    return len(SECTION_HEADER.format(index=99, path=file_path, lines=99999)) + len(SECTION_FOOTER.format(index=99)) + 3
+
+
+def plan_packs(candidates: List[Dict[str, Any]], max_chars: int, max_files: int) -> List[List[str]]:
+    """
+    Regroupe des petits fichiers d'un même langage dans des prompts communs
+
+    Les fichiers sont pris dans l'ordre reçu (priorité décroissante) et
+    ajoutés au premier groupe ouvert de leur langage tant que le groupe
+    reste sous max_chars caractères (délimiteurs compris) et max_files
+    fichiers. Un groupe plein est fermé et un nouveau groupe est ouvert.
+
+    Args:
+        candidates: Fichiers {path, language, size}
+        max_chars: Taille maximale du code d'un groupe en caractères
+        max_files: Nombre maximal de fichiers par groupe
+
+    Returns:
+        Groupes de chemins, dans l'ordre de leur premier fichier ; les groupes
+        d'un seul fichier sont conservés (analysés seuls)
+    """
+    packs: List[List[str]] = []
+    open_packs: Dict[str, Tuple[List[str], int]] = {}
+    for candidate in candidates:
+        cost = candidate["size"] + section_overhead(candidate["path"])
+        language = candidate["language"]
+        pack, size = open_packs.get(language, (None, 0))
+        if pack is None or size + cost > max_chars or len(pack) >= max_files:
+            pack, size = [], 0
+            packs.append(pack)
+        pack.append(candidate["path"])
+        open_packs[language] = (pack, size + cost)
+    return packs
+
+
+def build_packed_code(files: List[Dict[str, Any]]) -> Tuple[str, List[Dict[str, Any]]]:
+    """
+    Assemble le code de plusieurs fichiers en sections délimitées
+
+    Args:
+        files: Fichiers {file_path, content}, dans l'ordre des sections
+
+    Returns:
+        (code groupé, sections {index, file_path, start_line, end_line, line_count}) ;
+        start_line et end_line sont les lignes du fichier dans le code groupé
+        (numérotées à partir de 1)
+    """
+    parts = []
+    sections = []
+    line = 1
+    for index, item in enumerate(files, start=1):
+        content = item["content"] if item["content"].endswith("\n") else item["content"] + "\n"
+        line_count = len(content.splitlines())
+        header = SECTION_HEADER.format(index=index, path=item["file_path"], lines=line_count)
+        parts.append(f"{header}\n{content}{SECTION_FOOTER.format(index=index)}\n")
+        sections.append({
+            "index": index,
+            "file_path": item["file_path"],
+            "start_line": line + 1,
+            "end_line": line + line_count,
+            "line_count": line_count
+        })
+        line += line_count + 2
+    return "".join(parts), sections
+
+
+def _line_values(value: Any) -> List[int]:
+    """Numéros de ligne contenus dans une valeur de "numeros_ligne" (nombres et plages)"""
+    if isinstance(value, bool):
+        return []
+    if isinstance(value, int):
+        return [value]
+    if isinstance(value, str):
+        match = LINE_RANGE_PATTERN.match(value)
+        if not match:
+            return []
+        return [int(group) for group in match.groups() if group]
+    if isinstance(value, list):
+        return [number for item in value for number in _line_values(item)]
+    return []
+
+
+def _find_section(reference: Any, sections: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Section désignée par le champ "fichier" d'une vulnérabilité (chemin, fin de chemin ou numéro)"""
+    if not isinstance(reference, str) or not reference.strip():
+        return None
+    reference = reference.strip().strip("`'\"").replace("\\", "/")
+    for section in sections:
+        if section["file_path"] == reference:
+            return section
+    # Chemin raccourci par le modèle ("views.py" pour "app/views.py")
+    matches = [s for s in sections if s["file_path"].endswith("/" + reference.lstrip("./"))]
+    if len(matches) == 1:
+        return matches[0]
+    match = SECTION_INDEX_PATTERN.match(reference)
+    if match and 1 <= int(match.group(1)) <= len(sections):
+        return sections[int(match.group(1)) - 1]
+    return None
+
+
+def _section_at_line(lines: List[int], sections: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Section contenant tous les numéros de ligne donnés (numéros du code groupé)"""
+    for section in sections:
+        if lines and all(section["start_line"] <= line <= section["end_line"] for line in lines):
+            return section
+    return None
+
+
+def split_packed_result(vulnerabilities: List[Dict[str, Any]],
+                        sections: List[Dict[str, Any]]) -> Tuple[Dict[str, List[Dict[str, Any]]], int]:
+    """
+    Répartit les vulnérabilités d'une analyse groupée entre les fichiers
+
+    Le fichier est désigné par le champ "fichier" de la vulnérabilité ; à
+    défaut, par la section du code groupé contenant ses numéros de ligne.
+    Les numéros de ligne sont ramenés à ceux du fichier : un modèle qui a
+    compté les lignes du code groupé (numéros au-delà de la taille du
+    fichier mais dans sa section) est corrigé.
+
+    Une vulnérabilité sans fichier identifiable n'est jamais perdue : elle
+    est rattachée au premier fichier du groupe, marquée
+    "attribution_incertaine" et accompagnée des fichiers du groupe
+    ("fichiers_groupe") ; ses numéros de ligne sont laissés tels quels.
+
+    Args:
+        vulnerabilities: Vulnérabilités renvoyées par le modèle
+        sections: Sections du code groupé (voir build_packed_code)
+
+    Returns:
+        (vulnérabilités par chemin de fichier, nombre de vulnérabilités à l'attribution incertaine)
+    """
+    by_file: Dict[str, List[Dict[str, Any]]] = {section["file_path"]: [] for section in sections}
+    unattributed = 0
+    for vuln in vulnerabilities:
+        if not isinstance(vuln, dict):
+            continue
+        vuln = dict(vuln)
+        reference = vuln.pop("fichier", None)
+        field = "numeros_ligne" if "numeros_ligne" in vuln else "line_numbers"
+        lines = _line_values(vuln.get(field))
+        section = _find_section(reference, sections)
+        packed_lines = section is None
+        if section is None:
+            section = _section_at_line(lines, sections)
+        elif lines and max(lines) > section["line_count"] and \
+                all(section["start_line"] <= line <= section["end_line"] for line in lines):
+            packed_lines = True
+        if section is None:
+            unattributed += 1
+            logger.warning(f"Vulnérabilité sans fichier identifiable dans une analyse groupée, rattachée au groupe: "
+                           f"{vuln.get('type_vulnerabilite')}")
+            vuln["attribution_incertaine"] = True
+            vuln["fichiers_groupe"] = [item["file_path"] for item in sections]
+            if sections:
+                by_file[sections[0]["file_path"]].append(vuln)
+            continue
+        if packed_lines and field in vuln:
+            vuln[field] = remap_line_numbers(vuln[field], 1 - section["start_line"])
+        by_file[section["file_path"]].append(vuln)
+    return by_file, unattributed
@@ -0,0 +1,181 @@
+import os
+import hashlib
+import logging
+from typing import List, Dict, Any, Optional, Callable, Iterable, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from path_classifier import PathClassifier
+
+# Configuration du logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Dossiers cachés jamais parcourus (historique Git, environnements et caches d'outils)
+SKIPPED_HIDDEN_DIRECTORIES = {
+    '.git', '.hg', '.svn', '.venv', '.tox', '.nox', '.mypy_cache', '.pytest_cache', '.ruff_cache',
+    '.cache', '.gradle', '.m2', '.npm', '.yarn', '.pnpm-store', '.next', '.nuxt', '.terraform'
+}
+
+
+class RepositoryIndex:
+    """Index des fichiers d'un dépôt, construit en un seul parcours os.scandir"""
+
+    def __init__(self, repo_path: str, detect_language: Callable[[str], str]):
+        """
+        Initialise l'index (vide) d'un dépôt
+
+        Args:
+            repo_path: Chemin du dépôt cloné localement
+            detect_language: Fonction de détection du langage à partir du nom de fichier
+        """
+        self.repo_path = repo_path
+        self.detect_language = detect_language
+        # Métadonnées par chemin relatif, dans l'ordre du parcours
+        self.files: Dict[str, Dict[str, Any]] = {}
+        # Fichiers cachés (.env, .npmrc, .aws/credentials...) : hors analyse, lus seulement par le scanner de secrets
+        self.hidden_files: Dict[str, Dict[str, Any]] = {}
+        # Nombre d'entrées visibles (fichiers et dossiers non cachés) par dossier relatif
+        self.directory_entries: Dict[str, int] = {}
+        self._contents: Dict[str, str] = {}
+        self._retained: set = set()
+        self._readers: List[Callable[[str, str], None]] = []
+
+    @classmethod
+    def build(cls, repo_path: str, detect_language: Callable[[str], str],
+              classifier: Optional["PathClassifier"] = None) -> "RepositoryIndex":
+        """
+        Parcourt le dépôt une seule fois et collecte les métadonnées de chaque fichier
+
+        Les dossiers et fichiers cachés sont indexés à part (hidden_files) et
+        ne sont pas analysés ; .git et les caches d'outils ne sont pas
+        parcourus. Avec un classificateur, le code tiers et généré est écarté
+        pendant le parcours (les dossiers exclus ne sont pas parcourus).
+
+        Args:
+            repo_path: Chemin du dépôt cloné localement
+            detect_language: Fonction de détection du langage
+            classifier: Classificateur des chemins à exclure (voir path_classifier)
+
+        Returns:
+            Index du dépôt
+        """
+        index = cls(repo_path, detect_language)
+        # (dossier relatif, dossier caché ou contenu dans un dossier caché)
+        pending = [("", False)]
+        while pending:
+            relative_dir, hidden_dir = pending.pop()
+            absolute_dir = os.path.join(repo_path, relative_dir) if relative_dir else repo_path
+            if classifier is not None:
+                classifier.enter_directory(relative_dir)
+            try:
+                with os.scandir(absolute_dir) as entries:
+                    entries = sorted(entries, key=lambda e: e.name)
+            except OSError as e:
+                logger.warning(f"Erreur lors du parcours de {absolute_dir}: {str(e)}")
+                continue
+
+            visible = 0
+            subdirectories = []
+            for entry in entries:
+                hidden = hidden_dir or entry.name.startswith('.')
+                if not hidden:
+                    visible += 1
+                relative_path = os.path.join(relative_dir, entry.name) if relative_dir else entry.name
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        if entry.name in SKIPPED_HIDDEN_DIRECTORIES:
+                            continue
+                        if classifier is None or classifier.classify(relative_path, True) is None:
+                            subdirectories.append((relative_path, hidden))
+                    elif entry.is_file():
+                        if classifier is None or classifier.classify(relative_path, False) is None:
+                            index._add_file(relative_path, entry.name, entry.stat().st_size, hidden)
+                except OSError as e:
+                    logger.warning(f"Erreur lors de l'accès au fichier {entry.path}: {str(e)}")
+            if not hidden_dir:
+                index.directory_entries[relative_dir] = visible
+            # Parcours en profondeur, dans l'ordre alphabétique
+            pending.extend(reversed(subdirectories))
+
+        logger.info(f"Index du dépôt construit: {len(index.files)} fichiers, "
+                    f"{len(index.hidden_files)} fichier(s) caché(s)")
+        return index
+
+    def _add_file(self, relative_path: str, name: str, size: int, hidden: bool = False):
+        _, ext = os.path.splitext(name)
+        files = self.hidden_files if hidden else self.files
+        files[relative_path] = {
+            "path": relative_path,
+            "name": name,
+            "ext": ext,
+            "size": size,
+            "language": self.detect_language(name),
+            "lines_of_code": None,
+            "sha256": None
+        }
+
+    def get(self, relative_path: str) -> Optional[Dict[str, Any]]:
+        """Métadonnées d'un fichier (None s'il n'est pas indexé)"""
+        return self.files.get(relative_path)
+
+    def retain(self, relative_paths: Iterable[str]):
+        """Conserve en mémoire le contenu de ces fichiers lors de leur première lecture"""
+        self._retained.update(relative_paths)
+
+    def release(self, relative_path: str):
+        """Libère le contenu conservé d'un fichier"""
+        self._retained.discard(relative_path)
+        self._contents.pop(relative_path, None)
+
+    def add_reader(self, reader: Callable[[str, str], None]):
+        """Enregistre une fonction appelée avec (chemin, contenu) à la première lecture de chaque fichier"""
+        self._readers.append(reader)
+
+    def get_content(self, relative_path: str) -> str:
+        """
+        Retourne le contenu texte d'un fichier, lu au plus une fois
+
+        La première lecture calcule aussi l'empreinte SHA-256 et le nombre de
+        lignes de code. Le contenu n'est gardé en mémoire que pour les
+        fichiers retenus (voir retain).
+
+        Args:
+            relative_path: Chemin relatif à la racine du dépôt
+
+        Returns:
+            Contenu du fichier ("" en cas d'erreur)
+        """
+        if relative_path in self._contents:
+            return self._contents[relative_path]
+
+        full_path = os.path.join(self.repo_path, relative_path)
+        try:
+            with open(full_path, 'rb') as f:
+                raw = f.read()
+        except OSError as e:
+            logger.error(f"Erreur lors de la lecture du fichier {full_path}: {str(e)}")
+            return ""
+
+        content = raw.decode('utf-8', errors='ignore')
+        metadata = self.files.get(relative_path) or self.hidden_files.get(relative_path)
+        if metadata is not None:
+            metadata["sha256"] = hashlib.sha256(raw).hexdigest()
+            metadata["lines_of_code"] = count_code_lines(content)
+        if relative_path in self._retained:
+            self._contents[relative_path] = content
+        for reader in self._readers:
+            try:
+                reader(relative_path, content)
+            except Exception as e:
+                logger.warning(f"Erreur lors du traitement du fichier {relative_path}: {str(e)}")
+        return content
+
+
+def count_code_lines(content: str) -> int:
+    """Compte les lignes de code (non vides, non commentaires) d'un contenu"""
+    code_lines = 0
+    for line in content.splitlines():
+        stripped = line.strip()
+        if stripped and not stripped.startswith(('#', '//', '/*', '*', '--', '<!--')):
+            code_lines += 1
+    return code_lines
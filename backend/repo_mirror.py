@@ -0,0 +1,230 @@
+import os
+import re
+import time
+import shutil
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from typing import Dict, Optional, AsyncIterator
+from git import Repo
+
+try:
+    import fcntl
+except ImportError:  # Windows : verrouillage limité au processus courant
+    fcntl = None
+
+from config import REPO_MIRROR_DIR, REPO_MIRROR_MAX_SIZE_MB
+
+# Configuration du logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Référence locale recevant la branche par défaut du dépôt distant
+DEFAULT_REF = "refs/heads/default"
+# Fichier dont la date de modification indique la dernière utilisation du miroir
+LAST_USED_MARKER = "analyzer-last-used"
+
+
+class RepositoryMirrorCache:
+    """Cache disque de miroirs git nus, mis à jour par fetch et partagé entre les analyses"""
+
+    def __init__(self, root_dir: str = REPO_MIRROR_DIR,
+                 max_size_bytes: int = REPO_MIRROR_MAX_SIZE_MB * 1024 * 1024):
+        """
+        Initialise le cache de miroirs
+
+        Args:
+            root_dir: Répertoire contenant les miroirs
+            max_size_bytes: Budget disque total des miroirs (éviction LRU au-delà)
+        """
+        self.root_dir = root_dir
+        self.max_size_bytes = max_size_bytes
+        self._locks: Dict[str, asyncio.Lock] = {}
+        os.makedirs(root_dir, exist_ok=True)
+
+    def _mirror_key(self, repo_name: str) -> str:
+        """Nom de répertoire sûr pour un dépôt "username/repo" """
+        return re.sub(r"[^A-Za-z0-9._-]", "_", repo_name.replace("/", "__")) + ".git"
+
+    def mirror_path(self, repo_name: str) -> str:
+        """Chemin du miroir nu d'un dépôt"""
+        return os.path.join(self.root_dir, self._mirror_key(repo_name))
+
+    def _lock_file_path(self, key: str) -> str:
+        return os.path.join(self.root_dir, f"{key}.lock")
+
+    def _acquire_file_lock(self, key: str, blocking: bool = True) -> Optional[int]:
+        """Verrou inter-processus sur un miroir (None si non obtenu en mode non bloquant)"""
+        fd = os.open(self._lock_file_path(key), os.O_RDWR | os.O_CREAT, 0o644)
+        if fcntl is None:
+            return fd
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return fd
+        except OSError:
+            os.close(fd)
+            return None
+
+    def _release_file_lock(self, fd: int):
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+        os.close(fd)
+
+    @asynccontextmanager
+    async def _repo_lock(self, key: str) -> AsyncIterator[None]:
+        """Verrou par dépôt : un seul fetch/checkout à la fois, dans ce processus et entre processus"""
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            fd = await asyncio.to_thread(self._acquire_file_lock, key)
+            try:
+                yield
+            finally:
+                self._release_file_lock(fd)
+
+    async def checkout(self, repo_name: str, repo_url: str, target_dir: str,
+                       keep_git: bool = False, secret: Optional[str] = None, shallow: bool = True) -> str:
+        """
+        Met à jour le miroir d'un dépôt (clone initial ou fetch) et en extrait une copie de travail
+
+        L'URL distante n'est jamais enregistrée dans le miroir, pour ne pas
+        conserver le token sur disque. Un miroir superficiel ne contient que
+        le dernier commit : le commit de base d'une analyse incrémentale est
+        récupéré à la demande (voir fetch_commit).
+
+        Args:
+            repo_name: Nom du dépôt (format: "username/repo")
+            repo_url: URL de fetch (peut contenir le token d'accès)
+            target_dir: Répertoire de la copie de travail à créer
+            keep_git: Si True, la copie conserve un dossier .git (objets partagés avec le miroir)
+            secret: Valeur à masquer dans les messages d'erreur (token)
+            shallow: Si True, seul le dernier commit est téléchargé (--depth=1) ;
+                     sinon l'historique complet (un miroir superficiel est complété)
+
+        Returns:
+            Chemin de la copie de travail
+        """
+        key = self._mirror_key(repo_name)
+        mirror_path = self.mirror_path(repo_name)
+
+        def update_and_checkout():
+            created = not os.path.isdir(mirror_path)
+            if created:
+                logger.info(f"Création du miroir de {repo_name}")
+                mirror = Repo.init(mirror_path, bare=True)
+            else:
+                logger.info(f"Mise à jour du miroir de {repo_name}")
+                mirror = Repo(mirror_path)
+            try:
+                if shallow:
+                    depth = ["--depth=1"]
+                elif os.path.exists(os.path.join(mirror_path, "shallow")):
+                    depth = ["--unshallow"]
+                else:
+                    depth = []
+                mirror.git.fetch("--prune", "--no-tags", *depth, repo_url, f"+HEAD:{DEFAULT_REF}")
+            except Exception:
+                # Ne pas laisser de miroir vide après un premier fetch en échec
+                if created:
+                    shutil.rmtree(mirror_path, ignore_errors=True)
+                raise
+            mirror.git.symbolic_ref("HEAD", DEFAULT_REF)
+
+            # Copie de travail légère : objets partagés avec un miroir complet, copiés depuis un miroir
+            # superficiel (git ignore --shared pour une source superficielle, limitée au dernier commit)
+            Repo.clone_from(mirror_path, target_dir, shared=True)
+            if not keep_git:
+                shutil.rmtree(os.path.join(target_dir, ".git"), ignore_errors=True)
+
+            with open(os.path.join(mirror_path, LAST_USED_MARKER), "w") as marker:
+                marker.write(str(time.time()))
+
+        try:
+            async with self._repo_lock(key):
+                await asyncio.to_thread(update_and_checkout)
+        except Exception as e:
+            message = str(e).replace(secret, "***") if secret else str(e)
+            raise Exception(f"Erreur lors de la mise à jour du miroir de {repo_name}: {message}") from None
+
+        await self.evict(keep={key})
+        return target_dir
+
+    async def fetch_commit(self, repo_name: str, repo_url: str, commit_sha: str,
+                           secret: Optional[str] = None):
+        """
+        Ajoute un commit absent d'un miroir superficiel (commit de base d'une analyse incrémentale)
+
+        Les copies de travail ont le miroir pour origine : elles récupèrent
+        ensuite le commit par un fetch local.
+
+        Args:
+            repo_name: Nom du dépôt (format: "username/repo")
+            repo_url: URL de fetch (peut contenir le token d'accès)
+            commit_sha: SHA du commit à récupérer
+            secret: Valeur à masquer dans les messages d'erreur (token)
+        """
+        key = self._mirror_key(repo_name)
+        mirror_path = self.mirror_path(repo_name)
+
+        def fetch():
+            Repo(mirror_path).git.fetch("--no-tags", "--depth=1", repo_url, commit_sha)
+
+        try:
+            async with self._repo_lock(key):
+                await asyncio.to_thread(fetch)
+        except Exception as e:
+            message = str(e).replace(secret, "***") if secret else str(e)
+            raise Exception(f"Erreur lors de la récupération du commit {commit_sha[:12]} de {repo_name}: {message}") from None
+
+    def _directory_size(self, path: str) -> int:
+        total = 0
+        for root, _, files in os.walk(path):
+            for file in files:
+                try:
+                    total += os.path.getsize(os.path.join(root, file))
+                except OSError:
+                    continue
+        return total
+
+    async def evict(self, keep: Optional[set] = None) -> int:
+        """
+        Supprime les miroirs les moins récemment utilisés au-delà du budget disque
+
+        Les miroirs verrouillés (en cours de mise à jour) ne sont jamais supprimés.
+
+        Args:
+            keep: Clés de miroirs à conserver quoi qu'il arrive
+
+        Returns:
+            Nombre de miroirs supprimés
+        """
+        keep = keep or set()
+
+        def scan_and_evict() -> int:
+            mirrors = []
+            for entry in os.scandir(self.root_dir):
+                if not entry.is_dir() or not entry.name.endswith(".git"):
+                    continue
+                marker = os.path.join(entry.path, LAST_USED_MARKER)
+                last_used = os.path.getmtime(marker) if os.path.exists(marker) else 0.0
+                mirrors.append((last_used, entry.name, entry.path, self._directory_size(entry.path)))
+
+            total_size = sum(m[3] for m in mirrors)
+            removed = 0
+            for last_used, key, path, size in sorted(mirrors):
+                if total_size <= self.max_size_bytes:
+                    break
+                if key in keep or (key in self._locks and self._locks[key].locked()):
+                    continue
+                fd = self._acquire_file_lock(key, blocking=False)
+                if fd is None:
+                    continue
+                try:
+                    shutil.rmtree(path, ignore_errors=True)
+                finally:
+                    self._release_file_lock(fd)
+                total_size -= size
+                removed += 1
+                logger.info(f"Miroir {key} supprimé du cache (LRU, {size} octets)")
+            return removed
+
+        return await asyncio.to_thread(scan_and_evict)
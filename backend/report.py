@@ -231,7 +231,12 @@ class ReportGenerator:
                 pdf.set_text_color(0, 0, 0)
                 
                 pdf.set_font("Arial", "", 10)
-                pdf.cell(0, 8, f"Fichier: {file_path}", 0, 1, "L")
+                if vuln.get("attribution_incertaine"):
+                    # Vulnérabilité d'une analyse groupée sans fichier identifiable
+                    group = ", ".join(vuln.get("fichiers_groupe") or [file_path])
+                    pdf.multi_cell(0, 6, f"Fichier: attribution incertaine, l'un de : {group}")
+                else:
+                    pdf.cell(0, 8, f"Fichier: {file_path}", 0, 1, "L")
                 pdf.cell(0, 8, f"Lignes: {line_str}", 0, 1, "L")
                 
                 # Description avec multi-cell pour le texte long
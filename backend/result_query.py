@@ -0,0 +1,112 @@
+import json
+import hashlib
+from typing import List, Dict, Any, Optional, Iterable
+
+
+def parse_list_param(value: Optional[str]) -> List[str]:
+    """Découpe un paramètre de requête "a,b,c" en liste (vide si absent)"""
+    if not value:
+        return []
+    return [item.strip() for item in value.split(",") if item.strip()]
+
+
+def select_fields(item: Dict[str, Any], fields: List[str]) -> Dict[str, Any]:
+    """
+    Restreint un dictionnaire aux champs demandés
+
+    Args:
+        item: Élément à filtrer
+        fields: Champs à conserver (tous si vide)
+
+    Returns:
+        Dictionnaire réduit
+    """
+    if not fields:
+        return item
+    return {field: item[field] for field in fields if field in item}
+
+
+def filter_vulnerabilities(vulnerabilities: Iterable[Dict[str, Any]],
+                           severities: List[str],
+                           file_path: Optional[str] = None,
+                           vuln_type: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    Filtre les vulnérabilités par sévérité, fichier et type
+
+    Args:
+        vulnerabilities: Vulnérabilités du résultat d'analyse
+        severities: Sévérités acceptées (toutes si vide)
+        file_path: Chemin exact, ou préfixe de répertoire s'il se termine par "/"
+        vuln_type: Fragment du type de vulnérabilité (insensible à la casse)
+
+    Returns:
+        Vulnérabilités correspondantes
+    """
+    filtered = []
+    for vuln in vulnerabilities:
+        severity = vuln.get("severity") or vuln.get("severite")
+        if severities and severity not in severities:
+            continue
+        path = vuln.get("file_path", "")
+        if file_path and not (path == file_path or (file_path.endswith("/") and path.startswith(file_path))):
+            continue
+        current_type = vuln.get("vulnerability_type") or vuln.get("type_vulnerabilite") or ""
+        if vuln_type and vuln_type.lower() not in current_type.lower():
+            continue
+        filtered.append(vuln)
+    return filtered
+
+
+def paginate(items: List[Any], page: int, page_size: int) -> Dict[str, Any]:
+    """
+    Découpe une liste en page
+
+    Args:
+        items: Liste complète
+        page: Numéro de page (à partir de 1)
+        page_size: Nombre d'éléments par page
+
+    Returns:
+        Dictionnaire {items, page, page_size, total, total_pages}
+    """
+    total = len(items)
+    start = (page - 1) * page_size
+    return {
+        "items": items[start:start + page_size],
+        "page": page,
+        "page_size": page_size,
+        "total": total,
+        "total_pages": (total + page_size - 1) // page_size
+    }
+
+
+def compute_result_etag(result: Dict[str, Any]) -> str:
+    """Empreinte d'un résultat d'analyse terminé (calculée une seule fois par tâche)"""
+    payload = json.dumps(result, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:32]
+
+
+def make_etag(base: str, *parts: Any) -> str:
+    """
+    Construit un ETag faible pour une vue d'un résultat
+
+    Args:
+        base: Empreinte du résultat (voir compute_result_etag)
+        *parts: Paramètres de la vue (pagination, filtres, champs)
+
+    Returns:
+        Valeur d'en-tête ETag
+    """
+    digest = hashlib.sha256(json.dumps([base, *parts], default=str).encode("utf-8")).hexdigest()[:32]
+    return f'W/"{digest}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Vérifie si l'en-tête If-None-Match du client correspond à l'ETag courant"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    bare = etag[2:] if etag.startswith("W/") else etag
+    return any((c[2:] if c.startswith("W/") else c) == bare for c in candidates)
@@ -0,0 +1,119 @@
+import time
+import logging
+from typing import Dict, Any, Optional
+
+# Configuration du logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Raisons d'épuisement du budget
+BUDGET_TIME = "temps"
+BUDGET_TOKENS = "tokens"
+
+
+class ScanBudget:
+    """Budget d'une analyse : fichiers, durée totale, tokens de prompt et latence maximale par fichier"""
+
+    def __init__(self, max_seconds: Optional[float] = None,
+                 max_prompt_tokens: Optional[int] = None,
+                 max_file_seconds: Optional[float] = None,
+                 max_files: Optional[int] = None):
+        """
+        Initialise le budget (le chronomètre démarre immédiatement)
+
+        Args:
+            max_seconds: Durée maximale de l'analyse (secondes)
+            max_prompt_tokens: Nombre maximal de tokens de prompt envoyés aux modèles
+            max_file_seconds: Durée maximale de l'analyse d'un fichier (secondes)
+            max_files: Nombre maximal de fichiers analysés (plafonné par ANALYSIS_MAX_FILES)
+        """
+        self.max_files = max_files
+        self.max_seconds = max_seconds
+        self.max_prompt_tokens = max_prompt_tokens
+        self.max_file_seconds = max_file_seconds
+        self.started_at = time.monotonic()
+        self.prompt_tokens_used = 0
+        self.completion_tokens_used = 0
+        self.exhausted: Optional[str] = None
+        self._reserved_tokens = 0
+
+    @classmethod
+    def from_dict(cls, limits: Optional[Dict[str, Any]]) -> Optional["ScanBudget"]:
+        """Crée un budget à partir des limites de la requête (None si aucune limite)"""
+        limits = {key: value for key, value in (limits or {}).items() if value}
+        if not limits:
+            return None
+        return cls(
+            max_seconds=limits.get("max_seconds"),
+            max_prompt_tokens=limits.get("max_prompt_tokens"),
+            max_file_seconds=limits.get("max_file_seconds"),
+            max_files=limits.get("max_files")
+        )
+
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started_at
+
+    def remaining_seconds(self) -> Optional[float]:
+        """Temps restant (None si la durée n'est pas limitée)"""
+        if self.max_seconds is None:
+            return None
+        return max(0.0, self.max_seconds - self.elapsed())
+
+    def file_timeout(self) -> Optional[float]:
+        """Délai accordé au prochain fichier : latence maximale, sans dépasser le temps restant"""
+        limits = [limit for limit in (self.max_file_seconds, self.remaining_seconds()) if limit is not None]
+        return min(limits) if limits else None
+
+    def check(self) -> Optional[str]:
+        """
+        Vérifie si le budget est épuisé
+
+        Returns:
+            Raison de l'épuisement (BUDGET_TIME, BUDGET_TOKENS) ou None
+        """
+        if self.exhausted is None:
+            if self.max_seconds is not None and self.elapsed() >= self.max_seconds:
+                self.exhausted = BUDGET_TIME
+            elif self.max_prompt_tokens is not None and self.prompt_tokens_used >= self.max_prompt_tokens:
+                self.exhausted = BUDGET_TOKENS
+            if self.exhausted:
+                logger.info(f"Budget d'analyse épuisé ({self.exhausted}) après {self.elapsed():.1f}s")
+        return self.exhausted
+
+    def reserve(self, estimated_tokens: int) -> bool:
+        """
+        Réserve les tokens estimés d'un fichier avant de l'envoyer aux modèles
+
+        Returns:
+            False si le fichier dépasserait le budget de tokens (le budget est alors épuisé :
+            les fichiers suivants, moins prioritaires, ne sont pas lancés non plus)
+        """
+        if self.max_prompt_tokens is not None and \
+                self.prompt_tokens_used + self._reserved_tokens + estimated_tokens > self.max_prompt_tokens:
+            if self.exhausted is None:
+                self.exhausted = BUDGET_TOKENS
+                logger.info(f"Budget de tokens épuisé après {self.elapsed():.1f}s")
+            return False
+        self._reserved_tokens += estimated_tokens
+        return True
+
+    def settle(self, estimated_tokens: int, prompt_tokens: int, completion_tokens: int = 0):
+        """Remplace la réservation d'un fichier par sa consommation réelle"""
+        self._reserved_tokens = max(0, self._reserved_tokens - estimated_tokens)
+        self.prompt_tokens_used += prompt_tokens
+        self.completion_tokens_used += completion_tokens
+
+    def summary(self) -> Dict[str, Any]:
+        """Limites, consommation et raison d'épuisement, pour le résultat de l'analyse"""
+        return {
+            "limits": {
+                "max_files": self.max_files,
+                "max_seconds": self.max_seconds,
+                "max_prompt_tokens": self.max_prompt_tokens,
+                "max_file_seconds": self.max_file_seconds
+            },
+            "exhausted": self.exhausted,
+            "elapsed_seconds": round(self.elapsed(), 2),
+            "prompt_tokens_used": self.prompt_tokens_used,
+            "completion_tokens_used": self.completion_tokens_used
+        }
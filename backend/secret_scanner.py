@@ -0,0 +1,203 @@
+import re
+import math
+import time
+import logging
+from collections import Counter
+from typing import List, Dict, Any, Optional
+
+# Configuration du logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Type de vulnérabilité des résultats du scanner (même libellé que l'item 3 du prompt)
+SECRET_VULNERABILITY_TYPE = "Secrets ou identifiants codés en dur"
+
+# Détecteurs : nom, libellé, sévérité, motif (le groupe "value" désigne la valeur à valider)
+SECRET_DETECTORS = [
+    ("private_key", "Clé privée", "Élevé",
+     r"-----BEGIN (?:RSA |EC |DSA |OPENSSH |PGP |ENCRYPTED )?PRIVATE KEY(?: BLOCK)?-----"),
+    ("aws_access_key", "Clé d'accès AWS", "Élevé",
+     r"\b(?:AKIA|ASIA)[0-9A-Z]{16}\b"),
+    ("aws_secret_key", "Clé secrète AWS", "Élevé",
+     r"(?i:aws[\w.\-]{0,20}(?:secret|private)[\w.\-]{0,20})['\"]?\s*[:=]\s*['\"](?P<value>[0-9A-Za-z/+]{40})['\"]"),
+    ("github_token", "Token GitHub", "Élevé",
+     r"\bgh[pousr]_[A-Za-z0-9]{36,255}\b|\bgithub_pat_[A-Za-z0-9_]{82}\b"),
+    ("slack_token", "Token Slack", "Élevé",
+     r"\bxox[baprs]-[A-Za-z0-9-]{10,72}\b"),
+    ("slack_webhook", "Webhook Slack", "Moyen",
+     r"https://hooks\.slack\.com/services/T[A-Za-z0-9_]+/B[A-Za-z0-9_]+/[A-Za-z0-9_]+"),
+    ("stripe_key", "Clé secrète Stripe", "Élevé",
+     r"\b[sr]k_live_[0-9A-Za-z]{24,99}\b"),
+    ("google_api_key", "Clé d'API Google", "Élevé",
+     r"\bAIza[0-9A-Za-z_\-]{35}\b"),
+    ("jwt", "Jeton JWT", "Moyen",
+     r"\beyJ[A-Za-z0-9_-]{10,}\.eyJ[A-Za-z0-9_-]{10,}\.[A-Za-z0-9_-]{10,}"),
+    ("connection_string", "Chaîne de connexion avec mot de passe", "Élevé",
+     r"\b(?:postgres(?:ql)?|mysql|mariadb|mongodb(?:\+srv)?|redis|amqp)://[^\s:@/'\"]+:(?P<value>[^\s@/'\"]+)@"),
+    ("password_assignment", "Mot de passe ou secret en clair", "Moyen",
+     r"(?i:(?:\b|(?<=_))(?:password|passwd|pwd|secret|secret[_-]?key|api[_-]?key|access[_-]?token|auth[_-]?token|client[_-]?secret))"
+     r"['\"]?\s*[:=]\s*['\"](?P<value>[^'\"\s]{8,})['\"]"),
+    # Affectations sans guillemets des fichiers .env, .properties, .ini (DB_PASSWORD=..., db.password = ...)
+    ("config_assignment", "Mot de passe ou secret en clair (configuration)", "Moyen",
+     r"(?im:^[ \t]*(?:export[ \t]+)?[\w.\-]{0,40}(?:password|passwd|pwd|secret|api[_-]?key|token)"
+     r"[\w.\-]{0,40}[ \t]*[:=][ \t]*(?P<value>[^\s'\"#$(){}\[\],;]{8,})[ \t]*$)"),
+    ("high_entropy_string", "Chaîne à forte entropie (secret probable)", "Faible",
+     r"(?<=['\"])(?P<value>[A-Za-z0-9+/_\-]{32,}={0,2})(?=['\"])"),
+]
+
+# Un seul automate pour tous les détecteurs : chaque fichier est parcouru une seule fois
+_COMBINED_PATTERN = re.compile("|".join(
+    f"(?P<{name}>{pattern.replace('(?P<value>', '(')})" for name, _, _, pattern in SECRET_DETECTORS
+))
+_DETECTOR_PATTERNS = {name: re.compile(pattern) for name, _, _, pattern in SECRET_DETECTORS}
+_DETECTOR_INFO = {name: (label, severity) for name, label, severity, _ in SECRET_DETECTORS}
+
+# Fichiers de verrouillage : empreintes d'intégrité à forte entropie, jamais des secrets
+LOCK_FILES = {
+    'package-lock.json', 'yarn.lock', 'pnpm-lock.yaml', 'poetry.lock', 'pipfile.lock',
+    'composer.lock', 'cargo.lock', 'gemfile.lock', 'go.sum'
+}
+
+# Longueur de l'extrait examiné pour reconnaître un fichier binaire
+BINARY_SAMPLE_CHARS = 8192
+
+# Valeurs d'exemple à ne pas signaler
+PLACEHOLDER_PATTERN = re.compile(
+    r"(?i)^(?:\$\{.*\}|\{\{.*\}\}|<.*>|%\(.*\)s|\*+|x+|\.+)$"
+    r"|change.?me|your[_-]|example|placeholder|dummy|sample|redacted|todo|password|secret|xxxx"
+)
+
+# Seuil d'entropie (bits par caractère) des chaînes aléatoires ; une empreinte hexadécimale plafonne à 4
+ENTROPY_THRESHOLD = 4.5
+
+SECRET_RECOMMENDATION = (
+    "Révoquer ce secret, le retirer de l'historique Git et le charger depuis une variable "
+    "d'environnement ou un gestionnaire de secrets"
+)
+
+
+def shannon_entropy(value: str) -> float:
+    """Entropie de Shannon d'une chaîne (bits par caractère)"""
+    if not value:
+        return 0.0
+    length = len(value)
+    return -sum(count / length * math.log2(count / length) for count in Counter(value).values())
+
+
+def _redact(value: str) -> str:
+    """Masque un secret pour le rapport (seuls les premiers caractères restent visibles)"""
+    return f"{value[:4]}…({len(value)} caractères)"
+
+
+def _is_plausible(name: str, value: str) -> bool:
+    """Écarte les valeurs d'exemple et les chaînes trop régulières"""
+    if name == "password_assignment" or name == "connection_string":
+        return not PLACEHOLDER_PATTERN.search(value)
+    if name == "config_assignment":
+        # Un identifiant ou un attribut sans chiffre (password = user_password) n'est pas une valeur
+        reference = re.match(r"^[A-Za-z_][\w.]*$", value) and not re.search(r"\d", value)
+        return not PLACEHOLDER_PATTERN.search(value) and not reference
+    if name == "high_entropy_string":
+        has_classes = (re.search(r"[a-z]", value) and re.search(r"[A-Z]", value) and re.search(r"\d", value))
+        return bool(has_classes) and shannon_entropy(value) >= ENTROPY_THRESHOLD
+    return True
+
+
+def _expand_lines(line_numbers: Any) -> List[int]:
+    """Convertit des numéros de ligne d'un modèle ([10], ["15-20"]) en liste d'entiers"""
+    lines = []
+    for item in line_numbers if isinstance(line_numbers, list) else [line_numbers]:
+        match = re.match(r"^\s*(\d+)\s*(?:-\s*(\d+))?\s*$", str(item))
+        if match:
+            start = int(match.group(1))
+            end = int(match.group(2) or start)
+            lines.extend(range(start, min(end, start + 1000) + 1))
+    return lines
+
+
+class SecretScanner:
+    """Recherche de secrets par expressions régulières, alimentée par les lectures de l'index du dépôt (fichiers cachés compris)"""
+
+    def __init__(self):
+        self.findings: List[Dict[str, Any]] = []
+        self.files_scanned = 0
+        self.bytes_scanned = 0
+        self.duration = 0.0
+
+    def scan(self, relative_path: str, content: str, language: Optional[str] = None):
+        """
+        Recherche les secrets d'un fichier (appelée une fois par fichier lu)
+
+        Args:
+            relative_path: Chemin relatif à la racine du dépôt
+            content: Contenu du fichier
+            language: Langage détecté
+        """
+        name = relative_path.replace("\\", "/").rsplit("/", 1)[-1].lower()
+        # Fichiers binaires (images, archives...) : octets nuls dans les premiers caractères
+        if name in LOCK_FILES or not content or "\x00" in content[:BINARY_SAMPLE_CHARS]:
+            return
+
+        started = time.perf_counter()
+        line = 1
+        position = 0
+        lines_in_file = content.count("\n") + 1
+        for match in _COMBINED_PATTERN.finditer(content):
+            detector = match.lastgroup
+            text = match.group(detector)
+            validated = _DETECTOR_PATTERNS[detector].search(text)
+            value = (validated.groupdict().get("value") or text) if validated else text
+            if not _is_plausible(detector, value):
+                continue
+            line += content.count("\n", position, match.start())
+            position = match.start()
+            label, severity = _DETECTOR_INFO[detector]
+            self.findings.append({
+                "type_vulnerabilite": SECRET_VULNERABILITY_TYPE,
+                "description": f"{label} détecté(e) dans le code : {_redact(value)}",
+                "severite": severity,
+                "numeros_ligne": [line],
+                "recommandation": SECRET_RECOMMENDATION,
+                "detector": detector,
+                "file_path": relative_path,
+                "language": language or "Inconnu",
+                "file_size": len(content),
+                "lines_in_file": lines_in_file
+            })
+        self.files_scanned += 1
+        self.bytes_scanned += len(content)
+        self.duration += time.perf_counter() - started
+
+    def vulnerabilities(self, llm_vulnerabilities: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Résultats du scanner non déjà signalés par les modèles
+
+        Un secret est considéré comme déjà signalé si un modèle a relevé un
+        secret ou identifiant sur la même ligne du même fichier.
+
+        Args:
+            llm_vulnerabilities: Vulnérabilités trouvées par les modèles
+
+        Returns:
+            Vulnérabilités du scanner, au format des vulnérabilités des modèles
+        """
+        reported = set()
+        for vuln in llm_vulnerabilities:
+            vuln_type = str(vuln.get("type_vulnerabilite") or vuln.get("vulnerability_type") or "")
+            if re.search(r"(?i)secret|identifiant|credential|mot de passe|password|token|clé|key", vuln_type):
+                for line in _expand_lines(vuln.get("numeros_ligne") or vuln.get("line_numbers") or []):
+                    reported.add((vuln.get("file_path"), line))
+        return [f for f in self.findings if (f["file_path"], f["numeros_ligne"][0]) not in reported]
+
+    def summary(self, reported: Optional[int] = None) -> Dict[str, Any]:
+        """Statistiques du scanner pour le résultat de l'analyse"""
+        by_detector = Counter(f["detector"] for f in self.findings)
+        return {
+            "enabled": True,
+            "files_scanned": self.files_scanned,
+            "bytes_scanned": self.bytes_scanned,
+            "findings": len(self.findings),
+            "reported": len(self.findings) if reported is None else reported,
+            "by_detector": dict(by_detector.most_common()),
+            "duration_ms": round(self.duration * 1000, 1)
+        }
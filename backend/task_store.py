@@ -0,0 +1,240 @@
+import os
+import json
+import time
+import zlib
+import sqlite3
+import logging
+import threading
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional
+
+from config import TASK_STORE_PATH, TASK_TTL_HOURS
+
+# Configuration du logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Statuts après lesquels une tâche n'évolue plus
+FINAL_STATUSES = ("terminé", "erreur", "annulé")
+
+
+class TaskStore:
+    """Interface d'un stockage des tâches d'analyse et de leurs résultats"""
+
+    def create(self, task_id: str, repo_name: str, models: List[str], counters: Dict[str, int]):
+        """Enregistre une nouvelle tâche (statut "initialisé") ; un identifiant déjà utilisé est refusé"""
+        raise NotImplementedError
+
+    def update(self, task_id: str, **fields):
+        """Met à jour des champs d'état (status, progress, counters, error)"""
+        raise NotImplementedError
+
+    def get_status(self, task_id: str) -> Optional[Dict[str, Any]]:
+        """État d'une tâche sans son résultat (None si inconnue)"""
+        raise NotImplementedError
+
+    def set_result(self, task_id: str, result: Dict[str, Any], result_etag: str):
+        """Enregistre le résultat complet d'une tâche"""
+        raise NotImplementedError
+
+    def get_result(self, task_id: str) -> Optional[Dict[str, Any]]:
+        """Résultat complet d'une tâche (None si absent)"""
+        raise NotImplementedError
+
+    def request_cancel(self, task_id: str) -> bool:
+        """Demande l'annulation d'une tâche (False si inconnue ou déjà terminée)"""
+        raise NotImplementedError
+
+    def is_cancel_requested(self, task_id: str) -> bool:
+        """Indique si l'annulation d'une tâche a été demandée"""
+        raise NotImplementedError
+
+    def evict_expired(self) -> List[str]:
+        """Supprime les tâches expirées et retourne leurs identifiants"""
+        raise NotImplementedError
+
+    def close(self):
+        """Libère les ressources du stockage"""
+
+
+class SQLiteTaskStore(TaskStore):
+    """Stockage SQLite des tâches, partagé entre les workers, avec résultats compressés"""
+
+    def __init__(self, db_path: str = TASK_STORE_PATH,
+                 ttl_seconds: int = TASK_TTL_HOURS * 3600,
+                 result_cache_size: int = 4):
+        """
+        Initialise le stockage des tâches
+
+        Args:
+            db_path: Chemin du fichier SQLite
+            ttl_seconds: Durée de conservation d'une tâche après sa dernière mise à jour
+            result_cache_size: Nombre de résultats désérialisés gardés en mémoire
+        """
+        self.db_path = db_path
+        self.ttl_seconds = ttl_seconds
+        self.result_cache_size = max(0, result_cache_size)
+        self._result_cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        self._conn.execute("PRAGMA foreign_keys=ON")
+        # L'état (lu à chaque interrogation) et le résultat (volumineux) sont dans deux tables
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS tasks (
+                task_id TEXT PRIMARY KEY,
+                repo_name TEXT NOT NULL,
+                models TEXT NOT NULL,
+                status TEXT NOT NULL,
+                progress REAL NOT NULL,
+                counters TEXT NOT NULL,
+                error TEXT,
+                result_etag TEXT,
+                cancel_requested INTEGER NOT NULL DEFAULT 0,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            )
+        """)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS task_results (
+                task_id TEXT PRIMARY KEY REFERENCES tasks(task_id) ON DELETE CASCADE,
+                result BLOB NOT NULL
+            )
+        """)
+        columns = [row[1] for row in self._conn.execute("PRAGMA table_info(tasks)")]
+        if "cancel_requested" not in columns:
+            self._conn.execute("ALTER TABLE tasks ADD COLUMN cancel_requested INTEGER NOT NULL DEFAULT 0")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_tasks_updated ON tasks(updated_at)")
+        self._conn.commit()
+        self.evict_expired()
+
+    def create(self, task_id: str, repo_name: str, models: List[str], counters: Dict[str, int]):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO tasks (task_id, repo_name, models, status, progress, counters, "
+                "error, result_etag, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, NULL, NULL, ?, ?)",
+                (task_id, repo_name, json.dumps(models), "initialisé", 0.0, json.dumps(counters), now, now)
+            )
+            self._conn.commit()
+
+    def update(self, task_id: str, **fields):
+        columns = []
+        values = []
+        for name in ("status", "progress", "error"):
+            if name in fields:
+                columns.append(f"{name} = ?")
+                values.append(fields[name])
+        if "counters" in fields:
+            columns.append("counters = ?")
+            values.append(json.dumps(fields["counters"]))
+        if not columns:
+            return
+        columns.append("updated_at = ?")
+        values.extend([time.time(), task_id])
+        with self._lock:
+            self._conn.execute(f"UPDATE tasks SET {', '.join(columns)} WHERE task_id = ?", values)
+            self._conn.commit()
+
+    def get_status(self, task_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT t.repo_name, t.models, t.status, t.progress, t.counters, t.error, t.result_etag, "
+                "t.created_at, t.updated_at, r.task_id IS NOT NULL "
+                "FROM tasks t LEFT JOIN task_results r ON r.task_id = t.task_id WHERE t.task_id = ?",
+                (task_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        return {
+            "task_id": task_id,
+            "repo_name": row[0],
+            "models": json.loads(row[1]),
+            "status": row[2],
+            "progress": row[3],
+            "counters": json.loads(row[4]),
+            "error": row[5],
+            "result_etag": row[6],
+            "created_at": row[7],
+            "updated_at": row[8],
+            "result_available": bool(row[9])
+        }
+
+    def set_result(self, task_id: str, result: Dict[str, Any], result_etag: str):
+        blob = zlib.compress(json.dumps(result, ensure_ascii=False, default=str).encode("utf-8"))
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO task_results (task_id, result) VALUES (?, ?)", (task_id, blob)
+            )
+            self._conn.execute(
+                "UPDATE tasks SET result_etag = ?, updated_at = ? WHERE task_id = ?",
+                (result_etag, time.time(), task_id)
+            )
+            self._conn.commit()
+            self._result_cache.pop(task_id, None)
+        logger.info(f"Résultat de la tâche {task_id} enregistré ({len(blob)} octets compressés)")
+
+    def get_result(self, task_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            if task_id in self._result_cache:
+                self._result_cache.move_to_end(task_id)
+                return self._result_cache[task_id]
+            row = self._conn.execute(
+                "SELECT result FROM task_results WHERE task_id = ?", (task_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        try:
+            result = json.loads(zlib.decompress(row[0]).decode("utf-8"))
+        except (zlib.error, json.JSONDecodeError) as e:
+            logger.warning(f"Résultat illisible pour la tâche {task_id}: {str(e)}")
+            return None
+
+        # Les vues paginées relisent souvent le même résultat : garder les derniers en mémoire
+        if self.result_cache_size:
+            with self._lock:
+                self._result_cache[task_id] = result
+                while len(self._result_cache) > self.result_cache_size:
+                    self._result_cache.popitem(last=False)
+        return result
+
+    def request_cancel(self, task_id: str) -> bool:
+        placeholders = ", ".join("?" for _ in FINAL_STATUSES)
+        with self._lock:
+            cursor = self._conn.execute(
+                f"UPDATE tasks SET cancel_requested = 1, updated_at = ? "
+                f"WHERE task_id = ? AND status NOT IN ({placeholders})",
+                (time.time(), task_id, *FINAL_STATUSES)
+            )
+            self._conn.commit()
+        return cursor.rowcount > 0
+
+    def is_cancel_requested(self, task_id: str) -> bool:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT cancel_requested FROM tasks WHERE task_id = ?", (task_id,)
+            ).fetchone()
+        return bool(row and row[0])
+
+    def evict_expired(self) -> List[str]:
+        cutoff = time.time() - self.ttl_seconds
+        with self._lock:
+            expired = [row[0] for row in self._conn.execute(
+                "SELECT task_id FROM tasks WHERE updated_at < ?", (cutoff,)
+            )]
+            if expired:
+                self._conn.executemany("DELETE FROM tasks WHERE task_id = ?", [(t,) for t in expired])
+                self._conn.commit()
+                for task_id in expired:
+                    self._result_cache.pop(task_id, None)
+        if expired:
+            logger.info(f"{len(expired)} tâche(s) expirée(s) supprimée(s)")
+        return expired
+
+    def close(self):
+        """Ferme la connexion SQLite"""
+        with self._lock:
+            self._conn.close()
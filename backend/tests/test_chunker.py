@@ -0,0 +1,61 @@
+from chunker import split_code_into_chunks, remap_line_numbers
+
+
+def _covered_lines(chunks):
+    covered = set()
+    for chunk in chunks:
+        covered.update(range(chunk["start_line"], chunk["end_line"] + 1))
+    return covered
+
+
+def test_small_code_is_a_single_chunk():
+    chunks = split_code_into_chunks("a = 1\nb = 2\n", 1000)
+    assert len(chunks) == 1
+    assert chunks[0]["start_line"] == 1
+    assert chunks[0]["end_line"] == 2
+    assert chunks[0]["content"] == "a = 1\nb = 2\n"
+
+
+def test_empty_code_has_no_chunk():
+    assert split_code_into_chunks("", 1000) == []
+
+
+def test_chunks_cover_every_line_within_size_limit():
+    code = "".join(f"line_{i} = {i}\n" for i in range(500))
+    chunks = split_code_into_chunks(code, 400)
+    assert _covered_lines(chunks) == set(range(1, 501))
+    assert all(len(chunk["content"]) <= 400 for chunk in chunks)
+    assert [chunk["index"] for chunk in chunks] == list(range(len(chunks)))
+
+
+def test_cut_prefers_definitions():
+    body = "".join(f"    x{i} = {i}\n" for i in range(20))
+    code = "def first():\n" + body + "def second():\n" + body
+    chunks = split_code_into_chunks(code, 400, overlap_lines=0)
+    assert chunks[1]["content"].startswith("def second():")
+
+
+def test_long_lines_overlap_scales_with_chunk_size():
+    # 200 lignes de 2 Ko : 7 lignes par morceau, le recouvrement de 10 lignes ne doit pas
+    # réduire l'avancée à une ligne par morceau
+    code = ("x" * 2000 + "\n") * 200
+    chunks = split_code_into_chunks(code, 16000)
+    assert len(chunks) <= 50
+    assert _covered_lines(chunks) == set(range(1, 201))
+    for previous, chunk in zip(chunks, chunks[1:]):
+        length = previous["end_line"] - previous["start_line"] + 1
+        assert chunk["start_line"] - previous["start_line"] >= length // 2
+
+
+def test_single_oversized_line_still_progresses():
+    code = "y" * 5000 + "\n" + "z" * 5000 + "\n"
+    chunks = split_code_into_chunks(code, 100)
+    assert [(c["start_line"], c["end_line"]) for c in chunks] == [(1, 1), (2, 2)]
+
+
+def test_remap_line_numbers():
+    assert remap_line_numbers(5, 10) == 15
+    assert remap_line_numbers("3-4", 10) == "13-14"
+    assert remap_line_numbers([1, "2"], 10) == [11, "12"]
+    assert remap_line_numbers("ligne 3", 10) == "ligne 3"
+    assert remap_line_numbers(True, 10) is True
@@ -0,0 +1,97 @@
+import asyncio
+import json
+import os
+
+from aiohttp import web
+
+from analyzer import RepositoryAnalyzer, is_reusable_result
+from ollama import OllamaManager
+
+
+def test_is_reusable_result():
+    assert is_reusable_result({"file_path": "a.py", "status": "analysé", "model_scores": {"m": 0.2},
+                               "vulnerabilities": []})
+    assert is_reusable_result({"file_path": "a.py", "status": "pré-filtré"})
+    assert not is_reusable_result({"file_path": "a.py", "status": "erreur"})
+    assert not is_reusable_result({"file_path": "a.py", "status": "ignoré", "budget_skipped": True})
+    assert not is_reusable_result({"status": "analysé"})
+    # Résultat antérieur à l'état "erreur" : aucun modèle n'a répondu
+    assert not is_reusable_result({"file_path": "a.py", "status": "analysé", "model_scores": {"m": 0.0},
+                                   "vulnerabilities": []})
+
+
+def _write_repo(path, marker):
+    for name in ("a.py", "b.py", "c.py"):
+        with open(os.path.join(path, name), "w") as f:
+            f.write(f"import os\n\ndef run(x):\n    os.system('ls ' + x)  # {name} {marker}\n")
+
+
+def _analyze(repo, **kwargs):
+    """Analyse le dépôt avec un Ollama simulé ; retourne le résultat et les fichiers envoyés au modèle"""
+    analyzed = []
+
+    async def chat(request):
+        payload = await request.json()
+        text = "".join(message["content"] for message in payload.get("messages", []))
+        if not text:
+            return web.json_response({"done": True})
+        names = [name for name in ("a.py", "b.py", "c.py") if f"# {name} " in text]
+        analyzed.extend(names)
+        # Une vulnérabilité par fichier envoyé (seul ou groupé avec d'autres petits fichiers)
+        body = {"vulnerabilities": [{"fichier": name, "type_vulnerabilite": "Injection de commandes",
+                                     "severite": "Élevé", "description": "os.system", "numeros_ligne": [4],
+                                     "recommandation": "r"} for name in names]}
+        response = web.StreamResponse()
+        await response.prepare(request)
+        await response.write((json.dumps({"message": {"role": "assistant", "content": json.dumps(body)},
+                                          "done": True, "prompt_eval_count": 10, "eval_count": 5}) + "\n").encode())
+        return response
+
+    async def show(request):
+        return web.json_response({})
+
+    async def tags(request):
+        return web.json_response({"models": [{"name": "m", "digest": "d"}]})
+
+    async def ps(request):
+        return web.json_response({"models": []})
+
+    async def scenario():
+        app = web.Application()
+        app.router.add_post("/api/chat", chat)
+        app.router.add_post("/api/generate", chat)
+        app.router.add_post("/api/show", show)
+        app.router.add_get("/api/tags", tags)
+        app.router.add_get("/api/ps", ps)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        try:
+            manager = OllamaManager(base_url=f"http://127.0.0.1:{runner.addresses[0][1]}")
+            return await RepositoryAnalyzer(repo, manager).analyze_repository(["m"], **kwargs)
+        finally:
+            await runner.cleanup()
+
+    result = asyncio.run(scenario())
+    return result, sorted(set(analyzed))
+
+
+def test_incremental_analysis_reuses_unchanged_files(tmp_path):
+    repo = str(tmp_path)
+    _write_repo(repo, "v1")
+    first, analyzed = _analyze(repo)
+    assert analyzed == ["a.py", "b.py", "c.py"]
+    previous = first["file_results"]
+    assert all(r["status"] == "analysé" for r in previous)
+
+    # c.py était en erreur : il est réanalysé même s'il n'a pas changé
+    previous = [dict(r, status="erreur") if r["file_path"] == "c.py" else r for r in previous]
+    with open(os.path.join(repo, "a.py"), "a") as f:
+        f.write("# modifié\n")
+    second, analyzed = _analyze(repo, previous_results=previous, changed_files=["a.py"])
+    assert analyzed == ["a.py", "c.py"]
+    by_path = {r["file_path"]: r for r in second["file_results"]}
+    assert by_path["b.py"].get("reused") is True
+    assert not by_path["a.py"].get("reused") and not by_path["c.py"].get("reused")
+    assert {v["file_path"] for v in second["vulnerabilities"]} == {"a.py", "b.py", "c.py"}
@@ -0,0 +1,72 @@
+import json
+import os
+import time
+
+import pytest
+
+from json_stream import JSONObjectStream, extract_json, parse_tolerant
+
+CORPUS_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                           "benchmark_corpus", "model_responses.json")
+
+# Nombre de vulnérabilités attendu pour chaque réponse du corpus du benchmark (None : pas de JSON)
+EXPECTED_COUNTS = {
+    "json_strict": 2, "json_empty": 0, "fenced": 2, "prose_around": 1, "chatty": 2,
+    "trailing_commas": 2, "truncated_string": 2, "truncated_line_numbers": 1, "unquoted_line_ranges": 2,
+    "python_literals": 1, "comments": 1, "raw_newlines": 1, "braces_in_strings": 1, "bare_list": 1,
+    "echoed_format": 1, "free_text": None, "code_echo_unbalanced": 2
+}
+
+with open(CORPUS_PATH, encoding="utf-8") as corpus_file:
+    CORPUS = json.load(corpus_file)
+
+
+@pytest.mark.parametrize("case", CORPUS, ids=[case["name"] for case in CORPUS])
+def test_extract_json_corpus(case):
+    parsed = extract_json(case["response"])
+    expected = EXPECTED_COUNTS[case["name"]]
+    if expected is None:
+        assert parsed is None
+    else:
+        assert len(parsed["vulnerabilities"]) == expected
+
+
+def test_extract_json_tolerates_model_defects():
+    text = """Voici le résultat :
+    ```json
+    {vulnerabilities: [{'type_vulnerabilite': 'XSS', 'numeros_ligne': [3, 15-20,], 'critique': True,},]}
+    ```"""
+    parsed = extract_json(text)
+    assert parsed == {"vulnerabilities": [{"type_vulnerabilite": "XSS", "numeros_ligne": [3, "15-20"],
+                                           "critique": True}]}
+
+
+def test_extract_json_closes_truncated_response():
+    parsed = extract_json('{"vulnerabilities": [{"type_vulnerabilite": "Injection SQL", "description": "conca')
+    assert parsed["vulnerabilities"][0]["description"] == "conca"
+
+
+def test_negative_number_is_not_a_line_range():
+    assert parse_tolerant('[-5, 3]')[0] == [-5, 3]
+
+
+def test_extract_json_is_linear_on_unbalanced_input():
+    # Accolades ouvertes sans fin : chaque point de départ ne doit pas relancer un parsing complet
+    text = "{ " * 20000 + "[" * 20000
+    started = time.perf_counter()
+    extract_json(text)
+    assert time.perf_counter() - started < 5
+
+
+def test_object_stream_detects_complete_object_across_fragments():
+    stream = JSONObjectStream()
+    fragments = ['Analyse : {"vulner', 'abilities": [{"description": "accolade } dans', ' une chaîne"}]}', " fin"]
+    results = [stream.feed(fragment) for fragment in fragments]
+    assert results[:2] == [None, None]
+    assert json.loads(results[2]) == {"vulnerabilities": [{"description": "accolade } dans une chaîne"}]}
+    assert stream.trailing_text == " fin"
+
+
+def test_object_stream_ignores_objects_without_required_key():
+    stream = JSONObjectStream()
+    assert stream.feed('{"exemple": 1} puis {"vulnerabilities": []}') == '{"vulnerabilities": []}'
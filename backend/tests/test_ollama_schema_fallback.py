@@ -0,0 +1,74 @@
+import json
+import asyncio
+
+from aiohttp import web
+
+from llm_cache import LLMResultCache
+from ollama import OllamaManager
+
+RESPONSE = json.dumps({"vulnerabilities": []})
+
+
+def _run(rejection: str, tmp_path):
+    """Analyse un code avec un Ollama simulé qui renvoie une erreur 400 sur le premier appel avec schéma"""
+    requests = []
+
+    async def chat(request):
+        payload = await request.json()
+        requests.append(payload)
+        if "format" in payload and len(requests) == 1:
+            return web.json_response({"error": rejection}, status=400)
+        body = {"message": {"role": "assistant", "content": RESPONSE}, "done": True,
+                "prompt_eval_count": 10, "eval_count": 5}
+        response = web.StreamResponse()
+        await response.prepare(request)
+        await response.write((json.dumps(body) + "\n").encode())
+        return response
+
+    async def show(request):
+        return web.json_response({"model_info": {}})
+
+    async def tags(request):
+        return web.json_response({"models": [{"name": "m", "digest": "d1"}]})
+
+    async def scenario():
+        app = web.Application()
+        app.router.add_post("/api/chat", chat)
+        app.router.add_post("/api/generate", chat)
+        app.router.add_post("/api/show", show)
+        app.router.add_get("/api/tags", tags)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        try:
+            cache = LLMResultCache(db_path=str(tmp_path / "cache.db"))
+            manager = OllamaManager(base_url=f"http://127.0.0.1:{port}", cache=cache)
+            result = await manager._analyze_code_cached("m", "x = 1\n", "Analyse")
+            options = await manager.get_generation_options("m")
+            key = await manager._cache_key("m", "Analyse", "x = 1\n", options)
+            return manager, result, await cache.aget(key)
+        finally:
+            await runner.cleanup()
+
+    manager, result, cached = asyncio.run(scenario())
+    return manager, result, cached, requests
+
+
+def test_schema_rejection_falls_back_and_caches_under_plain_key(tmp_path):
+    manager, result, cached, requests = _run('invalid format: expected "json" or a JSON schema', tmp_path)
+    assert "error" not in result
+    assert "schema_fallback" not in result
+    assert len(requests) == 2 and "format" not in requests[1]
+    assert not manager._uses_schema("m")
+    # La clé courante (sans sortie structurée) retrouve la réponse obtenue sans schéma
+    assert cached is not None
+
+
+def test_other_bad_request_keeps_structured_output(tmp_path):
+    manager, result, cached, requests = _run("model requires more system memory", tmp_path)
+    assert "error" in result
+    assert len(requests) == 1
+    assert manager._uses_schema("m")
+    assert cached is None
@@ -0,0 +1,60 @@
+from prompt_packer import plan_packs, build_packed_code, split_packed_result
+
+
+def _sections():
+    _, sections = build_packed_code([
+        {"file_path": "app/views.py", "content": "a = 1\nb = 2\nc = 3\n"},
+        {"file_path": "app/models.py", "content": "x = 1\ny = 2"},
+    ])
+    return sections
+
+
+def test_plan_packs_groups_by_language_within_limits():
+    candidates = [
+        {"path": "a.py", "language": "Python", "size": 100},
+        {"path": "b.js", "language": "JavaScript", "size": 100},
+        {"path": "c.py", "language": "Python", "size": 100},
+        {"path": "d.py", "language": "Python", "size": 100},
+    ]
+    assert plan_packs(candidates, max_chars=10000, max_files=2) == [["a.py", "c.py"], ["b.js"], ["d.py"]]
+
+
+def test_build_packed_code_sections():
+    code, sections = build_packed_code([
+        {"file_path": "app/views.py", "content": "a = 1\nb = 2\nc = 3\n"},
+        {"file_path": "app/models.py", "content": "x = 1\ny = 2"},
+    ])
+    lines = code.splitlines()
+    for section in sections:
+        assert lines[section["start_line"] - 2].startswith(f"===== FICHIER {section['index']} : {section['file_path']}")
+    assert lines[sections[0]["start_line"] - 1] == "a = 1"
+    assert lines[sections[1]["end_line"] - 1] == "y = 2"
+    assert [s["line_count"] for s in sections] == [3, 2]
+
+
+def test_split_by_file_reference_and_packed_lines():
+    sections = _sections()
+    by_file, unattributed = split_packed_result([
+        {"type_vulnerabilite": "Injection SQL", "fichier": "app/views.py", "numeros_ligne": [2]},
+        # Chemin raccourci et numéro de ligne du code groupé
+        {"type_vulnerabilite": "XSS", "fichier": "models.py", "numeros_ligne": [sections[1]["start_line"] + 1]},
+        # Sans fichier : section déduite des numéros de ligne du code groupé
+        {"type_vulnerabilite": "XSS", "numeros_ligne": [f"{sections[0]['start_line']}-{sections[0]['end_line']}"]},
+    ], sections)
+    assert unattributed == 0
+    assert [v["numeros_ligne"] for v in by_file["app/views.py"]] == [[2], ["1-3"]]
+    assert by_file["app/models.py"][0]["numeros_ligne"] == [2]
+    assert all("fichier" not in v for vulns in by_file.values() for v in vulns)
+
+
+def test_unattributed_vulnerability_is_kept_with_uncertain_attribution():
+    sections = _sections()
+    by_file, unattributed = split_packed_result([
+        {"type_vulnerabilite": "Injection de commandes", "fichier": "inconnu.py", "numeros_ligne": [999]},
+    ], sections)
+    assert unattributed == 1
+    assert by_file["app/models.py"] == []
+    vuln, = by_file["app/views.py"]
+    assert vuln["attribution_incertaine"] is True
+    assert vuln["fichiers_groupe"] == ["app/views.py", "app/models.py"]
+    assert vuln["numeros_ligne"] == [999]
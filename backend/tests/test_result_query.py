@@ -0,0 +1,56 @@
+from result_query import (
+    parse_list_param, select_fields, filter_vulnerabilities, paginate, compute_result_etag, make_etag, etag_matches
+)
+
+VULNERABILITIES = [
+    {"file_path": "app/views.py", "severite": "Élevé", "type_vulnerabilite": "Injection SQL"},
+    {"file_path": "app/models.py", "severity": "Moyen", "vulnerability_type": "XSS stocké"},
+    {"file_path": "scripts/run.sh", "severite": "Faible", "type_vulnerabilite": "Injection de commandes"},
+]
+
+
+def test_parse_list_param():
+    assert parse_list_param(None) == []
+    assert parse_list_param(" Élevé, Moyen,,") == ["Élevé", "Moyen"]
+
+
+def test_select_fields():
+    item = {"a": 1, "b": 2}
+    assert select_fields(item, []) is item
+    assert select_fields(item, ["b", "c"]) == {"b": 2}
+
+
+def test_filter_by_severity_both_field_names():
+    filtered = filter_vulnerabilities(VULNERABILITIES, ["Élevé", "Moyen"])
+    assert [v["file_path"] for v in filtered] == ["app/views.py", "app/models.py"]
+
+
+def test_filter_by_file_and_directory_prefix():
+    assert len(filter_vulnerabilities(VULNERABILITIES, [], file_path="app/views.py")) == 1
+    assert len(filter_vulnerabilities(VULNERABILITIES, [], file_path="app/")) == 2
+    # Sans "/" final, le chemin doit être exact
+    assert filter_vulnerabilities(VULNERABILITIES, [], file_path="app") == []
+
+
+def test_filter_by_type_fragment():
+    filtered = filter_vulnerabilities(VULNERABILITIES, [], vuln_type="injection")
+    assert [v["file_path"] for v in filtered] == ["app/views.py", "scripts/run.sh"]
+
+
+def test_paginate():
+    page = paginate(list(range(25)), page=3, page_size=10)
+    assert page == {"items": list(range(20, 25)), "page": 3, "page_size": 10, "total": 25, "total_pages": 3}
+    assert paginate([], 1, 10)["total_pages"] == 0
+
+
+def test_etags():
+    base = compute_result_etag({"b": 1, "a": [1, 2]})
+    assert base == compute_result_etag({"a": [1, 2], "b": 1})
+    etag = make_etag(base, 1, 50)
+    assert etag.startswith('W/"')
+    assert etag != make_etag(base, 2, 50)
+    assert etag_matches(etag, etag)
+    assert etag_matches(f'"autre", {etag[2:]}', etag)
+    assert etag_matches("*", etag)
+    assert not etag_matches(None, etag)
+    assert not etag_matches('W/"autre"', etag)
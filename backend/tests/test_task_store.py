@@ -0,0 +1,66 @@
+import sqlite3
+
+import pytest
+
+from task_store import SQLiteTaskStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = SQLiteTaskStore(db_path=str(tmp_path / "tasks.sqlite3"))
+    yield store
+    store.close()
+
+
+def test_create_and_update(store):
+    store.create("task_1", "user/repo", ["m1"], {"files": 0})
+    store.update("task_1", status="en cours", progress=0.5, counters={"files": 3})
+    status = store.get_status("task_1")
+    assert status["repo_name"] == "user/repo"
+    assert status["models"] == ["m1"]
+    assert status["status"] == "en cours"
+    assert status["progress"] == 0.5
+    assert status["counters"] == {"files": 3}
+    assert status["result_available"] is False
+    assert store.get_status("inconnue") is None
+
+
+def test_duplicate_task_id_is_rejected(store):
+    store.create("task_1", "user/repo", ["m1"], {})
+    store.set_result("task_1", {"vulnerabilities": [1]}, "etag")
+    with pytest.raises(sqlite3.IntegrityError):
+        store.create("task_1", "user/other", ["m2"], {})
+    # La tâche existante et son résultat sont intacts
+    assert store.get_status("task_1")["repo_name"] == "user/repo"
+    assert store.get_result("task_1") == {"vulnerabilities": [1]}
+
+
+def test_result_round_trip(store):
+    store.create("task_1", "user/repo", ["m1"], {})
+    store.set_result("task_1", {"summary": {"total": 2}, "vulnerabilities": []}, "etag-1")
+    assert store.get_status("task_1")["result_available"] is True
+    assert store.get_status("task_1")["result_etag"] == "etag-1"
+    assert store.get_result("task_1") == {"summary": {"total": 2}, "vulnerabilities": []}
+    assert store.get_result("task_2") is None
+
+
+def test_cancel_only_running_tasks(store):
+    store.create("task_1", "user/repo", ["m1"], {})
+    assert store.request_cancel("task_1") is True
+    assert store.is_cancel_requested("task_1") is True
+    store.create("task_2", "user/repo", ["m1"], {})
+    store.update("task_2", status="terminé")
+    assert store.request_cancel("task_2") is False
+    assert store.is_cancel_requested("task_2") is False
+
+
+def test_evict_expired(tmp_path):
+    store = SQLiteTaskStore(db_path=str(tmp_path / "tasks.sqlite3"), ttl_seconds=-1)
+    try:
+        store.create("task_1", "user/repo", ["m1"], {})
+        store.set_result("task_1", {"vulnerabilities": []}, "etag")
+        assert store.evict_expired() == ["task_1"]
+        assert store.get_status("task_1") is None
+        assert store.get_result("task_1") is None
+    finally:
+        store.close()
@@ -0,0 +1,314 @@
+import queue
+import signal
+import asyncio
+import hashlib
+import logging
+import multiprocessing
+from collections import OrderedDict, deque
+from typing import List, Dict, Any, Optional, Callable, Awaitable
+
+from events import TaskEventBroker
+from task_store import TaskStore
+from metrics import REGISTRY, ANALYSIS_QUEUE_DEPTH, merge_snapshots
+
+# Configuration du logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Intervalle de vérification des demandes d'annulation (secondes)
+CANCEL_POLL_SECONDS = 0.5
+# Délai accordé aux workers pour terminer leur analyse à l'arrêt (secondes)
+SHUTDOWN_TIMEOUT_SECONDS = 10
+# Intervalle d'envoi des métriques des workers au processus API (secondes)
+METRICS_PUSH_SECONDS = 2.0
+
+
+def user_key(token: str) -> str:
+    """Identifiant d'utilisateur pour l'ordonnancement équitable (empreinte du token, jamais le token)"""
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()[:16]
+
+
+async def run_cancellable(job: Awaitable[Any], is_cancelled: Callable[[], bool],
+                          interval: float = CANCEL_POLL_SECONDS) -> bool:
+    """
+    Exécute une analyse en l'annulant dès que l'annulation est demandée
+
+    Args:
+        job: Coroutine de l'analyse
+        is_cancelled: Fonction indiquant si l'annulation a été demandée
+        interval: Intervalle de vérification (secondes)
+
+    Returns:
+        True si l'analyse a été annulée
+    """
+    task = asyncio.ensure_future(job)
+    cancel_requested = False
+    try:
+        while not task.done():
+            done, _ = await asyncio.wait({task}, timeout=interval)
+            if not done and await asyncio.to_thread(is_cancelled):
+                cancel_requested = True
+                task.cancel()
+        await task
+        return False
+    except asyncio.CancelledError:
+        if cancel_requested and task.cancelled():
+            return True
+        # Annulation venue de l'extérieur (arrêt du worker) : la propager à l'analyse
+        task.cancel()
+        raise
+
+
+class QueueEventPublisher:
+    """Remplace le TaskEventBroker dans un worker : les événements sont transmis au processus API"""
+
+    def __init__(self, outbox: multiprocessing.Queue):
+        self.outbox = outbox
+
+    def publish(self, task_id: str, event_type: str, data: Dict[str, Any]):
+        self.outbox.put(("event", task_id, event_type, data))
+
+    def close(self, task_id: str):
+        self.outbox.put(("close", task_id))
+
+
+def _worker_main(worker_id: int, inbox: multiprocessing.Queue, outbox: multiprocessing.Queue):
+    """Boucle d'un processus worker : exécute run_analysis_task pour chaque tâche reçue"""
+    # Ctrl+C atteint tout le groupe de processus : l'arrêt est piloté par le processus API
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    # Import différé : le module API n'est chargé que dans le processus worker
+    import main as api
+
+    api.task_events = QueueEventPublisher(outbox)
+
+    async def push_metrics():
+        # Les métriques du worker sont exposées par le processus API (/metrics)
+        while True:
+            await asyncio.sleep(METRICS_PUSH_SECONDS)
+            outbox.put(("metrics", worker_id, REGISTRY.snapshot()))
+
+    async def serve():
+        # Chaque worker dispose de ses propres pools HTTP, caches et stockages
+        pusher = asyncio.create_task(push_metrics())
+        async with api.analysis_resources(api.app):
+            while True:
+                job = await asyncio.to_thread(inbox.get)
+                if job is None:
+                    pusher.cancel()
+                    outbox.put(("metrics", worker_id, REGISTRY.snapshot()))
+                    return
+                task_id = job["task_id"]
+                task_store = api.get_task_store()
+                try:
+                    await run_cancellable(
+                        api.run_analysis_task(task_id, **job["kwargs"]),
+                        lambda: task_store.is_cancel_requested(task_id)
+                    )
+                except Exception as e:
+                    logger.error(f"Erreur inattendue du worker {worker_id} pour {task_id}: {str(e)}")
+                finally:
+                    outbox.put(("metrics", worker_id, REGISTRY.snapshot()))
+                    outbox.put(("done", worker_id, task_id))
+
+    asyncio.run(serve())
+
+
+class AnalysisWorkerPool:
+    """File d'attente locale des analyses, exécutées par un pool de processus workers"""
+
+    def __init__(self, process_count: int, task_store: TaskStore, task_events: TaskEventBroker):
+        """
+        Initialise le pool de workers
+
+        Args:
+            process_count: Nombre de processus workers (analyses simultanées)
+            task_store: Stockage des tâches (états, annulations)
+            task_events: Flux d'événements des tâches, alimentés par les workers
+        """
+        self.process_count = max(1, process_count)
+        self.task_store = task_store
+        self.task_events = task_events
+        # Processus "spawn" : pas d'héritage de la boucle asyncio ni des connexions du processus API
+        self._context = multiprocessing.get_context("spawn")
+        self._outbox = self._context.Queue()
+        self._workers: Dict[int, Dict[str, Any]] = {}
+        # Tâches en attente par utilisateur, servis à tour de rôle
+        self._pending: "OrderedDict[str, deque]" = OrderedDict()
+        self._reader: Optional[asyncio.Task] = None
+        self._stopping = False
+        # Dernières métriques reçues de chaque worker, et cumul des workers remplacés
+        self._worker_metrics: Dict[int, Dict[str, Any]] = {}
+        self._retired_metrics: Dict[str, Any] = {}
+
+    def _spawn_worker(self, worker_id: int):
+        inbox = self._context.Queue()
+        process = self._context.Process(
+            target=_worker_main, args=(worker_id, inbox, self._outbox),
+            name=f"analysis-worker-{worker_id}", daemon=True
+        )
+        process.start()
+        self._workers[worker_id] = {"process": process, "inbox": inbox, "task_id": None}
+
+    async def start(self):
+        """Démarre les processus workers et la lecture de leurs messages"""
+        for worker_id in range(self.process_count):
+            self._spawn_worker(worker_id)
+        self._reader = asyncio.create_task(self._read_messages())
+        logger.info(f"Pool d'analyse démarré avec {self.process_count} processus")
+
+    def submit(self, task_id: str, token: str, **kwargs):
+        """
+        Met une analyse en file d'attente
+
+        Args:
+            task_id: Identifiant de la tâche (déjà créée dans le stockage)
+            token: Token GitHub (transmis au worker en mémoire, utilisé pour l'équité)
+            **kwargs: Autres arguments de run_analysis_task
+        """
+        key = user_key(token)
+        self._pending.setdefault(key, deque()).append(
+            {"task_id": task_id, "kwargs": {"token": token, **kwargs}}
+        )
+        self._dispatch()
+
+    def cancel_queued(self, task_id: str) -> bool:
+        """
+        Retire une tâche de la file d'attente locale
+
+        Returns:
+            True si la tâche était en attente dans ce processus (elle est alors annulée)
+        """
+        for key, jobs in list(self._pending.items()):
+            for job in jobs:
+                if job["task_id"] == task_id:
+                    jobs.remove(job)
+                    if not jobs:
+                        del self._pending[key]
+                    self._mark_cancelled(task_id)
+                    return True
+        return False
+
+    def queue_position(self, task_id: str) -> Optional[int]:
+        """Position (à partir de 1) d'une tâche dans l'ordre de service, None si elle n'attend pas ici"""
+        queues = [list(jobs) for jobs in self._pending.values()]
+        position = 0
+        for depth in range(max((len(q) for q in queues), default=0)):
+            for jobs in queues:
+                if depth < len(jobs):
+                    position += 1
+                    if jobs[depth]["task_id"] == task_id:
+                        return position
+        return None
+
+    def _next_job(self) -> Optional[Dict[str, Any]]:
+        """Tâche suivante, en servant les utilisateurs à tour de rôle"""
+        while self._pending:
+            key, jobs = self._pending.popitem(last=False)
+            job = jobs.popleft()
+            if jobs:
+                # L'utilisateur servi repasse en fin de tour
+                self._pending[key] = jobs
+            if self.task_store.is_cancel_requested(job["task_id"]):
+                self._mark_cancelled(job["task_id"])
+                continue
+            return job
+        return None
+
+    def _dispatch(self):
+        """Attribue les tâches en attente aux workers libres"""
+        if self._stopping:
+            return
+        for worker in self._workers.values():
+            if worker["task_id"] is not None:
+                continue
+            job = self._next_job()
+            if job is None:
+                return
+            worker["task_id"] = job["task_id"]
+            worker["inbox"].put(job)
+
+    def _mark_cancelled(self, task_id: str):
+        self.task_store.update(task_id, status="annulé")
+        self.task_events.publish(task_id, "status", {"status": "annulé"})
+        self.task_events.publish(task_id, "cancelled", {})
+        self.task_events.close(task_id)
+        logger.info(f"Tâche {task_id} annulée avant son démarrage")
+
+    def _fail_task(self, task_id: str, message: str):
+        self.task_store.update(task_id, status="erreur", error=message)
+        self.task_events.publish(task_id, "status", {"status": "erreur"})
+        self.task_events.publish(task_id, "error", {"error": message})
+        self.task_events.close(task_id)
+
+    def _check_workers(self):
+        """Remplace les workers arrêtés anormalement (la tâche en cours passe en erreur)"""
+        for worker_id, worker in list(self._workers.items()):
+            if worker["process"].is_alive():
+                continue
+            logger.error(f"Worker {worker_id} arrêté (code {worker['process'].exitcode}), redémarrage")
+            if worker["task_id"] is not None:
+                self._fail_task(worker["task_id"], "Processus d'analyse interrompu")
+            self._retire_metrics(worker_id)
+            self._spawn_worker(worker_id)
+        self._dispatch()
+
+    async def _read_messages(self):
+        """Relaye les événements des workers vers les flux SSE et libère les workers"""
+        while True:
+            try:
+                message = await asyncio.to_thread(self._outbox.get, True, 1.0)
+            except queue.Empty:
+                if not self._stopping:
+                    self._check_workers()
+                continue
+            kind = message[0]
+            if kind == "event":
+                _, task_id, event_type, data = message
+                self.task_events.publish(task_id, event_type, data)
+            elif kind == "close":
+                self.task_events.close(message[1])
+            elif kind == "metrics":
+                _, worker_id, snapshot = message
+                self._worker_metrics[worker_id] = snapshot
+            elif kind == "done":
+                _, worker_id, task_id = message
+                if worker_id in self._workers and self._workers[worker_id]["task_id"] == task_id:
+                    self._workers[worker_id]["task_id"] = None
+                self._dispatch()
+            elif kind == "stop":
+                return
+
+    def _retire_metrics(self, worker_id: int):
+        """Conserve les compteurs et histogrammes d'un worker arrêté (ses jauges ne valent plus rien)"""
+        snapshot = self._worker_metrics.pop(worker_id, None)
+        if snapshot is None:
+            return
+        kept = {name: metric for name, metric in snapshot.items() if metric["type"] != "gauge"}
+        self._retired_metrics = dict(merge_snapshots([self._retired_metrics, kept]))
+
+    def metrics_snapshots(self) -> List[Dict[str, Any]]:
+        """Métriques des workers (et des workers remplacés), à additionner à celles du processus API"""
+        ANALYSIS_QUEUE_DEPTH.set(sum(len(jobs) for jobs in self._pending.values()))
+        return [self._retired_metrics, *self._worker_metrics.values()]
+
+    async def stop(self):
+        """Arrête les workers (les analyses en cours disposent de SHUTDOWN_TIMEOUT_SECONDS pour finir)"""
+        self._stopping = True
+        for jobs in self._pending.values():
+            for job in jobs:
+                self._fail_task(job["task_id"], "Analyse interrompue par l'arrêt du serveur")
+        self._pending.clear()
+
+        for worker in self._workers.values():
+            worker["inbox"].put(None)
+        for worker_id, worker in self._workers.items():
+            await asyncio.to_thread(worker["process"].join, SHUTDOWN_TIMEOUT_SECONDS)
+            if worker["process"].is_alive():
+                worker["process"].terminate()
+                if worker["task_id"] is not None:
+                    self._fail_task(worker["task_id"], "Analyse interrompue par l'arrêt du serveur")
+
+        if self._reader is not None:
+            self._outbox.put(("stop",))
+            await self._reader
+        logger.info("Pool d'analyse arrêté")
@@ -41,6 +41,7 @@ function Analysis() {
   const [error, setError] = useState('');
   const [taskId, setTaskId] = useState(null);
   const [progress, setProgress] = useState(0);
+  const [liveStats, setLiveStats] = useState({ files: 0, vulnerabilities: 0 });
   const [result, setResult] = useState(null);
   const [availableModels, setAvailableModels] = useState([]);
   const [selectedModels, setSelectedModels] = useState([]);
@@ -82,6 +83,7 @@ function Analysis() {
     setAnalyzing(true);
     setError('');
     setProgress(0);
+    setLiveStats({ files: 0, vulnerabilities: 0 });
     
     try {
       const response = await fetch(`${process.env.REACT_APP_API_URL || 'http://localhost:8000'}/api/analysis/start`, {
@@ -103,7 +105,11 @@ function Analysis() {
       const data = await response.json();
       setTaskId(data.task_id);
       
-      pollTaskStatus(data.task_id);
+      if (window.EventSource) {
+        followTaskEvents(data.task_id);
+      } else {
+        pollTaskStatus(data.task_id);
+      }
     } catch (error) {
       console.error('Erreur lors du démarrage de l\'analyse:', error);
       setError(`Impossible de démarrer l'analyse: ${error.message}`);
@@ -111,6 +117,61 @@ function Analysis() {
     }
   };
   
+  // Suivre l'analyse en temps réel (Server-Sent Events), avec repli sur le polling
+  const followTaskEvents = (taskId) => {
+    const source = new EventSource(`${process.env.REACT_APP_API_URL || 'http://localhost:8000'}/api/analysis/events/${taskId}`);
+    let finished = false;
+    
+    source.addEventListener('progress', (event) => {
+      setProgress(JSON.parse(event.data).progress * 100);
+    });
+    
+    source.addEventListener('file_result', (event) => {
+      const fileResult = JSON.parse(event.data);
+      setLiveStats(stats => ({
+        files: stats.files + 1,
+        vulnerabilities: stats.vulnerabilities + (fileResult.vulnerabilities || []).length
+      }));
+    });
+    
+    source.addEventListener('completed', () => {
+      finished = true;
+      source.close();
+      // Récupérer le résultat complet une seule fois
+      pollTaskStatus(taskId);
+    });
+    
+    source.addEventListener('cancelled', () => {
+      finished = true;
+      source.close();
+      setError('Analyse annulée');
+      setAnalyzing(false);
+    });
+    
+    source.addEventListener('error', (event) => {
+      if (event.data) {
+        finished = true;
+        source.close();
+        setError(`Erreur lors de l'analyse: ${JSON.parse(event.data).error || 'Raison inconnue'}`);
+        setAnalyzing(false);
+      } else if (!finished && source.readyState === EventSource.CLOSED) {
+        // Connexion impossible : revenir au polling
+        pollTaskStatus(taskId);
+      }
+    });
+  };
+  
+  // Récupérer le résultat complet d'une analyse terminée
+  const fetchTaskResult = async (taskId) => {
+    const response = await fetch(`${process.env.REACT_APP_API_URL || 'http://localhost:8000'}/api/analysis/results/${taskId}`);
+    
+    if (!response.ok) {
+      throw new Error(`Erreur HTTP ${response.status}`);
+    }
+    
+    setResult(await response.json());
+  };
+  
   // Vérifier périodiquement le statut de la tâche
   const pollTaskStatus = async (taskId) => {
     try {
@@ -124,11 +185,14 @@ function Analysis() {
       setProgress(data.progress * 100);
       
       if (data.status === 'terminé') {
-        setResult(data.result);
+        await fetchTaskResult(taskId);
         setAnalyzing(false);
       } else if (data.status === 'erreur') {
         setError(`Erreur lors de l'analyse: ${data.error || 'Raison inconnue'}`);
         setAnalyzing(false);
+      } else if (data.status === 'annulé') {
+        setError('Analyse annulée');
+        setAnalyzing(false);
       } else {
         setTimeout(() => pollTaskStatus(taskId), 2000);
       }
@@ -139,6 +203,24 @@ function Analysis() {
     }
   };
   
+  // Annuler l'analyse en cours (ou en attente)
+  const cancelAnalysis = async () => {
+    if (!taskId) return;
+    
+    try {
+      const response = await fetch(`${process.env.REACT_APP_API_URL || 'http://localhost:8000'}/api/analysis/cancel/${taskId}`, {
+        method: 'POST',
+      });
+      
+      if (!response.ok) {
+        throw new Error(`Erreur HTTP ${response.status}`);
+      }
+    } catch (error) {
+      console.error('Erreur lors de l\'annulation de l\'analyse:', error);
+      setError(`Impossible d'annuler l'analyse: ${error.message}`);
+    }
+  };
+  
   // Télécharger le rapport PDF
   const downloadPDF = async () => {
     if (!taskId) return;
@@ -535,6 +617,11 @@ function Analysis() {
             <div className="progress-bar" style={{ width: `${progress}%` }}></div>
           </div>
           <p className="progress-text">{Math.round(progress)}% complété</p>
+          {liveStats.files > 0 && (
+            <p className="progress-text">
+              {liveStats.files} fichier(s) analysé(s) · {liveStats.vulnerabilities} vulnérabilité(s) détectée(s)
+            </p>
+          )}
           <div className="analysis-steps">
             <div className={`step ${progress >= 10 ? 'completed' : progress > 0 ? 'active' : ''}`}>Clone du dépôt</div>
             <div className={`step ${progress >= 30 ? 'completed' : progress >= 20 ? 'active' : ''}`}>Préparation des modèles</div>
@@ -542,6 +629,9 @@ function Analysis() {
             <div className={`step ${progress >= 90 ? 'completed' : progress >= 80 ? 'active' : ''}`}>Génération du rapport</div>
             <div className={`step ${progress >= 100 ? 'completed' : progress >= 90 ? 'active' : ''}`}>Finalisation</div>
           </div>
+          <button className="cancel-analysis-button" onClick={cancelAnalysis} disabled={!taskId}>
+            Annuler l'analyse
+          </button>
         </div>
       )}
       